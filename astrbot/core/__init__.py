@@ -16,7 +16,13 @@ DEMO_MODE = os.getenv("DEMO_MODE", False)
 
 astrbot_config = AstrBotConfig()
 t2i_base_url = astrbot_config.get("t2i_endpoint", "https://t2i.soulter.top/text2img")
-html_renderer = HtmlRenderer(t2i_base_url)
+html_renderer = HtmlRenderer(
+    t2i_base_url,
+    local_workers=astrbot_config.get("t2i_local_workers", 1),
+    local_use_process_pool=astrbot_config.get("t2i_local_use_process_pool", False),
+    cache_max_mb=astrbot_config.get("t2i_cache_max_mb", 256),
+    url_cache_ttl=astrbot_config.get("t2i_url_cache_ttl", 600),
+)
 logger = LogManager.GetLogger(log_name="astrbot")
 db_helper = SQLiteDatabase(DB_PATH)
 # 简单的偏好设置存储, 这里后续应该存储到数据库中, 一些部分可以存储到配置中
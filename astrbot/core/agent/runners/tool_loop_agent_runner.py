@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import traceback
 import typing as T
@@ -52,6 +53,12 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         self.tool_executor = tool_executor
         self.agent_hooks = agent_hooks
         self.run_context = run_context
+        # 并行工具调用
+        self.parallel_tool_calls: bool = kwargs.get("parallel_tool_calls", False)
+        self.max_parallel_tool_calls: int = max(
+            1, kwargs.get("max_parallel_tool_calls", 4)
+        )
+        self.tool_call_timeout: float = kwargs.get("tool_call_timeout", 0)
 
     def _transition_state(self, new_state: AgentState) -> None:
         """转换 Agent 状态"""
@@ -182,128 +189,218 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         req: ProviderRequest,
         llm_response: LLMResponse,
     ) -> T.AsyncGenerator[MessageChain | list[ToolCallMessageSegment], None]:
-        """处理函数工具调用。"""
+        """处理函数工具调用。
+
+        默认按顺序逐个执行工具调用。开启 parallel_tool_calls 后，相邻的可并行工具（MCP 工具和声明了 serial=False 的工具）会并发执行，
+        其余工具会等待之前的工具执行完毕后单独执行。工具结果始终按照 LLM 给出的调用顺序返回。
+        """
+        if not req.func_tool:
+            return
         tool_call_result_blocks: list[ToolCallMessageSegment] = []
         logger.info(f"Agent 使用工具: {llm_response.tools_call_name}")
 
-        # 执行函数调用
-        for func_tool_name, func_tool_args, func_tool_id in zip(
-            llm_response.tools_call_name,
-            llm_response.tools_call_args,
-            llm_response.tools_call_ids,
-        ):
-            try:
-                if not req.func_tool:
-                    return
-                func_tool = req.func_tool.get_func(func_tool_name)
-                logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
-
-                try:
-                    await self.agent_hooks.on_tool_start(
-                        self.run_context, func_tool, func_tool_args
-                    )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
+        calls = list(
+            zip(
+                llm_response.tools_call_name,
+                llm_response.tools_call_args,
+                llm_response.tools_call_ids,
+            )
+        )
+
+        if not self.parallel_tool_calls or len(calls) <= 1:
+            for call in calls:
+                if self._get_tool_timeout(req, call[0]) is None:
+                    async for item in self._iter_tool_call(req, *call):
+                        if isinstance(item, ToolCallMessageSegment):
+                            tool_call_result_blocks.append(item)
+                        else:
+                            yield item
+                    continue
+                for item in await self._collect_tool_call(req, call):
+                    if isinstance(item, ToolCallMessageSegment):
+                        tool_call_result_blocks.append(item)
+                    else:
+                        yield item
+        else:
+            for batch in self._split_tool_call_batches(req, calls):
+                if len(batch) == 1:
+                    results = [await self._collect_tool_call(req, batch[0])]
+                else:
+                    semaphore = asyncio.Semaphore(self.max_parallel_tool_calls)
+
+                    async def _run(call):
+                        async with semaphore:
+                            return await self._collect_tool_call(req, call)
+
+                    results = await asyncio.gather(*[_run(call) for call in batch])
+                for items in results:
+                    for item in items:
+                        if isinstance(item, ToolCallMessageSegment):
+                            tool_call_result_blocks.append(item)
+                        else:
+                            yield item
 
-                executor = self.tool_executor.execute(
-                    tool=func_tool,
-                    run_context=self.run_context,
-                    **func_tool_args,
+        # 处理函数调用响应
+        if tool_call_result_blocks:
+            yield tool_call_result_blocks
+
+    def _split_tool_call_batches(
+        self, req: ProviderRequest, calls: list[tuple]
+    ) -> list[list[tuple]]:
+        """将工具调用按顺序切分为若干批次。相邻的可并行工具为同一批次，其余工具单独为一个批次。"""
+        batches: list[list[tuple]] = []
+        current: list[tuple] = []
+        for call in calls:
+            func_tool = req.func_tool.get_func(call[0]) if req.func_tool else None
+            # 本地工具可能通过事件直接发送消息, 只有 MCP 工具和明确声明的工具可以并行
+            if not func_tool or (func_tool.origin != "mcp" and func_tool.serial):
+                if current:
+                    batches.append(current)
+                    current = []
+                batches.append([call])
+            else:
+                current.append(call)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _get_tool_timeout(self, req: ProviderRequest, func_tool_name: str):
+        """获取工具的超时时间，工具自身声明的 timeout 优先。返回 None 表示不限制"""
+        func_tool = req.func_tool.get_func(func_tool_name) if req.func_tool else None
+        if func_tool and func_tool.timeout:
+            return func_tool.timeout
+        return self.tool_call_timeout or None
+
+    async def _collect_tool_call(
+        self, req: ProviderRequest, call: tuple
+    ) -> list[MessageChain | ToolCallMessageSegment]:
+        """执行一个工具调用并收集其全部输出，超时后返回错误结果"""
+        func_tool_name, func_tool_args, func_tool_id = call
+        items: list[MessageChain | ToolCallMessageSegment] = []
+
+        async def _drain():
+            async for item in self._iter_tool_call(
+                req, func_tool_name, func_tool_args, func_tool_id
+            ):
+                items.append(item)
+
+        timeout = self._get_tool_timeout(req, func_tool_name)
+        try:
+            await asyncio.wait_for(_drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"工具 {func_tool_name} 执行超时（{timeout} 秒）。")
+            # 每个 tool_call_id 只能有一个结果
+            if any(isinstance(item, ToolCallMessageSegment) for item in items):
+                return items
+            items.append(
+                ToolCallMessageSegment(
+                    role="tool",
+                    tool_call_id=func_tool_id,
+                    content=f"error: tool call timed out after {timeout} seconds",
                 )
-                async for resp in executor:
-                    if isinstance(resp, CallToolResult):
-                        res = resp
-                        if isinstance(res.content[0], TextContent):
-                            tool_call_result_blocks.append(
-                                ToolCallMessageSegment(
-                                    role="tool",
-                                    tool_call_id=func_tool_id,
-                                    content=res.content[0].text,
-                                )
+            )
+        return items
+
+    async def _iter_tool_call(
+        self,
+        req: ProviderRequest,
+        func_tool_name: str,
+        func_tool_args: dict,
+        func_tool_id: str,
+    ) -> T.AsyncGenerator[MessageChain | ToolCallMessageSegment, None]:
+        """执行一个工具调用，产出需要发送的消息和工具结果"""
+        try:
+            func_tool = req.func_tool.get_func(func_tool_name)
+            logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
+
+            try:
+                await self.agent_hooks.on_tool_start(
+                    self.run_context, func_tool, func_tool_args
+                )
+            except Exception as e:
+                logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
+
+            executor = self.tool_executor.execute(
+                tool=func_tool,
+                run_context=self.run_context,
+                **func_tool_args,
+            )
+            async for resp in executor:
+                if isinstance(resp, CallToolResult):
+                    res = resp
+                    if isinstance(res.content[0], TextContent):
+                        yield ToolCallMessageSegment(
+                            role="tool",
+                            tool_call_id=func_tool_id,
+                            content=res.content[0].text,
+                        )
+                        yield MessageChain().message(res.content[0].text)
+                    elif isinstance(res.content[0], ImageContent):
+                        yield ToolCallMessageSegment(
+                            role="tool",
+                            tool_call_id=func_tool_id,
+                            content="返回了图片(已直接发送给用户)",
+                        )
+                        yield MessageChain(type="tool_direct_result").base64_image(
+                            res.content[0].data
+                        )
+                    elif isinstance(res.content[0], EmbeddedResource):
+                        resource = res.content[0].resource
+                        if isinstance(resource, TextResourceContents):
+                            yield ToolCallMessageSegment(
+                                role="tool",
+                                tool_call_id=func_tool_id,
+                                content=resource.text,
                             )
-                            yield MessageChain().message(res.content[0].text)
-                        elif isinstance(res.content[0], ImageContent):
-                            tool_call_result_blocks.append(
-                                ToolCallMessageSegment(
-                                    role="tool",
-                                    tool_call_id=func_tool_id,
-                                    content="返回了图片(已直接发送给用户)",
-                                )
+                            yield MessageChain().message(resource.text)
+                        elif (
+                            isinstance(resource, BlobResourceContents)
+                            and resource.mimeType
+                            and resource.mimeType.startswith("image/")
+                        ):
+                            yield ToolCallMessageSegment(
+                                role="tool",
+                                tool_call_id=func_tool_id,
+                                content="返回了图片(已直接发送给用户)",
                             )
                             yield MessageChain(type="tool_direct_result").base64_image(
-                                res.content[0].data
+                                resource.blob
                             )
-                        elif isinstance(res.content[0], EmbeddedResource):
-                            resource = res.content[0].resource
-                            if isinstance(resource, TextResourceContents):
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content=resource.text,
-                                    )
-                                )
-                                yield MessageChain().message(resource.text)
-                            elif (
-                                isinstance(resource, BlobResourceContents)
-                                and resource.mimeType
-                                and resource.mimeType.startswith("image/")
-                            ):
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content="返回了图片(已直接发送给用户)",
-                                    )
-                                )
-                                yield MessageChain(
-                                    type="tool_direct_result"
-                                ).base64_image(resource.blob)
-                            else:
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content="返回的数据类型不受支持",
-                                    )
-                                )
-                                yield MessageChain().message("返回的数据类型不受支持。")
-
-                    elif resp is None:
-                        # Tool 直接请求发送消息给用户
-                        # 这里我们将直接结束 Agent Loop。
-                        self._transition_state(AgentState.DONE)
-                        if res := self.run_context.event.get_result():
-                            if res.chain:
-                                yield MessageChain(
-                                    chain=res.chain, type="tool_direct_result"
-                                )
-                    else:
-                        logger.warning(
-                            f"Tool 返回了不支持的类型: {type(resp)}，将忽略。"
-                        )
+                        else:
+                            yield ToolCallMessageSegment(
+                                role="tool",
+                                tool_call_id=func_tool_id,
+                                content="返回的数据类型不受支持",
+                            )
+                            yield MessageChain().message("返回的数据类型不受支持。")
 
-                try:
-                    await self.agent_hooks.on_tool_end(
-                        self.run_context, func_tool, func_tool_args, None
-                    )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
+                elif resp is None:
+                    # Tool 直接请求发送消息给用户
+                    # 这里我们将直接结束 Agent Loop。
+                    self._transition_state(AgentState.DONE)
+                    if res := self.run_context.event.get_result():
+                        if res.chain:
+                            yield MessageChain(
+                                chain=res.chain, type="tool_direct_result"
+                            )
+                else:
+                    logger.warning(f"Tool 返回了不支持的类型: {type(resp)}，将忽略。")
 
-                self.run_context.event.clear_result()
-            except Exception as e:
-                logger.warning(traceback.format_exc())
-                tool_call_result_blocks.append(
-                    ToolCallMessageSegment(
-                        role="tool",
-                        tool_call_id=func_tool_id,
-                        content=f"error: {str(e)}",
-                    )
+            try:
+                await self.agent_hooks.on_tool_end(
+                    self.run_context, func_tool, func_tool_args, None
                 )
+            except Exception as e:
+                logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
 
-        # 处理函数调用响应
-        if tool_call_result_blocks:
-            yield tool_call_result_blocks
+            self.run_context.event.clear_result()
+        except Exception as e:
+            logger.warning(traceback.format_exc())
+            yield ToolCallMessageSegment(
+                role="tool",
+                tool_call_id=func_tool_id,
+                content=f"error: {str(e)}",
+            )
 
     def done(self) -> bool:
         """检查 Agent 是否已完成工作"""
@@ -21,6 +21,12 @@ class FunctionTool:
     active: bool = True
     """是否激活"""
 
+    serial: bool = True
+    """是否必须串行执行。开启并行工具调用时，只有 MCP 工具和声明为 False 的本地工具会与其他工具同时执行。
+    本地工具通常会通过事件直接发送消息，并发执行时会互相覆盖事件的结果，因此默认串行"""
+    timeout: float | None = None
+    """工具执行的超时时间（秒），为空时使用全局配置的 tool_call_timeout"""
+
     origin: Literal["local", "mcp"] = "local"
     """函数工具的来源, local 为本地函数工具, mcp 为 MCP 服务"""
 
@@ -18,6 +18,10 @@ DEFAULT_CONFIG = {
             "time": 60,
             "count": 30,
             "strategy": "stall",  # stall, discard
+            "user_count": 0,
+            "group_count": 0,
+            "platform_count": 0,
+            "global_count": 0,
         },
         "reply_prefix": "",
         "forward_threshold": 1500,
@@ -71,6 +75,9 @@ DEFAULT_CONFIG = {
         "show_tool_use_status": False,
         "streaming_segmented": False,
         "max_agent_step": 30,
+        "parallel_tool_calls": False,
+        "max_parallel_tool_calls": 4,
+        "tool_call_timeout": 0,
     },
     "provider_stt_settings": {
         "enable": False,
@@ -81,6 +88,9 @@ DEFAULT_CONFIG = {
         "provider_id": "",
         "dual_output": False,
         "use_file_service": False,
+        "cache_enable": True,
+        "cache_max_mb": 256,
+        "max_concurrency": 3,
     },
     "provider_ltm_settings": {
         "group_icl_enable": False,
@@ -95,7 +105,12 @@ DEFAULT_CONFIG = {
     },
     "content_safety": {
         "also_use_in_response": False,
-        "internal_keywords": {"enable": True, "extra_keywords": []},
+        "internal_keywords": {
+            "enable": True,
+            "extra_keywords": [],
+            "normalize": False,
+            "traditional_to_simplified": False,
+        },
         "baidu_aip": {"enable": False, "app_id": "", "api_key": "", "secret_key": ""},
     },
     "admins_id": ["astrbot"],
@@ -105,6 +120,10 @@ DEFAULT_CONFIG = {
     "t2i_endpoint": "",
     "t2i_use_file_service": False,
     "t2i_active_template": "base",
+    "t2i_local_workers": 1,
+    "t2i_local_use_process_pool": False,
+    "t2i_cache_max_mb": 256,
+    "t2i_url_cache_ttl": 600,
     "http_proxy": "",
     "no_proxy": ["localhost", "127.0.0.1", "::1"],
     "dashboard": {
@@ -127,6 +146,8 @@ DEFAULT_CONFIG = {
     },
     "wake_prefix": ["/"],
     "log_level": "INFO",
+    "metrics_upload_enable": True,
+    "metrics_flush_interval": 60,
     "pip_install_arg": "",
     "pypi_index_url": "https://mirrors.aliyun.com/pypi/simple/",
     "persona": [],  # deprecated
@@ -134,6 +155,13 @@ DEFAULT_CONFIG = {
     "callback_api_base": "",
     "default_kb_collection": "",  # 默认知识库名称
     "plugin_set": ["*"],  # "*" 表示使用所有可用的插件, 空列表表示不使用任何插件
+    "event_bus": {
+        "max_concurrency": 64,  # 同时处理的消息事件数上限
+        "max_session_pending": 20,  # 单个会话最多积压的消息事件数
+        "max_pending": 2000,  # 所有会话最多积压的消息事件总数
+        "overflow_policy": "drop_oldest",  # drop_oldest, drop_newest, coalesce
+        "max_permit_hold": 30,  # 单个事件最多占用并发名额的秒数
+    },
 }
 
 
@@ -488,6 +516,10 @@ CONFIG_METADATA_2 = {
                                 "type": "string",
                                 "options": ["stall", "discard"],
                             },
+                            "user_count": {"type": "int"},
+                            "group_count": {"type": "int"},
+                            "platform_count": {"type": "int"},
+                            "global_count": {"type": "int"},
                         },
                     },
                     "no_permission_reply": {
@@ -623,6 +655,14 @@ CONFIG_METADATA_2 = {
                                 "items": {"type": "string"},
                                 "hint": "额外的屏蔽关键词列表，支持正则表达式。",
                             },
+                            "normalize": {
+                                "type": "bool",
+                                "hint": "检查前进行 NFKC 规范化（全角转半角等）并忽略大小写。",
+                            },
+                            "traditional_to_simplified": {
+                                "type": "bool",
+                                "hint": "检查前将繁体转换为简体，需要安装 opencc。",
+                            },
                         },
                     },
                 },
@@ -1125,6 +1165,9 @@ CONFIG_METADATA_2 = {
                         "embedding_model": "",
                         "embedding_dimensions": 1024,
                         "timeout": 20,
+                        "embedding_cache_size": 2048,
+                        "embedding_cache_ttl": 3600,
+                        "embedding_batch_window_ms": 5,
                     },
                     "Gemini Embedding": {
                         "id": "gemini_embedding",
@@ -1137,6 +1180,9 @@ CONFIG_METADATA_2 = {
                         "embedding_model": "gemini-embedding-exp-03-07",
                         "embedding_dimensions": 768,
                         "timeout": 20,
+                        "embedding_cache_size": 2048,
+                        "embedding_cache_ttl": 3600,
+                        "embedding_batch_window_ms": 5,
                     },
                     "vLLM Rerank": {
                         "id": "vllm_rerank",
@@ -1314,6 +1360,20 @@ CONFIG_METADATA_2 = {
                         "type": "string",
                         "hint": "嵌入模型名称。",
                     },
+                    "embedding_cache_size": {
+                        "description": "查询向量缓存数量",
+                        "type": "int",
+                        "hint": "缓存最近查询的文本向量，相同的查询不会重复请求。0 表示不缓存。",
+                    },
+                    "embedding_cache_ttl": {
+                        "description": "查询向量缓存时间(秒)",
+                        "type": "int",
+                    },
+                    "embedding_batch_window_ms": {
+                        "description": "请求合并窗口(毫秒)",
+                        "type": "int",
+                        "hint": "在该时间内到达的查询会合并为一次批量请求。0 表示不合并。",
+                    },
                     "embedding_api_key": {
                         "description": "API Key",
                         "type": "string",
@@ -1833,6 +1893,15 @@ CONFIG_METADATA_2 = {
                         "description": "工具调用轮数上限",
                         "type": "int",
                     },
+                    "parallel_tool_calls": {
+                        "type": "bool",
+                    },
+                    "max_parallel_tool_calls": {
+                        "type": "int",
+                    },
+                    "tool_call_timeout": {
+                        "type": "int",
+                    },
                 },
             },
             "provider_stt_settings": {
@@ -1861,6 +1930,18 @@ CONFIG_METADATA_2 = {
                     "use_file_service": {
                         "type": "bool",
                     },
+                    "cache_enable": {
+                        "type": "bool",
+                        "hint": "缓存合成的音频，相同的文本不会重复合成。",
+                    },
+                    "cache_max_mb": {
+                        "type": "int",
+                        "hint": "音频缓存的总大小上限(MB)，超出时淘汰最久未使用的音频。",
+                    },
+                    "max_concurrency": {
+                        "type": "int",
+                        "hint": "每个 TTS 提供商同时进行的合成请求数量上限。0 表示不限制。",
+                    },
                 },
             },
             "provider_ltm_settings": {
@@ -1946,6 +2027,24 @@ CONFIG_METADATA_2 = {
             "t2i_use_file_service": {
                 "type": "bool",
             },
+            "t2i_local_workers": {
+                "type": "int",
+            },
+            "t2i_local_use_process_pool": {
+                "type": "bool",
+            },
+            "t2i_cache_max_mb": {
+                "type": "int",
+            },
+            "t2i_url_cache_ttl": {
+                "type": "int",
+            },
+            "metrics_upload_enable": {
+                "type": "bool",
+            },
+            "metrics_flush_interval": {
+                "type": "int",
+            },
             "pip_install_arg": {
                 "type": "string",
             },
@@ -1955,6 +2054,19 @@ CONFIG_METADATA_2 = {
             "default_kb_collection": {
                 "type": "string",
             },
+            "event_bus": {
+                "type": "object",
+                "items": {
+                    "max_concurrency": {"type": "int"},
+                    "max_session_pending": {"type": "int"},
+                    "max_pending": {"type": "int"},
+                    "overflow_policy": {
+                        "type": "string",
+                        "options": ["drop_oldest", "drop_newest", "coalesce"],
+                    },
+                    "max_permit_hold": {"type": "float"},
+                },
+            },
         },
     },
 }
@@ -2097,6 +2209,23 @@ CONFIG_METADATA_3 = {
                         "description": "工具调用轮数上限",
                         "type": "int",
                     },
+                    "provider_settings.parallel_tool_calls": {
+                        "description": "并行执行工具调用",
+                        "type": "bool",
+                        "hint": "LLM 一次返回多个工具调用时并发执行。只有 MCP 工具和声明了 serial=False 的插件工具会并发执行，其余工具仍会单独执行。",
+                    },
+                    "provider_settings.max_parallel_tool_calls": {
+                        "description": "单轮最大并行工具调用数",
+                        "type": "int",
+                        "condition": {
+                            "provider_settings.parallel_tool_calls": True,
+                        },
+                    },
+                    "provider_settings.tool_call_timeout": {
+                        "description": "工具调用超时时间(秒)",
+                        "type": "int",
+                        "hint": "单个工具调用的超时时间，0 表示不限制。",
+                    },
                     "provider_settings.streaming_response": {
                         "description": "流式回复",
                         "type": "bool",
@@ -2127,6 +2256,23 @@ CONFIG_METADATA_3 = {
                         "description": "开启 TTS 时同时输出语音和文字内容",
                         "type": "bool",
                     },
+                    "provider_tts_settings.cache_enable": {
+                        "description": "缓存 TTS 音频",
+                        "type": "bool",
+                        "hint": "缓存合成的音频，相同的文本不会重复合成。缓存保存在 data/tts_cache 下。重启后生效。",
+                    },
+                    "provider_tts_settings.cache_max_mb": {
+                        "description": "TTS 音频缓存大小(MB)",
+                        "type": "int",
+                        "condition": {
+                            "provider_tts_settings.cache_enable": True,
+                        },
+                    },
+                    "provider_tts_settings.max_concurrency": {
+                        "description": "TTS 并发合成数",
+                        "type": "int",
+                        "hint": "多段回复会并发合成语音。此处为每个 TTS 提供商同时进行的合成请求数量上限，0 表示不限制。重启后生效。",
+                    },
                 },
             },
         },
@@ -2225,6 +2371,27 @@ CONFIG_METADATA_3 = {
                         "description": "速率限制策略",
                         "type": "string",
                         "options": ["stall", "discard"],
+                        "hint": "stall: 等待直到获得许可，等待期间不占用并发处理的名额；需要等待的时间超过一个时间窗口（即积压过多）时丢弃该消息，旧版本会一直等待。discard: 直接丢弃。",
+                    },
+                    "platform_settings.rate_limit.user_count": {
+                        "description": "每个用户的消息速率限制计数",
+                        "type": "int",
+                        "hint": "同一用户在所有会话中的消息总数限制，时间窗口与上方相同。0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.group_count": {
+                        "description": "每个群组的消息速率限制计数",
+                        "type": "int",
+                        "hint": "0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.platform_count": {
+                        "description": "每个平台的消息速率限制计数",
+                        "type": "int",
+                        "hint": "0 表示不限制。",
+                    },
+                    "platform_settings.rate_limit.global_count": {
+                        "description": "全局消息速率限制计数",
+                        "type": "int",
+                        "hint": "所有平台、会话的消息总数限制，可用于控制 LLM 请求的总预算。0 表示不限制。",
                     },
                 },
             },
@@ -2272,6 +2439,22 @@ CONFIG_METADATA_3 = {
                         "items": {"type": "string"},
                         "hint": "额外的屏蔽关键词列表，支持正则表达式。",
                     },
+                    "content_safety.internal_keywords.normalize": {
+                        "description": "忽略全半角与大小写",
+                        "type": "bool",
+                        "hint": "检查前进行 NFKC 规范化（全角转半角等）并忽略大小写。",
+                        "condition": {
+                            "content_safety.internal_keywords.enable": True,
+                        },
+                    },
+                    "content_safety.internal_keywords.traditional_to_simplified": {
+                        "description": "繁体转简体",
+                        "type": "bool",
+                        "hint": "检查前将繁体转换为简体，需要安装 opencc。",
+                        "condition": {
+                            "content_safety.internal_keywords.enable": True,
+                        },
+                    },
                 },
             },
             "t2i": {
@@ -2491,12 +2674,51 @@ CONFIG_METADATA_3_SYSTEM = {
                         "hint": "此处的值由文转图模板管理页面进行维护。",
                         "invisible": True,
                     },
+                    "t2i_local_workers": {
+                        "description": "本地渲染并发数",
+                        "type": "int",
+                        "hint": "本地渲染在后台线程（或进程）中执行，不阻塞消息处理。此处为同时进行渲染的数量。重启后生效。",
+                        "condition": {
+                            "t2i_strategy": "local",
+                        },
+                    },
+                    "t2i_local_use_process_pool": {
+                        "description": "本地渲染使用多进程",
+                        "type": "bool",
+                        "hint": "启用后在独立进程中渲染，多核机器上可以同时渲染多张图片，每个进程会额外占用一些内存。重启后生效。",
+                        "condition": {
+                            "t2i_strategy": "local",
+                        },
+                    },
+                    "t2i_cache_max_mb": {
+                        "description": "文本转图像缓存大小(MB)",
+                        "type": "int",
+                        "hint": "相同的文本会直接使用缓存的图片，缓存保存在 data/t2i_cache 下。0 表示不缓存。重启后生效。",
+                    },
+                    "t2i_url_cache_ttl": {
+                        "description": "文本转图像 URL 缓存时间(秒)",
+                        "type": "int",
+                        "hint": "使用远程渲染服务并以 URL 发送图片时，相同文本的图片 URL 的缓存时间。0 表示不缓存。重启后生效。",
+                        "condition": {
+                            "t2i_strategy": "remote",
+                        },
+                    },
                     "log_level": {
                         "description": "控制台日志级别",
                         "type": "string",
                         "hint": "控制台输出日志的级别。",
                         "options": ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
                     },
+                    "metrics_upload_enable": {
+                        "description": "上传匿名使用统计",
+                        "type": "bool",
+                        "hint": "上传消息数、模型调用次数等匿名统计数据，帮助我们了解 AstrBot 的使用情况。不包含消息内容和用户信息。关闭后本地的消息统计不受影响。",
+                    },
+                    "metrics_flush_interval": {
+                        "description": "统计数据写入间隔(秒)",
+                        "type": "int",
+                        "hint": "消息统计在内存中累加，每隔该时间批量写入数据库并上传。重启后生效。",
+                    },
                     "pip_install_arg": {
                         "description": "pip 安装额外参数",
                         "type": "string",
@@ -2527,6 +2749,32 @@ CONFIG_METADATA_3_SYSTEM = {
                         "type": "list",
                         "items": {"type": "string"},
                     },
+                    "event_bus.max_concurrency": {
+                        "description": "最大并发处理消息数",
+                        "type": "int",
+                        "hint": "同时处理的消息事件数上限。同一会话的消息总是按顺序依次处理。等待用户输入等空闲的事件不占用名额。重启后生效。",
+                    },
+                    "event_bus.max_session_pending": {
+                        "description": "单个会话最大积压消息数",
+                        "type": "int",
+                        "hint": "单个会话等待处理的消息超过此数量时，按溢出策略处理。重启后生效。",
+                    },
+                    "event_bus.max_pending": {
+                        "description": "最大积压消息总数",
+                        "type": "int",
+                        "hint": "所有会话等待处理的消息超过此数量时，暂停处理新的消息直到积压减少。事件队列同样最多保存此数量的消息，队列满时按溢出策略丢弃。重启后生效。",
+                    },
+                    "event_bus.overflow_policy": {
+                        "description": "积压溢出策略",
+                        "type": "string",
+                        "hint": "`drop_oldest` 丢弃最早的消息，`drop_newest` 丢弃最新的消息，`coalesce` 合并同一发送者的重复消息，并在仍然溢出时丢弃最早的消息。重启后生效。",
+                        "options": ["drop_oldest", "drop_newest", "coalesce"],
+                    },
+                    "event_bus.max_permit_hold": {
+                        "description": "单个消息最长占用并发名额时间",
+                        "type": "float",
+                        "hint": "单位秒。处理时间超过此值的消息（如较长的工具调用）继续执行，但不再占用最大并发处理消息数的名额。0 表示不限制。重启后生效。",
+                    },
                 },
             }
         },
@@ -5,22 +5,113 @@ AstrBot 会话-对话管理器, 维护两个本地存储, 其中一个是 json 
 在一个会话中可以建立多个对话, 并且支持对话的切换和删除
 """
 
+import asyncio
 import json
-from astrbot.core import sp
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from astrbot.core import sp, logger
 from typing import Dict, List
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.po import Conversation, ConversationV2
 
 
+def _messages_size(messages: list[dict]) -> int:
+    """估算消息占用的字节数"""
+    return sum(len(json.dumps(message)) for message in messages)
+
+
+@dataclass
+class _CachedConversation:
+    """内存中的活跃对话。history 是历史记录末尾的一个窗口, pending 是尚未写入数据库的追加操作。"""
+
+    conv: ConversationV2
+    history: list[dict]
+    complete: bool
+    """history 是否包含了完整的历史记录"""
+    pending: list[dict] = field(default_factory=list)
+    pending_replace_last: int = 0
+    """写入 pending 之前需要先从数据库中删除的最近历史记录条数"""
+    size: int = 0
+    """history 的估算字节数, 随追加和替换增量更新"""
+    last_access: float = field(default_factory=time.monotonic)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending) or self.pending_replace_last > 0
+
+    def can_serve(self, history_limit: int | None) -> bool:
+        if self.complete:
+            return True
+        return history_limit is not None and len(self.history) >= history_limit
+
+    def tail(self, history_limit: int | None) -> list[dict]:
+        """返回最近的 history_limit 条历史记录, 并从其中第一条 user 消息开始, 保证上下文从一轮对话的开头开始"""
+        if history_limit is None or (
+            self.complete and history_limit >= len(self.history)
+        ):
+            return self.history
+        tail = self.history[max(0, len(self.history) - history_limit) :]
+        index = next(
+            (i for i, item in enumerate(tail) if item.get("role") == "user"), None
+        )
+        if index:
+            tail = tail[index:]
+        return tail
+
+    def apply_to_pending(self, messages: list[dict], replace_last: int):
+        if replace_last > len(self.pending):
+            self.pending_replace_last += replace_last - len(self.pending)
+            self.pending = []
+        elif replace_last > 0:
+            del self.pending[len(self.pending) - replace_last :]
+        self.pending.extend(messages)
+
+    def apply_to_history(self, messages: list[dict], replace_last: int):
+        if replace_last >= len(self.history):
+            if replace_last > 0:
+                self.history = []
+                self.size = 0
+        elif replace_last > 0:
+            removed = self.history[len(self.history) - replace_last :]
+            del self.history[len(self.history) - replace_last :]
+            self.size -= _messages_size(removed)
+        self.history.extend(messages)
+        self.size += _messages_size(messages)
+
+    def set_history(self, history: list[dict]):
+        self.history = history
+        self.size = _messages_size(history)
+
+
 class ConversationManager:
-    """负责管理会话与 LLM 的对话，某个会话当前正在用哪个对话。"""
+    """负责管理会话与 LLM 的对话，某个会话当前正在用哪个对话。
 
-    def __init__(self, db_helper: BaseDatabase):
+    活跃对话会被缓存在内存中, 新的历史记录先写入缓存, 再每隔 save_interval 秒批量写入数据库。
+    """
+
+    def __init__(
+        self,
+        db_helper: BaseDatabase,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+        cache_idle_seconds: int = 1800,
+    ):
         self.session_conversations: Dict[str, str] = {}
         self.db = db_helper
         self.save_interval = 60  # 每 60 秒保存一次
-
-    def _convert_conv_from_v2_to_v1(self, conv_v2: ConversationV2) -> Conversation:
+        self.cache_max_bytes = cache_max_bytes
+        """对话缓存的最大字节数(估算值)"""
+        self.cache_idle_seconds = cache_idle_seconds
+        """对话在缓存中闲置超过该时间后会被移出缓存"""
+        self._cache: OrderedDict[str, _CachedConversation] = OrderedDict()
+        self._cache_bytes = 0
+        """缓存中所有对话的估算字节数之和"""
+        self._cache_lock = asyncio.Lock()
+
+    def _convert_conv_from_v2_to_v1(
+        self, conv_v2: ConversationV2, history: list[dict] | None = None
+    ) -> Conversation:
         """将 ConversationV2 对象转换为 Conversation 对象"""
         created_at = int(conv_v2.created_at.timestamp())
         updated_at = int(conv_v2.updated_at.timestamp())
@@ -28,13 +119,125 @@ class ConversationManager:
             platform_id=conv_v2.platform_id,
             user_id=conv_v2.user_id,
             cid=conv_v2.conversation_id,
-            history=json.dumps(conv_v2.content or []),
+            history=json.dumps(history or []),
             title=conv_v2.title,
             persona_id=conv_v2.persona_id,
             created_at=created_at,
             updated_at=updated_at,
         )
 
+    # ====
+    # 对话缓存
+    # ====
+
+    def _cache_put(self, entry: _CachedConversation) -> list[_CachedConversation]:
+        """放入缓存, 返回因超出字节预算而被移出的对话。
+
+        修改缓存中对话的 history 前需要先用 _cache_pop 取出, 修改后再放回, 以保持 _cache_bytes 正确。
+        """
+        cid = entry.conv.conversation_id
+        entry.last_access = time.monotonic()
+        self._cache_pop(cid)
+        self._cache[cid] = entry
+        self._cache_bytes += entry.size
+        evicted = []
+        while self._cache_bytes > self.cache_max_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self._cache_bytes -= old.size
+            evicted.append(old)
+        return evicted
+
+    def _cache_pop(self, cid: str) -> _CachedConversation | None:
+        entry = self._cache.pop(cid, None)
+        if entry:
+            self._cache_bytes -= entry.size
+        return entry
+
+    async def _load_to_cache(
+        self, conversation_id: str, history_limit: int | None
+    ) -> _CachedConversation | None:
+        entry = self._cache.get(conversation_id)
+        if entry and entry.can_serve(history_limit):
+            entry.last_access = time.monotonic()
+            self._cache.move_to_end(conversation_id)
+            return entry
+
+        async with self._cache_lock:
+            if entry:
+                # 先把未保存的记录写入数据库, 再从数据库读取更长的历史记录
+                await self._flush_entries([entry])
+            conv = await self.db.get_conversation_by_id(cid=conversation_id)
+            if not conv:
+                return None
+            history = await self.db.get_conversation_messages(
+                cid=conversation_id, limit=history_limit
+            )
+            new_entry = _CachedConversation(
+                conv=conv,
+                history=history,
+                complete=history_limit is None or len(history) < history_limit,
+                size=_messages_size(history),
+            )
+            # 读取期间可能有新的记录被追加到旧的缓存中
+            entry = self._cache.get(conversation_id)
+            if entry and entry.dirty:
+                new_entry.pending = entry.pending
+                new_entry.pending_replace_last = entry.pending_replace_last
+                new_entry.apply_to_history(entry.pending, entry.pending_replace_last)
+            evicted = self._cache_put(new_entry)
+            await self._flush_entries(evicted)
+        return new_entry
+
+    async def _flush_entries(self, entries: list[_CachedConversation]):
+        """将对话缓存中未保存的记录在一个事务中写入数据库"""
+        flushing = []
+        for entry in entries:
+            if not entry.dirty:
+                continue
+            flushing.append((entry, entry.pending, entry.pending_replace_last))
+            entry.pending, entry.pending_replace_last = [], 0
+        if not flushing:
+            return
+        try:
+            await self.db.batch_append_conversation_messages(
+                [
+                    (entry.conv.conversation_id, pending, replace_last)
+                    for entry, pending, replace_last in flushing
+                ]
+            )
+        except Exception as e:
+            logger.error(f"保存对话历史记录失败: {e}")
+            # 放回缓存中, 等待下次保存
+            for entry, pending, replace_last in flushing:
+                newer, newer_replace_last = entry.pending, entry.pending_replace_last
+                entry.pending, entry.pending_replace_last = pending, replace_last
+                entry.apply_to_pending(newer, newer_replace_last)
+                if entry.conv.conversation_id not in self._cache:
+                    self._cache[entry.conv.conversation_id] = entry
+                    self._cache_bytes += entry.size
+
+    async def flush(self):
+        """将所有对话缓存中未保存的记录写入数据库"""
+        async with self._cache_lock:
+            await self._flush_entries(list(self._cache.values()))
+
+    async def periodic_flush(self):
+        """每隔 save_interval 秒保存一次对话缓存, 并移出闲置的对话"""
+        while True:
+            await asyncio.sleep(self.save_interval)
+            try:
+                async with self._cache_lock:
+                    now = time.monotonic()
+                    idle = [
+                        cid
+                        for cid, entry in self._cache.items()
+                        if now - entry.last_access > self.cache_idle_seconds
+                    ]
+                    evicted = [self._cache_pop(cid) for cid in idle]
+                    await self._flush_entries(list(self._cache.values()) + evicted)
+            except Exception as e:
+                logger.error(f"定时保存对话历史记录失败: {e}")
+
     async def new_conversation(
         self,
         unified_msg_origin: str,
@@ -64,6 +267,18 @@ class ConversationManager:
             title=title,
             persona_id=persona_id,
         )
+        history = list(content or [])
+        evicted = self._cache_put(
+            _CachedConversation(
+                conv=conv,
+                history=history,
+                complete=True,
+                size=_messages_size(history),
+            )
+        )
+        if evicted:
+            async with self._cache_lock:
+                await self._flush_entries(evicted)
         self.session_conversations[unified_msg_origin] = conv.conversation_id
         await sp.session_put(unified_msg_origin, "sel_conv_id", conv.conversation_id)
         return conv.conversation_id
@@ -90,7 +305,10 @@ class ConversationManager:
         if not conversation_id:
             conversation_id = self.session_conversations.get(unified_msg_origin)
         if conversation_id:
-            await self.db.delete_conversation(cid=conversation_id)
+            # 与保存缓存互斥, 避免正在保存的记录在删除之后写入
+            async with self._cache_lock:
+                self._cache_pop(conversation_id)
+                await self.db.delete_conversation(cid=conversation_id)
             curr_cid = await self.get_curr_conversation_id(unified_msg_origin)
             if curr_cid == conversation_id:
                 self.session_conversations.pop(unified_msg_origin, None)
@@ -102,7 +320,14 @@ class ConversationManager:
         Args:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
         """
-        await self.db.delete_conversations_by_user_id(user_id=unified_msg_origin)
+        async with self._cache_lock:
+            for cid in [
+                cid
+                for cid, entry in self._cache.items()
+                if entry.conv.user_id == unified_msg_origin
+            ]:
+                self._cache_pop(cid)
+            await self.db.delete_conversations_by_user_id(user_id=unified_msg_origin)
         self.session_conversations.pop(unified_msg_origin, None)
         await sp.session_remove(unified_msg_origin, "sel_conv_id")
 
@@ -126,42 +351,75 @@ class ConversationManager:
         unified_msg_origin: str,
         conversation_id: str,
         create_if_not_exists: bool = False,
+        history_limit: int | None = None,
     ) -> Conversation | None:
         """获取会话的对话
 
         Args:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            history_limit (int): 只读取最近的 history_limit 条历史记录, 为 None 时读取全部
         Returns:
             conversation (Conversation): 对话对象
         """
-        conv = await self.db.get_conversation_by_id(cid=conversation_id)
-        if not conv and create_if_not_exists:
+        entry = await self._load_to_cache(conversation_id, history_limit)
+        if not entry and create_if_not_exists:
             # 如果对话不存在且需要创建，则新建一个对话
             conversation_id = await self.new_conversation(unified_msg_origin)
-            conv = await self.db.get_conversation_by_id(cid=conversation_id)
+            entry = await self._load_to_cache(conversation_id, history_limit)
         conv_res = None
-        if conv:
-            conv_res = self._convert_conv_from_v2_to_v1(conv)
+        if entry:
+            conv_res = self._convert_conv_from_v2_to_v1(
+                entry.conv, entry.tail(history_limit)
+            )
         return conv_res
 
+    async def _get_histories(
+        self, convs: list[ConversationV2]
+    ) -> dict[str, list[dict]]:
+        """批量读取多个对话的完整历史记录, 缓存中有完整历史记录的对话直接使用缓存"""
+        histories = {}
+        missing = []
+        dirty = []
+        for conv in convs:
+            entry = self._cache.get(conv.conversation_id)
+            if entry and entry.complete:
+                histories[conv.conversation_id] = entry.history
+                continue
+            missing.append(conv.conversation_id)
+            if entry and entry.dirty:
+                dirty.append(entry)
+        if dirty:
+            async with self._cache_lock:
+                await self._flush_entries(dirty)
+        if missing:
+            histories.update(await self.db.batch_get_conversation_messages(missing))
+        return histories
+
     async def get_conversations(
-        self, unified_msg_origin: str | None = None, platform_id: str | None = None
+        self,
+        unified_msg_origin: str | None = None,
+        platform_id: str | None = None,
+        with_history: bool = True,
     ) -> List[Conversation]:
         """获取对话列表
 
         Args:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id，可选
             platform_id (str): 平台 ID, 可选参数, 用于过滤对话
+            with_history (bool): 是否读取历史记录。为 False 时返回的对话的 history 为 "[]"
         Returns:
             conversations (List[Conversation]): 对话对象列表
         """
         convs = await self.db.get_conversations(
             user_id=unified_msg_origin, platform_id=platform_id
         )
+        histories = await self._get_histories(convs) if with_history else {}
         convs_res = []
         for conv in convs:
-            conv_res = self._convert_conv_from_v2_to_v1(conv)
+            conv_res = self._convert_conv_from_v2_to_v1(
+                conv, histories.get(conv.conversation_id)
+            )
             convs_res.append(conv_res)
         return convs_res
 
@@ -171,6 +429,7 @@ class ConversationManager:
         page_size: int = 20,
         platform_ids: list[str] | None = None,
         search_query: str = "",
+        with_history: bool = True,
         **kwargs,
     ) -> tuple[list[Conversation], int]:
         """获取过滤后的对话列表
@@ -180,6 +439,7 @@ class ConversationManager:
             page_size (int): 每页大小, 默认为 20
             platform_ids (list[str]): 平台 ID 列表, 可选
             search_query (str): 搜索查询字符串, 可选
+            with_history (bool): 是否读取历史记录。为 False 时返回的对话的 history 为 "[]"
         Returns:
             conversations (list[Conversation]): 对话对象列表
         """
@@ -190,9 +450,12 @@ class ConversationManager:
             search_query=search_query,
             **kwargs,
         )
+        histories = await self._get_histories(convs) if with_history else {}
         convs_res = []
         for conv in convs:
-            conv_res = self._convert_conv_from_v2_to_v1(conv)
+            conv_res = self._convert_conv_from_v2_to_v1(
+                conv, histories.get(conv.conversation_id)
+            )
             convs_res.append(conv_res)
         return convs_res, cnt
 
@@ -215,12 +478,60 @@ class ConversationManager:
             # 如果没有提供 conversation_id，则获取当前的
             conversation_id = await self.get_curr_conversation_id(unified_msg_origin)
         if conversation_id:
-            await self.db.update_conversation(
-                cid=conversation_id,
-                title=title,
-                persona_id=persona_id,
-                content=history,
-            )
+            async with self._cache_lock:
+                entry = self._cache.get(conversation_id)
+                if entry and history is not None:
+                    # 整体覆盖历史记录, 未保存的追加记录已无意义
+                    entry.pending, entry.pending_replace_last = [], 0
+                await self.db.update_conversation(
+                    cid=conversation_id,
+                    title=title,
+                    persona_id=persona_id,
+                    content=history,
+                )
+                if entry:
+                    if title is not None:
+                        entry.conv.title = title
+                    if persona_id is not None:
+                        entry.conv.persona_id = persona_id
+                    if history is not None and self._cache_pop(conversation_id):
+                        entry.set_history(list(history))
+                        entry.complete = True
+                        evicted = self._cache_put(entry)
+                        await self._flush_entries(evicted)
+
+    async def append_history(
+        self,
+        unified_msg_origin: str,
+        messages: list[dict],
+        conversation_id: str | None = None,
+        replace_last: int = 0,
+    ):
+        """向对话的历史记录末尾追加消息, 不会重写已有的历史记录。消息会先写入缓存, 随后批量保存到数据库。
+
+        Args:
+            unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
+            messages (List[Dict]): 要追加的消息列表
+            conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            replace_last (int): 追加前先删除最近的 replace_last 条历史记录
+        """
+        if not conversation_id:
+            conversation_id = await self.get_curr_conversation_id(unified_msg_origin)
+        if not conversation_id:
+            return
+        entry = self._cache.get(conversation_id)
+        if not entry:
+            entry = await self._load_to_cache(conversation_id, 0)
+            if not entry:
+                return
+        self._cache_pop(conversation_id)
+        entry.apply_to_pending(messages, replace_last)
+        entry.apply_to_history(messages, replace_last)
+        entry.conv.updated_at = datetime.now(timezone.utc)
+        evicted = self._cache_put(entry)
+        if evicted:
+            async with self._cache_lock:
+                await self._flush_entries(evicted)
 
     async def update_conversation_title(
         self, unified_msg_origin: str, title: str, conversation_id: str | None = None
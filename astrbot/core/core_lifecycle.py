@@ -14,9 +14,8 @@ import asyncio
 import time
 import threading
 import os
-from .event_bus import EventBus
+from .event_bus import EventBus, EventQueue
 from . import astrbot_config, html_renderer
-from asyncio import Queue
 from typing import List
 from astrbot.core.pipeline.scheduler import PipelineScheduler, PipelineContext
 from astrbot.core.star import PluginManager
@@ -24,6 +23,7 @@ from astrbot.core.platform.manager import PlatformManager
 from astrbot.core.star.context import Context
 from astrbot.core.persona_mgr import PersonaManager
 from astrbot.core.provider.manager import ProviderManager
+from astrbot.core.provider.tts_cache import tts_audio_cache
 from astrbot.core import LogBroker
 from astrbot.core.db import BaseDatabase
 from astrbot.core.updator import AstrBotUpdator
@@ -34,6 +34,11 @@ from astrbot.core.platform_message_history_mgr import PlatformMessageHistoryMana
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
 from astrbot.core.star.star_handler import star_handlers_registry, EventType
 from astrbot.core.star.star_handler import star_map
+from astrbot.core.utils.http_client import http_client
+from astrbot.core.utils.media_cache import media_cache
+from astrbot.core.utils.system_metrics import system_metrics
+from astrbot.core.utils.metrics import metric_aggregator
+from astrbot.core.utils.image_caption_cache import image_caption_cache
 
 
 class AstrBotCoreLifecycle:
@@ -82,6 +87,9 @@ class AstrBotCoreLifecycle:
 
         await self.db.initialize()
 
+        # 预加载偏好设置缓存，避免消息处理路径上的同步数据库查询
+        await sp.load_cache()
+
         await html_renderer.initialize()
 
         # 初始化 AstrBot 配置管理器
@@ -90,7 +98,11 @@ class AstrBotCoreLifecycle:
         )
 
         # 初始化事件队列
-        self.event_queue = Queue()
+        event_bus_cfg = self.astrbot_config.get("event_bus", {})
+        self.event_queue = EventQueue(
+            maxsize=max(1, event_bus_cfg.get("max_pending", 2000)),
+            overflow_policy=event_bus_cfg.get("overflow_policy", "drop_oldest"),
+        )
 
         # 初始化人格管理器
         self.persona_mgr = PersonaManager(self.db, self.astrbot_config_mgr)
@@ -170,7 +182,47 @@ class AstrBotCoreLifecycle:
         for task in self.star_context._register_tasks:
             extra_tasks.append(asyncio.create_task(task, name=task.__name__))
 
-        tasks_ = [event_bus_task, *extra_tasks]
+        # 定时保存对话缓存
+        conversation_flush_task = asyncio.create_task(
+            self.conversation_manager.periodic_flush(), name="conversation_flush"
+        )
+
+        # 定时清理媒体缓存和临时文件
+        media_cache_janitor_task = asyncio.create_task(
+            media_cache.janitor(), name="media_cache_janitor"
+        )
+        cache_janitor_tasks = [
+            asyncio.create_task(
+                tts_audio_cache.janitor(clean_temp=False), name="tts_cache_janitor"
+            )
+        ]
+        if html_renderer.render_cache is not None:
+            cache_janitor_tasks.append(
+                asyncio.create_task(
+                    html_renderer.render_cache.janitor(clean_temp=False),
+                    name="t2i_cache_janitor",
+                )
+            )
+
+        # 定时采样系统资源占用，供 WebUI 统计接口读取
+        system_metrics_task = asyncio.create_task(
+            system_metrics.run(), name="system_metrics"
+        )
+
+        # 定时批量写入指标
+        metric_flush_task = asyncio.create_task(
+            metric_aggregator.run(), name="metric_flush"
+        )
+
+        tasks_ = [
+            event_bus_task,
+            conversation_flush_task,
+            media_cache_janitor_task,
+            *cache_janitor_tasks,
+            system_metrics_task,
+            metric_flush_task,
+            *extra_tasks,
+        ]
         for task in tasks_:
             self.curr_tasks.append(
                 asyncio.create_task(self._task_wrapper(task), name=task.get_name())
@@ -233,6 +285,11 @@ class AstrBotCoreLifecycle:
 
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
+        await self.conversation_manager.flush()
+        await image_caption_cache.flush()
+        await metric_aggregator.flush()
+        await html_renderer.terminate()
+        await http_client.close()
         self.dashboard_shutdown_event.set()
 
         # 再次遍历curr_tasks等待每个任务真正结束
@@ -248,6 +305,9 @@ class AstrBotCoreLifecycle:
         """重启 AstrBot 核心生命周期管理类, 终止各个管理器并重新加载平台实例"""
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
+        await self.conversation_manager.flush()
+        await image_caption_cache.flush()
+        await metric_aggregator.flush()
         self.dashboard_shutdown_event.set()
         threading.Thread(
             target=self.astrbot_updator._reboot, name="restart", daemon=True
@@ -89,6 +89,25 @@ class BaseDatabase(abc.ABC):
         """Get platform statistics within the specified offset in seconds and group by platform_id."""
         ...
 
+    @abc.abstractmethod
+    async def get_platform_message_total(self) -> int:
+        """Get the total message count across all platforms."""
+        ...
+
+    @abc.abstractmethod
+    async def get_grouped_platform_stats(
+        self, offset_sec: int = 86400
+    ) -> list[tuple[str, int]]:
+        """Get (platform_id, message count) within the specified offset in seconds."""
+        ...
+
+    @abc.abstractmethod
+    async def get_platform_stats_timeline(
+        self, offset_sec: int = 86400
+    ) -> list[tuple[datetime.datetime, int]]:
+        """Get hourly (timestamp, message count) summed over all platforms within the specified offset in seconds."""
+        ...
+
     @abc.abstractmethod
     async def get_conversations(
         self, user_id: str | None = None, platform_id: str | None = None
@@ -149,6 +168,43 @@ class BaseDatabase(abc.ABC):
         """Update a conversation's history."""
         ...
 
+    @abc.abstractmethod
+    async def get_conversation_messages(
+        self, cid: str, limit: int | None = None
+    ) -> list[dict]:
+        """Get the history messages of a conversation in order.
+
+        If limit is given, only the last `limit` messages are returned.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def batch_get_conversation_messages(
+        self, cids: list[str]
+    ) -> dict[str, list[dict]]:
+        """Get the full history messages of several conversations in order, keyed by cid."""
+        ...
+
+    @abc.abstractmethod
+    async def append_conversation_messages(
+        self, cid: str, messages: list[dict], replace_last: int = 0
+    ) -> None:
+        """Append messages to the end of a conversation's history.
+
+        If replace_last > 0, the last `replace_last` stored messages are removed before appending.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def batch_append_conversation_messages(
+        self, items: list[tuple[str, list[dict], int]]
+    ) -> None:
+        """Append messages to several conversations in a single transaction.
+
+        Each item is a tuple of (cid, messages, replace_last), see `append_conversation_messages`.
+        """
+        ...
+
     @abc.abstractmethod
     async def delete_conversation(self, cid: str) -> None:
         """Delete a conversation by its ID."""
@@ -260,6 +316,11 @@ class BaseDatabase(abc.ABC):
         """Get all preferences for a specific scope ID or key."""
         ...
 
+    @abc.abstractmethod
+    async def get_all_preferences(self) -> list[Preference]:
+        """Get all preference records."""
+        ...
+
     @abc.abstractmethod
     async def remove_preference(self, scope: str, scope_id: str, key: str) -> None:
         """Remove a preference by scope ID and key."""
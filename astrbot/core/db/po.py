@@ -7,6 +7,7 @@ from sqlmodel import (
     Text,
     JSON,
     UniqueConstraint,
+    Index,
     Field,
 )
 from typing import Optional, TypedDict
@@ -36,6 +37,30 @@ class PlatformStat(SQLModel, table=True):
     )
 
 
+class PlatformStatDaily(SQLModel, table=True):
+    """按天汇总的 platform_stats，由 platform_stats 表上的触发器增量维护。
+
+    用于快速统计总消息数和较长时间范围内的消息数。
+    """
+
+    __tablename__ = "platform_stats_daily"
+
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": True})
+    day: str = Field(nullable=False)  # YYYY-MM-DD
+    platform_id: str = Field(nullable=False)
+    platform_type: str = Field(nullable=False)
+    count: int = Field(default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "day",
+            "platform_id",
+            "platform_type",
+            name="uix_platform_stats_daily",
+        ),
+    )
+
+
 class ConversationV2(SQLModel, table=True):
     __tablename__ = "conversations"
 
@@ -51,6 +76,7 @@ class ConversationV2(SQLModel, table=True):
     platform_id: str = Field(nullable=False)
     user_id: str = Field(nullable=False)
     content: Optional[list] = Field(default=None, sa_type=JSON)
+    """Deprecated since the history is moved to `conversation_messages` table. Always None for new records."""
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -64,6 +90,35 @@ class ConversationV2(SQLModel, table=True):
             "conversation_id",
             name="uix_conversation_id",
         ),
+        Index("ix_conversations_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+class ConversationMessage(SQLModel, table=True):
+    """A single message of a conversation's LLM history.
+
+    Histories are stored one row per message so that a new turn only appends
+    rows instead of rewriting the whole history.
+    """
+
+    __tablename__ = "conversation_messages"
+
+    id: int | None = Field(
+        primary_key=True, sa_column_kwargs={"autoincrement": True}, default=None
+    )
+    conversation_id: str = Field(max_length=36, nullable=False)
+    seq: int = Field(nullable=False)
+    """Position of the message in the conversation, starting from 0."""
+    content: dict = Field(sa_type=JSON, nullable=False)
+    """An OpenAI-format message dict, such as {"role": "user", "content": "..."}."""
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint(
+            "conversation_id",
+            "seq",
+            name="uix_conversation_message_seq",
+        ),
     )
 
 
@@ -153,6 +208,15 @@ class PlatformMessageHistory(SQLModel, table=True):
         sa_column_kwargs={"onupdate": datetime.now(timezone.utc)},
     )
 
+    __table_args__ = (
+        Index(
+            "ix_platform_message_history_platform_user_created_at",
+            "platform_id",
+            "user_id",
+            "created_at",
+        ),
+    )
+
 
 class Attachment(SQLModel, table=True):
     """This class represents attachments for messages in AstrBot.
@@ -1,11 +1,15 @@
 import asyncio
+import json
 import typing as T
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from astrbot.core.db import BaseDatabase
+from astrbot.core.db.write_queue import WriteQueue
 from astrbot.core.db.po import (
     ConversationV2,
+    ConversationMessage,
     PlatformStat,
+    PlatformStatDaily,
     PlatformMessageHistory,
     Attachment,
     Persona,
@@ -16,10 +20,67 @@ from astrbot.core.db.po import (
 )
 
 from sqlmodel import select, update, delete, text, func, or_, desc, col
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, event
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
 
 NOT_GIVEN = T.TypeVar("NOT_GIVEN")
 
+_PLATFORM_STATS_ROLLUP_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS platform_stats_daily_ai AFTER INSERT ON platform_stats BEGIN
+        INSERT INTO platform_stats_daily (day, platform_id, platform_type, count)
+        VALUES (substr(new.timestamp, 1, 10), new.platform_id, new.platform_type, new.count)
+        ON CONFLICT(day, platform_id, platform_type) DO UPDATE SET
+            count = platform_stats_daily.count + EXCLUDED.count;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS platform_stats_daily_au AFTER UPDATE ON platform_stats BEGIN
+        UPDATE platform_stats_daily SET count = count - old.count
+        WHERE day = substr(old.timestamp, 1, 10)
+            AND platform_id = old.platform_id AND platform_type = old.platform_type;
+        INSERT INTO platform_stats_daily (day, platform_id, platform_type, count)
+        VALUES (substr(new.timestamp, 1, 10), new.platform_id, new.platform_type, new.count)
+        ON CONFLICT(day, platform_id, platform_type) DO UPDATE SET
+            count = platform_stats_daily.count + EXCLUDED.count;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS platform_stats_daily_ad AFTER DELETE ON platform_stats BEGIN
+        UPDATE platform_stats_daily SET count = count - old.count
+        WHERE day = substr(old.timestamp, 1, 10)
+            AND platform_id = old.platform_id AND platform_type = old.platform_type;
+    END
+    """,
+]
+"""platform_stats 的变化同步到 platform_stats_daily"""
+
+_SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+]
+"""每个连接建立时执行。WAL 模式下读写互不阻塞，synchronous=NORMAL 在 WAL 下只在检查点时同步磁盘，
+busy_timeout 让等待写锁的连接重试而不是立即报 database is locked"""
+
+_SQLITE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_conversations_user_id_created_at ON conversations (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_platform_message_history_platform_user_created_at ON platform_message_history (platform_id, user_id, created_at)",
+]
+"""已有数据库中缺少的索引。新数据库由 po.py 中的模型定义创建"""
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for sql in _SQLITE_PRAGMAS:
+            cursor.execute(sql)
+    finally:
+        cursor.close()
+
 
 class SQLiteDatabase(BaseDatabase):
     def __init__(self, db_path: str) -> None:
@@ -27,12 +88,113 @@ class SQLiteDatabase(BaseDatabase):
         self.DATABASE_URL = f"sqlite+aiosqlite:///{db_path}"
         self.inited = False
         super().__init__()
+        event.listen(self.engine.sync_engine, "connect", _set_sqlite_pragmas)
+        self.write_queue = WriteQueue(self.get_db)
+        """每条消息都会触发的小写入经过此队列，合并到同一个事务中提交"""
 
     async def initialize(self) -> None:
         """Initialize the database by creating tables if they do not exist."""
         async with self.engine.begin() as conn:
             await conn.run_sync(SQLModel.metadata.create_all)
             await conn.commit()
+        await self._ensure_indexes()
+        await self._init_platform_stats_rollup()
+        await self._migrate_conversation_content()
+
+    async def _ensure_indexes(self) -> None:
+        """为已有的数据库补充索引。可以重复执行"""
+        async with self.engine.begin() as conn:
+            conn: AsyncConnection
+            for sql in _SQLITE_INDEXES:
+                await conn.execute(text(sql))
+            # 更新查询规划器的统计信息，只在需要时才会实际分析
+            await conn.execute(text("PRAGMA optimize"))
+
+    async def _init_platform_stats_rollup(self) -> None:
+        """创建维护 platform_stats_daily 的触发器，并在第一次创建时汇总已有的数据。
+
+        所有写入 platform_stats 的路径（包括版本迁移）都会经过触发器，按天汇总的数据与 platform_stats 保持一致。
+        """
+        async with self.engine.begin() as conn:
+            conn: AsyncConnection
+            result = await conn.execute(
+                text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'platform_stats_daily_ai'"
+                )
+            )
+            if result.first():
+                return
+            await conn.execute(text("DELETE FROM platform_stats_daily"))
+            await conn.execute(
+                text("""
+                INSERT INTO platform_stats_daily (day, platform_id, platform_type, count)
+                SELECT substr(timestamp, 1, 10), platform_id, platform_type, SUM(count)
+                FROM platform_stats
+                GROUP BY substr(timestamp, 1, 10), platform_id, platform_type
+                """)
+            )
+            for sql in _PLATFORM_STATS_ROLLUP_TRIGGERS:
+                await conn.execute(text(sql))
+
+    async def _migrate_conversation_content(self, batch_size: int = 100) -> None:
+        """Move the history stored in `conversations.content` into `conversation_messages`.
+
+        Migrated conversations have their content set to NULL, so this is a no-op once done.
+        """
+        migrated = 0
+        while True:
+            async with self.engine.begin() as conn:
+                conn: AsyncConnection
+                result = await conn.execute(
+                    text("""
+                    SELECT conversation_id, content FROM conversations
+                    WHERE content IS NOT NULL AND content NOT IN ('null', '[]')
+                    LIMIT :limit
+                    """),
+                    {"limit": batch_size},
+                )
+                rows = result.fetchall()
+                if not rows:
+                    break
+                now = datetime.now(timezone.utc)
+                params = []
+                for cid, content in rows:
+                    try:
+                        messages = json.loads(content)
+                    except (TypeError, ValueError):
+                        messages = []
+                    if not isinstance(messages, list):
+                        messages = []
+                    params.extend(
+                        {
+                            "conversation_id": cid,
+                            "seq": seq,
+                            "content": msg,
+                            "created_at": now,
+                        }
+                        for seq, msg in enumerate(messages)
+                        if isinstance(msg, dict)
+                    )
+                cids = [row[0] for row in rows]
+                await conn.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id).in_(cids)
+                    )
+                )
+                if params:
+                    await conn.execute(insert(ConversationMessage), params)
+                await conn.execute(
+                    update(ConversationV2)
+                    .where(col(ConversationV2.conversation_id).in_(cids))
+                    .values(content=None)
+                )
+                migrated += len(rows)
+        if migrated:
+            from astrbot.core import logger
+
+            logger.info(
+                f"已将 {migrated} 个对话的历史记录迁移到 conversation_messages 表。"
+            )
 
     # ====
     # Platform Statistics
@@ -46,28 +208,27 @@ class SQLiteDatabase(BaseDatabase):
         timestamp=None,
     ) -> None:
         """Insert a new platform statistic record."""
-        async with self.get_db() as session:
-            session: AsyncSession
-            async with session.begin():
-                if timestamp is None:
-                    timestamp = datetime.now().replace(
-                        minute=0, second=0, microsecond=0
-                    )
-                current_hour = timestamp
-                await session.execute(
-                    text("""
-                    INSERT INTO platform_stats (timestamp, platform_id, platform_type, count)
-                    VALUES (:timestamp, :platform_id, :platform_type, :count)
-                    ON CONFLICT(timestamp, platform_id, platform_type) DO UPDATE SET
-                        count = platform_stats.count + EXCLUDED.count
-                    """),
-                    {
-                        "timestamp": current_hour,
-                        "platform_id": platform_id,
-                        "platform_type": platform_type,
-                        "count": count,
-                    },
-                )
+        if timestamp is None:
+            timestamp = datetime.now().replace(minute=0, second=0, microsecond=0)
+        current_hour = timestamp
+
+        async def _job(session: AsyncSession):
+            await session.execute(
+                text("""
+                INSERT INTO platform_stats (timestamp, platform_id, platform_type, count)
+                VALUES (:timestamp, :platform_id, :platform_type, :count)
+                ON CONFLICT(timestamp, platform_id, platform_type) DO UPDATE SET
+                    count = platform_stats.count + EXCLUDED.count
+                """),
+                {
+                    "timestamp": current_hour,
+                    "platform_id": platform_id,
+                    "platform_type": platform_type,
+                    "count": count,
+                },
+            )
+
+        await self.write_queue.submit(_job)
 
     async def count_platform_stats(self) -> int:
         """Count the number of platform statistics records."""
@@ -81,6 +242,55 @@ class SQLiteDatabase(BaseDatabase):
             count = result.scalar_one_or_none()
             return count if count is not None else 0
 
+    async def get_platform_message_total(self) -> int:
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                select(func.sum(PlatformStatDaily.count)).select_from(PlatformStatDaily)
+            )
+            total = result.scalar_one_or_none()
+            return total if total is not None else 0
+
+    async def get_grouped_platform_stats(
+        self, offset_sec: int = 86400
+    ) -> T.List[T.Tuple[str, int]]:
+        async with self.get_db() as session:
+            session: AsyncSession
+            start_time = datetime.now() - timedelta(seconds=offset_sec)
+            # 完整的天使用按天汇总的数据，开头不足一天的部分使用按小时的数据
+            first_day = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+            if first_day < start_time:
+                first_day += timedelta(days=1)
+            first_day_str = first_day.strftime("%Y-%m-%d")
+            result = await session.execute(
+                text("""
+                SELECT platform_id, SUM(count) FROM (
+                    SELECT platform_id, count FROM platform_stats_daily
+                    WHERE day >= :first_day
+                    UNION ALL
+                    SELECT platform_id, count FROM platform_stats
+                    WHERE timestamp >= :start_time AND timestamp < :first_day
+                )
+                GROUP BY platform_id
+                """),
+                {"first_day": first_day_str, "start_time": start_time},
+            )
+            return [(row[0], row[1]) for row in result.all()]
+
+    async def get_platform_stats_timeline(
+        self, offset_sec: int = 86400
+    ) -> T.List[T.Tuple[datetime, int]]:
+        async with self.get_db() as session:
+            session: AsyncSession
+            start_time = datetime.now() - timedelta(seconds=offset_sec)
+            result = await session.execute(
+                select(PlatformStat.timestamp, func.sum(PlatformStat.count))
+                .where(PlatformStat.timestamp >= start_time)
+                .group_by(PlatformStat.timestamp)
+                .order_by(PlatformStat.timestamp)
+            )
+            return [(row[0], row[1]) for row in result.all()]
+
     async def get_platform_stats(self, offset_sec: int = 86400) -> T.List[PlatformStat]:
         """Get platform statistics within the specified offset in seconds and group by platform_id."""
         async with self.get_db() as session:
@@ -158,7 +368,13 @@ class SQLiteDatabase(BaseDatabase):
                 base_query = base_query.where(
                     or_(
                         col(ConversationV2.title).ilike(f"%{search_query}%"),
-                        col(ConversationV2.content).ilike(f"%{search_query}%"),
+                        col(ConversationV2.conversation_id).in_(
+                            select(ConversationMessage.conversation_id).where(
+                                col(ConversationMessage.content).ilike(
+                                    f"%{search_query}%"
+                                )
+                            )
+                        ),
                         col(ConversationV2.user_id).ilike(f"%{search_query}%"),
                     )
                 )
@@ -212,39 +428,161 @@ class SQLiteDatabase(BaseDatabase):
             async with session.begin():
                 new_conversation = ConversationV2(
                     user_id=user_id,
-                    content=content or [],
                     platform_id=platform_id,
                     title=title,
                     persona_id=persona_id,
                     **kwargs,
                 )
                 session.add(new_conversation)
+                if content:
+                    await self._insert_conversation_messages(
+                        session, new_conversation.conversation_id, content, 0
+                    )
                 return new_conversation
 
     async def update_conversation(self, cid, title=None, persona_id=None, content=None):
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
-                query = update(ConversationV2).where(
-                    col(ConversationV2.conversation_id) == cid
-                )
                 values = {}
                 if title is not None:
                     values["title"] = title
                 if persona_id is not None:
                     values["persona_id"] = persona_id
                 if content is not None:
-                    values["content"] = content
+                    # 整体覆盖历史记录
+                    await session.execute(
+                        delete(ConversationMessage).where(
+                            col(ConversationMessage.conversation_id) == cid
+                        )
+                    )
+                    await self._insert_conversation_messages(session, cid, content, 0)
+                    values["updated_at"] = datetime.now(timezone.utc)
                 if not values:
                     return
-                query = query.values(**values)
-                await session.execute(query)
+                await session.execute(
+                    update(ConversationV2)
+                    .where(col(ConversationV2.conversation_id) == cid)
+                    .values(**values)
+                )
         return await self.get_conversation_by_id(cid)
 
+    async def _insert_conversation_messages(
+        self, session: AsyncSession, cid: str, messages: list[dict], start_seq: int
+    ) -> None:
+        if not messages:
+            return
+        now = datetime.now(timezone.utc)
+        await session.execute(
+            insert(ConversationMessage),
+            [
+                {
+                    "conversation_id": cid,
+                    "seq": start_seq + i,
+                    "content": msg,
+                    "created_at": now,
+                }
+                for i, msg in enumerate(messages)
+            ],
+        )
+
+    async def get_conversation_messages(self, cid, limit=None):
+        async with self.get_db() as session:
+            session: AsyncSession
+            query = (
+                select(ConversationMessage.content)
+                .where(col(ConversationMessage.conversation_id) == cid)
+                .order_by(desc(ConversationMessage.seq))
+            )
+            if limit is not None:
+                query = query.limit(limit)
+            result = await session.execute(query)
+            messages = list(result.scalars().all())
+            messages.reverse()
+            return messages
+
+    async def batch_get_conversation_messages(self, cids, chunk_size=500):
+        histories: dict[str, list[dict]] = {cid: [] for cid in cids}
+        async with self.get_db() as session:
+            session: AsyncSession
+            for i in range(0, len(cids), chunk_size):
+                query = (
+                    select(
+                        ConversationMessage.conversation_id, ConversationMessage.content
+                    )
+                    .where(
+                        col(ConversationMessage.conversation_id).in_(
+                            cids[i : i + chunk_size]
+                        )
+                    )
+                    .order_by(
+                        ConversationMessage.conversation_id, ConversationMessage.seq
+                    )
+                )
+                result = await session.execute(query)
+                for cid, content in result.all():
+                    histories[cid].append(content)
+        return histories
+
+    async def append_conversation_messages(self, cid, messages, replace_last=0):
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await self._append_conversation_messages(
+                    session, cid, messages, replace_last
+                )
+
+    async def batch_append_conversation_messages(self, items):
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                for cid, messages, replace_last in items:
+                    await self._append_conversation_messages(
+                        session, cid, messages, replace_last
+                    )
+
+    async def _append_conversation_messages(
+        self,
+        session: AsyncSession,
+        cid: str,
+        messages: list[dict],
+        replace_last: int,
+    ) -> None:
+        if replace_last > 0:
+            last_ids = (
+                select(ConversationMessage.id)
+                .where(col(ConversationMessage.conversation_id) == cid)
+                .order_by(desc(ConversationMessage.seq))
+                .limit(replace_last)
+            )
+            await session.execute(
+                delete(ConversationMessage).where(
+                    col(ConversationMessage.id).in_(last_ids)
+                )
+            )
+        result = await session.execute(
+            select(func.max(ConversationMessage.seq)).where(
+                col(ConversationMessage.conversation_id) == cid
+            )
+        )
+        max_seq = result.scalar_one_or_none()
+        start_seq = 0 if max_seq is None else max_seq + 1
+        await self._insert_conversation_messages(session, cid, messages, start_seq)
+        await session.execute(
+            update(ConversationV2)
+            .where(col(ConversationV2.conversation_id) == cid)
+            .values(updated_at=datetime.now(timezone.utc))
+        )
+
     async def delete_conversation(self, cid):
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id) == cid
+                    )
+                )
                 await session.execute(
                     delete(ConversationV2).where(
                         col(ConversationV2.conversation_id) == cid
@@ -255,6 +593,15 @@ class SQLiteDatabase(BaseDatabase):
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id).in_(
+                            select(ConversationV2.conversation_id).where(
+                                col(ConversationV2.user_id) == user_id
+                            )
+                        )
+                    )
+                )
                 await session.execute(
                     delete(ConversationV2).where(col(ConversationV2.user_id) == user_id)
                 )
@@ -375,35 +722,36 @@ class SQLiteDatabase(BaseDatabase):
         sender_name=None,
     ):
         """Insert a new platform message history record."""
-        async with self.get_db() as session:
-            session: AsyncSession
-            async with session.begin():
-                new_history = PlatformMessageHistory(
-                    platform_id=platform_id,
-                    user_id=user_id,
-                    content=content,
-                    sender_id=sender_id,
-                    sender_name=sender_name,
-                )
-                session.add(new_history)
-                return new_history
+
+        async def _job(session: AsyncSession):
+            new_history = PlatformMessageHistory(
+                platform_id=platform_id,
+                user_id=user_id,
+                content=content,
+                sender_id=sender_id,
+                sender_name=sender_name,
+            )
+            session.add(new_history)
+            return new_history
+
+        return await self.write_queue.submit(_job)
 
     async def delete_platform_message_offset(
         self, platform_id, user_id, offset_sec=86400
     ):
         """Delete platform message history records older than the specified offset."""
-        async with self.get_db() as session:
-            session: AsyncSession
-            async with session.begin():
-                now = datetime.now()
-                cutoff_time = now - timedelta(seconds=offset_sec)
-                await session.execute(
-                    delete(PlatformMessageHistory).where(
-                        col(PlatformMessageHistory.platform_id) == platform_id,
-                        col(PlatformMessageHistory.user_id) == user_id,
-                        col(PlatformMessageHistory.created_at) < cutoff_time,
-                    )
+        cutoff_time = datetime.now() - timedelta(seconds=offset_sec)
+
+        async def _job(session: AsyncSession):
+            await session.execute(
+                delete(PlatformMessageHistory).where(
+                    col(PlatformMessageHistory.platform_id) == platform_id,
+                    col(PlatformMessageHistory.user_id) == user_id,
+                    col(PlatformMessageHistory.created_at) < cutoff_time,
                 )
+            )
+
+        await self.write_queue.submit(_job)
 
     async def get_platform_message_history(
         self, platform_id, user_id, page=1, page_size=20
@@ -508,24 +856,25 @@ class SQLiteDatabase(BaseDatabase):
 
     async def insert_preference_or_update(self, scope, scope_id, key, value):
         """Insert a new preference record or update if it exists."""
-        async with self.get_db() as session:
-            session: AsyncSession
-            async with session.begin():
-                query = select(Preference).where(
-                    Preference.scope == scope,
-                    Preference.scope_id == scope_id,
-                    Preference.key == key,
-                )
-                result = await session.execute(query)
-                existing_preference = result.scalar_one_or_none()
-                if existing_preference:
-                    existing_preference.value = value
-                else:
-                    new_preference = Preference(
-                        scope=scope, scope_id=scope_id, key=key, value=value
-                    )
-                    session.add(new_preference)
-                return existing_preference or new_preference
+
+        async def _job(session: AsyncSession):
+            query = select(Preference).where(
+                Preference.scope == scope,
+                Preference.scope_id == scope_id,
+                Preference.key == key,
+            )
+            result = await session.execute(query)
+            existing_preference = result.scalar_one_or_none()
+            if existing_preference:
+                existing_preference.value = value
+                return existing_preference
+            new_preference = Preference(
+                scope=scope, scope_id=scope_id, key=key, value=value
+            )
+            session.add(new_preference)
+            return new_preference
+
+        return await self.write_queue.submit(_job)
 
     async def get_preference(self, scope, scope_id, key):
         """Get a preference by key."""
@@ -551,19 +900,26 @@ class SQLiteDatabase(BaseDatabase):
             result = await session.execute(query)
             return result.scalars().all()
 
-    async def remove_preference(self, scope, scope_id, key):
-        """Remove a preference by scope ID and key."""
+    async def get_all_preferences(self):
+        """Get all preference records."""
         async with self.get_db() as session:
             session: AsyncSession
-            async with session.begin():
-                await session.execute(
-                    delete(Preference).where(
-                        col(Preference.scope) == scope,
-                        col(Preference.scope_id) == scope_id,
-                        col(Preference.key) == key,
-                    )
+            result = await session.execute(select(Preference))
+            return result.scalars().all()
+
+    async def remove_preference(self, scope, scope_id, key):
+        """Remove a preference by scope ID and key."""
+
+        async def _job(session: AsyncSession):
+            await session.execute(
+                delete(Preference).where(
+                    col(Preference.scope) == scope,
+                    col(Preference.scope_id) == scope_id,
+                    col(Preference.key) == key,
                 )
-            await session.commit()
+            )
+
+        await self.write_queue.submit(_job)
 
     async def clear_preferences(self, scope, scope_id):
         """Clear all preferences for a specific scope ID."""
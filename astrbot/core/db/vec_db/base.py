@@ -22,6 +22,18 @@ class BaseVecDB:
         """
         ...
 
+    @abc.abstractmethod
+    async def insert_batch(
+        self,
+        contents: list[str],
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+    ) -> list[int]:
+        """
+        批量插入文本和其对应向量，返回与 contents 顺序一致的 ID。
+        """
+        ...
+
     @abc.abstractmethod
     async def retrieve(self, query: str, top_k: int = 5) -> list[Result]:
         """
@@ -1,14 +1,49 @@
 import aiosqlite
 import os
+import re
+from astrbot.core import logger
+
+_FIELD_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# 与 documents 表同步的 FTS5 全文索引（external content），由触发器维护
+_FTS_INIT_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    text, content='documents', content_rowid='id', tokenize='{tokenize}'
+);
+CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF text ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO documents_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
 
 
 class DocumentStorage:
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        filterable_fields: list[str] | None = None,
+        enable_fts: bool = True,
+    ):
         self.db_path = db_path
         self.connection = None
         self.sqlite_init_path = os.path.join(
             os.path.dirname(__file__), "sqlite_init.sql"
         )
+        self.filterable_fields = filterable_fields or []
+        """需要建立索引的元数据字段。按这些字段过滤时使用生成列上的索引，而不是逐行解析 JSON"""
+        self._filter_columns: dict[str, str] = {}
+        """元数据字段 -> 生成列"""
+        self.enable_fts = enable_fts
+        """是否维护 FTS5 全文索引，用于关键词检索"""
+        self.fts_available = False
+        self._fts_min_term_len = 1
+        """trigram 分词器只能匹配不少于 3 个字符的词"""
 
     async def initialize(self):
         """Initialize the SQLite database and create the documents table if it doesn't exist."""
@@ -21,6 +56,76 @@ class DocumentStorage:
             await self.connection.commit()
         else:
             await self.connect()
+        await self._ensure_filter_columns()
+        if self.enable_fts:
+            await self._ensure_fts()
+
+    async def _ensure_fts(self):
+        """创建 FTS5 全文索引。trigram 分词器支持中文和任意子串匹配，不可用时（SQLite < 3.34）使用 unicode61"""
+        async with self.connection.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'documents_fts'"
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row:
+            self.fts_available = True
+            self._fts_min_term_len = 3 if "trigram" in row[0] else 1
+            return
+        for tokenize, min_term_len in (("trigram", 3), ("unicode61", 1)):
+            try:
+                await self.connection.executescript(
+                    _FTS_INIT_SQL.format(tokenize=tokenize)
+                )
+                # 为已有的文档建立索引
+                await self.connection.execute(
+                    "INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')"
+                )
+                await self.connection.commit()
+            except aiosqlite.OperationalError:
+                await self.connection.rollback()
+                continue
+            self.fts_available = True
+            self._fts_min_term_len = min_term_len
+            return
+        logger.warning("当前 SQLite 不支持 FTS5，关键词检索不可用。")
+
+    async def _ensure_filter_columns(self):
+        """为 filterable_fields 创建生成列和索引"""
+        async with self.connection.execute("PRAGMA table_xinfo(documents)") as cursor:
+            # name -> hidden，生成列的 hidden 为 2 (VIRTUAL) 或 3 (STORED)
+            columns = {row[1]: row[6] for row in await cursor.fetchall()}
+        # sqlite_init.sql 中已经为 user_id 和 group_id 创建了生成列和索引
+        for field in ("user_id", "group_id"):
+            if columns.get(field):
+                self._filter_columns[field] = field
+        for field in self.filterable_fields:
+            if field in self._filter_columns:
+                continue
+            if not _FIELD_NAME_RE.match(field):
+                raise ValueError(f"不合法的元数据字段名: {field}")
+            column = f"meta_{field}"
+            if column not in columns:
+                await self.connection.execute(
+                    f"ALTER TABLE documents ADD COLUMN {column} "
+                    f"GENERATED ALWAYS AS (json_extract(metadata, '$.{field}')) VIRTUAL"
+                )
+            await self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_documents_{column} ON documents({column})"
+            )
+            self._filter_columns[field] = column
+        await self.connection.commit()
+
+    def _build_where(self, metadata_filters: dict) -> tuple[list[str], list]:
+        where_clauses = []
+        values = []
+        for key, val in metadata_filters.items():
+            column = self._filter_columns.get(key)
+            if column:
+                where_clauses.append(f"{column} = ?")
+            else:
+                where_clauses.append("json_extract(metadata, ?) = ?")
+                values.append(f"$.{key}")
+            values.append(val)
+        return where_clauses, values
 
     async def connect(self):
         """Connect to the SQLite database."""
@@ -36,11 +141,7 @@ class DocumentStorage:
             list: The list of document IDs(primary key, not doc_id) that match the filters.
         """
         # metadata filter -> SQL WHERE clause
-        where_clauses = []
-        values = []
-        for key, val in metadata_filters.items():
-            where_clauses.append(f"json_extract(metadata, '$.{key}') = ?")
-            values.append(val)
+        where_clauses, values = self._build_where(metadata_filters)
         if ids is not None and len(ids) > 0:
             ids = [str(i) for i in ids if i != -1]
             where_clauses.append("id IN ({})".format(",".join("?" * len(ids))))
@@ -55,6 +156,52 @@ class DocumentStorage:
                 result.append(await self.tuple_to_dict(row))
         return result
 
+    async def get_ids(self, metadata_filters: dict) -> list[int]:
+        """Retrieve the ids(primary key) of documents that match the metadata filters.
+
+        Args:
+            metadata_filters (dict): The metadata filters to apply.
+
+        Returns:
+            list: The list of document IDs(primary key, not doc_id).
+        """
+        where_clauses, values = self._build_where(metadata_filters)
+        where_sql = " AND ".join(where_clauses) or "1=1"
+        async with self.connection.cursor() as cursor:
+            await cursor.execute("SELECT id FROM documents WHERE " + where_sql, values)
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def search_fts(
+        self, query: str, limit: int, metadata_filters: dict | None = None
+    ) -> list[int]:
+        """Retrieve the ids(primary key) of documents that match the query terms, ordered by BM25.
+
+        Args:
+            query (str): The query text. Terms are split by whitespace and matched with OR.
+            limit (int): The maximum number of ids to return.
+            metadata_filters (dict): The metadata filters to apply.
+
+        Returns:
+            list: The list of document IDs(primary key, not doc_id).
+        """
+        if not self.fts_available:
+            return []
+        terms = [term for term in query.split() if len(term) >= self._fts_min_term_len]
+        if not terms:
+            return []
+        # 每个词作为一个短语，避免 FTS5 的查询语法
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        where_clauses, values = self._build_where(metadata_filters or {})
+        where_sql = "".join(" AND " + clause for clause in where_clauses)
+        sql = (
+            "SELECT documents.id FROM documents_fts "
+            "JOIN documents ON documents.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ?" + where_sql + " ORDER BY rank LIMIT ?"
+        )
+        async with self.connection.cursor() as cursor:
+            await cursor.execute(sql, [match, *values, limit])
+            return [row[0] for row in await cursor.fetchall()]
+
     async def get_document_by_doc_id(self, doc_id: str):
         """Retrieve a document by its doc_id.
 
@@ -1,24 +1,375 @@
+"""
+FAISS 向量存储
+
+支持以下索引类型（index_type），均使用 L2 距离：
+
+- flat: 暴力搜索，召回率 100%。10 万条 1024 维向量单次查询约 10-30 ms，耗时随数据量线性增长，适合中小规模的知识库。
+- hnsw: 图索引，无需训练。召回率通常在 95%-99%，由 ef_search 控制（越大越准越慢），百万级数据查询约 1-5 ms。
+  内存占用比 flat 多约 hnsw_m * 8 字节/条，构建较慢，且不支持删除单条向量（删除时需要重建）。
+- ivf_flat: 倒排索引，需要训练。每次查询只扫描 nprobe 个聚类（共 nlist 个），召回率随 nprobe 增大而提高，
+  nprobe = nlist 时等价于 flat。百万级数据在 nprobe=16 时查询约 2-10 ms，召回率约 90%-98%。
+- ivf_pq: 在 ivf_flat 的基础上对向量进行乘积量化（pq_m 个子空间，每个 8 bit），内存占用降低到约 pq_m 字节/条，
+  但距离是近似的，召回率一般为 70%-90%，建议与重排序（rerank）一起使用。适合千万级数据或内存受限的场景。
+
+需要训练的索引类型在向量数量达到 train_threshold 之前使用 flat 索引，达到后自动用已有的向量训练并迁移。
+修改 index_type 后，已有的索引会在载入时迁移到新的类型。
+"""
+
 try:
     import faiss
 except ModuleNotFoundError:
     raise ImportError(
         "faiss 未安装。请使用 'pip install faiss-cpu' 或 'pip install faiss-gpu' 安装。"
     )
+import asyncio
+import math
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import numpy as np
+from astrbot.core import logger
+
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+_faiss_executor = ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="faiss"
+)
+"""执行 FAISS 搜索、训练和索引读写的线程池。FAISS 在这些操作中会释放 GIL，不会阻塞事件循环"""
+
+
+class _AsyncRWLock:
+    """异步读写锁。多个读者可以同时持有，写者独占，等待中的写者优先于新的读者"""
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @asynccontextmanager
+    async def read(self):
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: not self._writer and not self._waiting_writers
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._cond:
+            self._waiting_writers += 1
+            try:
+                await self._cond.wait_for(
+                    lambda: not self._writer and self._readers == 0
+                )
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._writer = False
+                self._cond.notify_all()
 
 
 class EmbeddingStorage:
-    def __init__(self, dimension: int, path: str = None):
+    def __init__(
+        self,
+        dimension: int,
+        path: str = None,
+        save_delay: float = 5,
+        index_type: str = "flat",
+        nlist: int | None = None,
+        nprobe: int = 16,
+        hnsw_m: int = 32,
+        ef_search: int = 64,
+        pq_m: int | None = None,
+        train_threshold: int = 10000,
+        compact_ratio: float = 0.2,
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"不支持的索引类型: {index_type}，可选: {INDEX_TYPES}")
         self.dimension = dimension
         self.path = path
+        self.save_delay = save_delay
+        """索引变化后延迟写入磁盘的时间（秒）"""
+        self.index_type = index_type
+        self.nlist = nlist
+        """IVF 聚类数量，默认根据训练时的向量数量计算"""
+        self.nprobe = nprobe
+        """IVF 每次查询扫描的聚类数量"""
+        self.hnsw_m = hnsw_m
+        """HNSW 每个节点的邻居数量"""
+        self.ef_search = ef_search
+        """HNSW 查询时的候选队列长度"""
+        self.pq_m = pq_m
+        """PQ 子空间数量，必须整除向量维度，默认自动选择"""
+        self.train_threshold = train_threshold
+        """需要训练的索引在向量数量达到该值后才进行训练"""
+        self.compact_ratio = compact_ratio
+        """hnsw 和 ivf 索引删除的向量占比超过该值后，在后台重建索引"""
+
         self.index = None
-        if path and os.path.exists(path):
-            self.index = faiss.read_index(path)
+        """FAISS 索引，在 initialize() 中载入"""
+        self._dirty = False
+        self._save_task: asyncio.Task | None = None
+        self._rwlock = _AsyncRWLock()
+        """搜索持有读锁，修改索引持有写锁"""
+        self._write_mutex = asyncio.Lock()
+        """串行化插入、迁移等修改索引的操作"""
+        self._tombstones: set[int] = set()
+        """已删除但仍在索引中的向量。HNSW 不支持删除单条向量，只能在搜索时过滤，直到重建索引。
+        与索引一起保存在 path + ".tombstones.npy" 中"""
+        self._removed = 0
+        """上次重建索引后删除的向量数量"""
+        self._compact_task: asyncio.Task | None = None
+
+    @staticmethod
+    async def _run(func, *args):
+        """在 FAISS 线程池中执行 func"""
+        fut = asyncio.get_running_loop().run_in_executor(_faiss_executor, func, *args)
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            # 线程中的操作无法取消，等待其完成后再释放锁
+            await asyncio.wait([fut])
+            raise
+
+    async def initialize(self):
+        """载入或创建索引。如果配置的索引类型与已有的索引不一致，会进行迁移"""
+        if self.index is not None:
+            return
+        async with self._write_mutex:
+            if self.index is not None:
+                return
+            index, tombstones = await self._run(self._load_index)
+            self._apply_search_params(index)
+            self.index = index
+            self._tombstones = tombstones
+            self._removed = len(tombstones)
+            await self._migrate_locked()
+
+    @staticmethod
+    def _tombstones_path(path: str) -> str:
+        return path + ".tombstones.npy"
+
+    def _load_index(self) -> tuple[object, set[int]]:
+        """载入索引和墓碑，在线程池中执行"""
+        if self.path and os.path.exists(self.path):
+            index = faiss.read_index(self.path)
+            tombstones = set()
+            tombstones_path = self._tombstones_path(self.path)
+            if os.path.exists(tombstones_path):
+                tombstones = set(np.load(tombstones_path).tolist())
+            return index, tombstones
+        index = self._create_index(
+            "flat" if self._needs_training(self.index_type) else self.index_type, 0
+        )
+        return index, set()
+
+    @staticmethod
+    def _needs_training(index_type: str) -> bool:
+        return index_type in ("ivf_flat", "ivf_pq")
+
+    @staticmethod
+    def _index_kind(index) -> str:
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf = faiss.downcast_index(ivf)
+            return "ivf_pq" if isinstance(ivf, faiss.IndexIVFPQ) else "ivf_flat"
+        if isinstance(index, faiss.IndexIDMap):
+            index = faiss.downcast_index(index.index)
+        if isinstance(index, faiss.IndexHNSW):
+            return "hnsw"
+        return "flat"
+
+    def _create_index(self, index_type: str, n: int):
+        """创建指定类型的空索引，n 为用于训练的向量数量"""
+        d = self.dimension
+        if index_type == "flat":
+            factory = "IDMap,Flat"
+        elif index_type == "hnsw":
+            factory = f"IDMap,HNSW{self.hnsw_m}"
+        else:
+            # 每个聚类至少需要 39 个训练向量
+            nlist = self.nlist or min(max(1, int(4 * n**0.5)), max(1, n // 39))
+            if index_type == "ivf_flat":
+                factory = f"IVF{nlist},Flat"
+            else:
+                # 每个子空间至少 4 维
+                pq_m = self.pq_m or next(
+                    (m for m in (64, 32, 16, 8, 4, 2) if d % m == 0 and d // m >= 4),
+                    1,
+                )
+                factory = f"IVF{nlist},PQ{pq_m}"
+        return faiss.index_factory(d, factory, faiss.METRIC_L2)
+
+    @staticmethod
+    def _export_ids(index) -> np.ndarray:
+        """导出索引中所有向量的 ID"""
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is None:
+            return faiss.vector_to_array(index.id_map).astype(np.int64)
+        id_lists = []
+        for list_no in range(ivf.nlist):
+            size = ivf.invlists.list_size(list_no)
+            if size:
+                id_lists.append(
+                    faiss.rev_swig_ptr(ivf.invlists.get_ids(list_no), size).copy()
+                )
+        if not id_lists:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(id_lists).astype(np.int64)
+
+    def _export(self, index) -> tuple[np.ndarray, np.ndarray]:
+        """导出索引中所有的向量和 ID。ivf_pq 导出的是量化后的近似向量"""
+        ids = self._export_ids(index)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is None:
+            vectors = faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal)
+            return vectors, ids
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        vectors = (
+            index.reconstruct_batch(ids)
+            if len(ids)
+            else np.empty((0, self.dimension), dtype=np.float32)
+        )
+        ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+        return vectors, ids
+
+    def _migration_target(self) -> str | None:
+        """当前索引类型与配置不一致，并且满足训练条件时，返回需要迁移到的索引类型"""
+        current = self._index_kind(self.index)
+        if current == self.index_type:
+            return None
+        n = self.index.ntotal
+        # PQ 的每个子空间有 256 个聚类中心，至少需要 256 个训练向量
+        threshold = max(
+            self.train_threshold, 256 if self.index_type == "ivf_pq" else 39
+        )
+        if self._needs_training(self.index_type) and n < threshold:
+            target = "flat"
         else:
-            base_index = faiss.IndexFlatL2(dimension)
-            self.index = faiss.IndexIDMap(base_index)
-        self.storage = {}
+            target = self.index_type
+        return None if target == current else target
+
+    def _build_index(self, target: str, exclude: set[int]):
+        """用当前索引中除 exclude 以外的向量构建 target 类型的新索引，在线程池中执行"""
+        vectors, ids = self._export(self.index)
+        if exclude:
+            keep = ~np.isin(ids, np.fromiter(exclude, dtype=np.int64))
+            vectors, ids = vectors[keep], ids[keep]
+        index = self._create_index(target, len(ids))
+        if not index.is_trained:
+            index.train(vectors)
+        if len(ids):
+            index.add_with_ids(vectors, ids)
+        self._apply_search_params(index)
+        return index
+
+    async def _migrate_locked(self):
+        """在需要时迁移索引类型，调用者需持有 _write_mutex"""
+        target = self._migration_target()
+        if target is None:
+            return
+        logger.info(
+            f"正在将 FAISS 索引从 {self._index_kind(self.index)} 迁移到 {target}，共 {self.index.ntotal} 条向量"
+        )
+        await self._rebuild_locked(target)
+
+    async def _rebuild_locked(self, target: str):
+        """重建为 target 类型的索引并清除墓碑，调用者需持有 _write_mutex。
+        构建新索引时只持有读锁，搜索可以继续进行；构建完成后持有写锁替换索引。"""
+        exclude = set(self._tombstones)
+        async with self._rwlock.read():
+            index = await self._run(self._build_index, target, exclude)
+        async with self._rwlock.write():
+            self.index = index
+            self._tombstones -= exclude
+            self._removed = 0
+        self._dirty = True
+        self._schedule_save()
+
+    async def compact(self):
+        """重建索引，清除已删除的向量。ivf 索引会重新训练聚类中心"""
+        await self.initialize()
+        async with self._write_mutex:
+            target = self._migration_target() or self._index_kind(self.index)
+            logger.info(
+                f"正在重建 FAISS 索引，共 {self.index.ntotal} 条向量，其中 {len(self._tombstones)} 条已删除"
+            )
+            await self._rebuild_locked(target)
+
+    def _needs_compaction(self) -> bool:
+        if self._index_kind(self.index) == "flat":
+            # flat 索引的 remove_ids 会直接回收空间
+            return False
+        return self._removed > self.compact_ratio * max(self.index.ntotal, 1)
+
+    def _schedule_compaction(self):
+        if self._compact_task and not self._compact_task.done():
+            return
+        self._compact_task = asyncio.create_task(self._background_compact())
+
+    async def _background_compact(self):
+        try:
+            await self.compact()
+        except Exception as e:
+            logger.error(f"重建 FAISS 索引失败: {e}")
+
+    async def delete(self, ids: list[int]) -> int:
+        """从索引中删除向量。
+
+        flat 和 ivf 索引直接删除；hnsw 索引不支持删除，先记为墓碑并在搜索时过滤。
+        删除的向量占比超过 compact_ratio 后，在后台重建 hnsw 和 ivf 索引。
+
+        Returns:
+            int: 删除的向量数量
+        """
+        if not ids:
+            return 0
+        await self.initialize()
+        async with self._write_mutex:
+            async with self._rwlock.write():
+                if self._index_kind(self.index) == "hnsw":
+                    new = set(ids) - self._tombstones
+                    self._tombstones |= new
+                    removed = len(new)
+                    if removed:
+                        # 墓碑需要与索引一起保存，否则重启后已删除的向量会重新出现
+                        self._dirty = True
+                else:
+                    sel = faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64))
+                    removed = await self._run(self.index.remove_ids, sel)
+                    self._dirty = True
+            self._removed += removed
+        self._schedule_save()
+        if self._needs_compaction():
+            self._schedule_compaction()
+        return removed
+
+    async def get_ids(self) -> set[int]:
+        """获取索引中所有未删除的向量的 ID"""
+        await self.initialize()
+        async with self._rwlock.read():
+            ids = await self._run(self._export_ids, self.index)
+            return set(ids.tolist()) - self._tombstones
+
+    def _apply_search_params(self, index):
+        kind = self._index_kind(index)
+        params = faiss.ParameterSpace()
+        if kind in ("ivf_flat", "ivf_pq"):
+            params.set_index_parameter(index, "nprobe", self.nprobe)
+        elif kind == "hnsw":
+            params.set_index_parameter(index, "efSearch", self.ef_search)
 
     async def insert(self, vector: np.ndarray, id: int):
         """插入向量
@@ -33,27 +384,145 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vector.shape[0]}"
             )
-        self.index.add_with_ids(vector.reshape(1, -1), np.array([id]))
-        self.storage[id] = vector
-        await self.save_index()
+        await self.insert_batch(vector.reshape(1, -1), [id])
 
-    async def search(self, vector: np.ndarray, k: int) -> tuple:
+    async def insert_batch(self, vectors: np.ndarray, ids: list[int]):
+        """批量插入向量。索引不会立即写入磁盘，而是在 save_delay 秒后或者调用 flush() 时写入。
+
+        Args:
+            vectors (np.ndarray): 形状为 (n, dimension) 的向量
+            ids (list[int]): 向量的ID
+        Raises:
+            ValueError: 如果向量的维度与存储的维度不匹配
+        """
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"向量维度不匹配, 期望: {self.dimension}, 实际: {vectors.shape[-1]}"
+            )
+        if len(ids) != vectors.shape[0]:
+            raise ValueError(
+                f"向量数量 {vectors.shape[0]} 与 ID 数量 {len(ids)} 不匹配"
+            )
+        await self.initialize()
+        async with self._write_mutex:
+            async with self._rwlock.write():
+                await self._run(
+                    self.index.add_with_ids, vectors, np.array(ids, dtype=np.int64)
+                )
+                self._dirty = True
+            await self._migrate_locked()
+        self._schedule_save()
+
+    async def search(
+        self, vector: np.ndarray, k: int, ids: list[int] | None = None
+    ) -> tuple:
         """搜索最相似的向量
 
         Args:
             vector (np.ndarray): 查询向量
             k (int): 返回的最相似向量的数量
+            ids (list[int]): 只在这些 ID 对应的向量中搜索
         Returns:
             tuple: (距离, 索引)
         """
+        await self.initialize()
+        async with self._rwlock.read():
+            return await self._run(self._search, vector, k, ids)
+
+    def _search(
+        self, vector: np.ndarray, k: int, ids: list[int] | None = None
+    ) -> tuple:
         faiss.normalize_L2(vector)
-        distances, indices = self.index.search(vector, k)
-        return distances, indices
+        if ids is None:
+            if not self._tombstones:
+                return self.index.search(vector, k)
+            tombstones = faiss.IDSelectorBatch(
+                np.fromiter(self._tombstones, dtype=np.int64)
+            )
+            params = faiss.SearchParameters(sel=faiss.IDSelectorNot(tombstones))
+            return self.index.search(vector, k, params=params)
+
+        ids = np.asarray(ids, dtype=np.int64)
+        if self._tombstones:
+            ids = ids[~np.isin(ids, np.fromiter(self._tombstones, dtype=np.int64))]
+        if not len(ids):
+            n = vector.shape[0]
+            return (
+                np.full((n, k), np.finfo(np.float32).max, dtype=np.float32),
+                np.full((n, k), -1, dtype=np.int64),
+            )
+        sel = faiss.IDSelectorBatch(ids)
+        kind = self._index_kind(self.index)
+        if kind == "hnsw":
+            # 过滤条件的选择性较高时，HNSW 的图搜索会漏掉结果，改为对原始向量进行带过滤的暴力搜索
+            hnsw = faiss.downcast_index(self.index.index)
+            storage = faiss.downcast_index(hnsw.storage)
+            id_map = self.index.id_map
+            translated = faiss.IDSelectorTranslated(id_map, sel)
+            distances, offsets = storage.search(
+                vector, k, params=faiss.SearchParameters(sel=translated)
+            )
+            indices = np.array(
+                [[id_map.at(int(o)) if o >= 0 else -1 for o in row] for row in offsets],
+                dtype=np.int64,
+            )
+            return distances, indices
+        if kind in ("ivf_flat", "ivf_pq"):
+            # 增大 nprobe，使扫描的聚类中预期有足够多符合条件的向量
+            ivf = faiss.extract_index_ivf(self.index)
+            nprobe = min(
+                ivf.nlist, max(self.nprobe, math.ceil(4 * k * ivf.nlist / len(ids)))
+            )
+            params = faiss.SearchParametersIVF(sel=sel, nprobe=nprobe)
+            return self.index.search(vector, k, params=params)
+        return self.index.search(vector, k, params=faiss.SearchParameters(sel=sel))
+
+    def _schedule_save(self):
+        if not self.path:
+            return
+        if self._save_task and not self._save_task.done():
+            return
+        self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        while self._dirty:
+            await asyncio.sleep(self.save_delay)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"保存 FAISS 索引 {self.path} 失败: {e}")
+                return
+
+    async def flush(self):
+        """将尚未保存的索引写入磁盘"""
+        if not self._dirty or not self.path:
+            return
+        # 保存期间可能有新的插入，它们会重新标记 _dirty
+        self._dirty = False
+        try:
+            await self.save_index()
+        except Exception:
+            self._dirty = True
+            raise
 
     async def save_index(self):
-        """保存索引
+        """保存索引。先写入临时文件再替换，写入过程中崩溃不会损坏已有的索引文件"""
+        if self.index is None:
+            return
+        async with self._rwlock.read():
+            await self._run(
+                self._write_index, self.index, self.path, set(self._tombstones)
+            )
 
-        Args:
-            path (str): 保存索引的路径
-        """
-        faiss.write_index(self.index, self.path)
+    @classmethod
+    def _write_index(cls, index, path: str, tombstones: set[int]):
+        tmp_path = path + ".tmp"
+        faiss.write_index(index, tmp_path)
+        tombstones_path = cls._tombstones_path(path)
+        if tombstones:
+            tmp_tombstones_path = tombstones_path + ".tmp.npy"
+            np.save(tmp_tombstones_path, np.fromiter(tombstones, dtype=np.int64))
+            os.replace(tmp_tombstones_path, tombstones_path)
+        elif os.path.exists(tombstones_path):
+            os.remove(tombstones_path)
+        os.replace(tmp_path, path)
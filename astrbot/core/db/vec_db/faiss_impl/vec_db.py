@@ -1,9 +1,12 @@
+import asyncio
 import uuid
 import json
 import numpy as np
+from typing import Awaitable, Callable
 from .document_storage import DocumentStorage
 from .embedding_storage import EmbeddingStorage
 from ..base import Result, BaseVecDB
+from astrbot.core import logger
 from astrbot.core.provider.provider import EmbeddingProvider
 from astrbot.core.provider.provider import RerankProvider
 
@@ -19,19 +22,39 @@ class FaissVecDB(BaseVecDB):
         index_store_path: str,
         embedding_provider: EmbeddingProvider,
         rerank_provider: RerankProvider | None = None,
+        index_config: dict | None = None,
+        filterable_fields: list[str] | None = None,
+        enable_fts: bool = True,
     ):
+        """
+        Args:
+            filterable_fields (list[str]): 需要建立索引的元数据字段，retrieve 按这些字段过滤时使用 SQLite 索引。
+                user_id 和 group_id 总是建立了索引。
+            enable_fts (bool): 是否维护 FTS5 全文索引，用于 retrieve 的混合检索
+            index_config (dict): FAISS 索引配置，可选 index_type（flat, hnsw, ivf_flat, ivf_pq）、nlist、nprobe、
+                hnsw_m、ef_search、pq_m、train_threshold。各索引类型的召回率与延迟见 embedding_storage 模块的说明。
+        """
         self.doc_store_path = doc_store_path
         self.index_store_path = index_store_path
         self.embedding_provider = embedding_provider
-        self.document_storage = DocumentStorage(doc_store_path)
+        self.document_storage = DocumentStorage(
+            doc_store_path, filterable_fields, enable_fts
+        )
         self.embedding_storage = EmbeddingStorage(
-            embedding_provider.get_dim(), index_store_path
+            embedding_provider.get_dim(), index_store_path, **(index_config or {})
         )
         self.embedding_provider = embedding_provider
         self.rerank_provider = rerank_provider
+        self._write_lock = asyncio.Lock()
+        """保证文档表和 FAISS 索引的写入顺序一致"""
 
     async def initialize(self):
         await self.document_storage.initialize()
+        await self.embedding_storage.initialize()
+        try:
+            await self.check_integrity()
+        except Exception as e:
+            logger.error(f"修复向量数据库 {self.doc_store_path} 失败: {e}")
 
     async def insert(
         self, content: str, metadata: dict | None = None, id: str | None = None
@@ -44,19 +67,103 @@ class FaissVecDB(BaseVecDB):
 
         vector = await self.embedding_provider.get_embedding(content)
         vector = np.array(vector, dtype=np.float32)
-        async with self.document_storage.connection.cursor() as cursor:
-            await cursor.execute(
-                "INSERT INTO documents (doc_id, text, metadata) VALUES (?, ?, ?)",
-                (str_id, content, json.dumps(metadata)),
-            )
+        async with self._write_lock:
+            async with self.document_storage.connection.cursor() as cursor:
+                await cursor.execute(
+                    "INSERT INTO documents (doc_id, text, metadata) VALUES (?, ?, ?)",
+                    (str_id, content, json.dumps(metadata)),
+                )
+                int_id = cursor.lastrowid
             await self.document_storage.connection.commit()
-            result = await self.document_storage.get_document_by_doc_id(str_id)
-            int_id = result["id"]
 
             # 插入向量到 FAISS
             await self.embedding_storage.insert(vector, int_id)
             return int_id
 
+    async def insert_batch(
+        self,
+        contents: list[str],
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+        batch_size: int = 32,
+        tasks_limit: int = 3,
+        progress_callback: Callable[[int, int], Awaitable[None]] | None = None,
+    ) -> list[int]:
+        """
+        批量插入文本和其对应向量。
+
+        文本按 batch_size 分批调用 EmbeddingProvider.get_embeddings，最多同时进行 tasks_limit 个批次。
+        每个批次的文档在一个事务中写入，向量一次性加入 FAISS 索引，索引延迟写入磁盘（见 flush()）。
+        某个批次失败时抛出异常，已经完成的批次不会回滚。
+
+        Args:
+            contents (list[str]): 文本列表
+            metadatas (list[dict]): 每条文本的元数据
+            ids (list[str]): 每条文本的原始 ID，默认使用 UUID
+            batch_size (int): 每次请求向量的文本数量
+            tasks_limit (int): 同时请求向量的批次数量
+            progress_callback: 进度回调，参数为 (已完成的数量, 总数量)
+
+        Returns:
+            list[int]: 与 contents 顺序一致的文档 ID（主键）
+        """
+        total = len(contents)
+        metadatas = metadatas or [{} for _ in range(total)]
+        ids = ids or [str(uuid.uuid4()) for _ in range(total)]
+        if len(metadatas) != total or len(ids) != total:
+            raise ValueError("contents, metadatas 和 ids 的长度必须一致")
+
+        semaphore = asyncio.Semaphore(max(1, tasks_limit))
+        done = 0
+
+        async def process(start: int) -> list[int]:
+            nonlocal done
+            end = min(start + batch_size, total)
+            async with semaphore:
+                vectors = await self.embedding_provider.get_embeddings(
+                    contents[start:end]
+                )
+            vectors = np.array(vectors, dtype=np.float32)
+            rows = [
+                (ids[i], contents[i], json.dumps(metadatas[i] or {}))
+                for i in range(start, end)
+            ]
+            int_ids = await self._insert_rows(rows, vectors)
+            done += end - start
+            if progress_callback:
+                await progress_callback(done, total)
+            return int_ids
+
+        results = await asyncio.gather(
+            *(process(start) for start in range(0, total, batch_size))
+        )
+        return [int_id for batch in results for int_id in batch]
+
+    async def _insert_rows(
+        self, rows: list[tuple[str, str, str]], vectors: np.ndarray
+    ) -> list[int]:
+        """在一个事务中写入一批文档，并将对应的向量加入 FAISS 索引"""
+        conn = self.document_storage.connection
+        async with self._write_lock:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT COALESCE(MAX(id), 0) FROM documents")
+                last_id = (await cursor.fetchone())[0]
+                await cursor.executemany(
+                    "INSERT INTO documents (doc_id, text, metadata) VALUES (?, ?, ?)",
+                    rows,
+                )
+                # 写入被 _write_lock 串行化，本批次的文档即为 last_id 之后的文档
+                await cursor.execute(
+                    "SELECT id FROM documents WHERE id > ? ORDER BY id", (last_id,)
+                )
+                int_ids = [row[0] for row in await cursor.fetchall()]
+            if len(int_ids) != len(rows):
+                await conn.rollback()
+                raise RuntimeError("批量插入文档失败：写入的文档数量与预期不一致")
+            await conn.commit()
+            await self.embedding_storage.insert_batch(vectors, int_ids)
+            return int_ids
+
     async def retrieve(
         self,
         query: str,
@@ -64,6 +171,7 @@ class FaissVecDB(BaseVecDB):
         fetch_k: int = 20,
         rerank: bool = False,
         metadata_filters: dict | None = None,
+        hybrid: bool = False,
     ) -> list[Result]:
         """
         搜索最相似的文档。
@@ -71,42 +179,65 @@ class FaissVecDB(BaseVecDB):
         Args:
             query (str): 查询文本
             k (int): 返回的最相似文档的数量
-            fetch_k (int): 在根据 metadata 过滤前从 FAISS 中获取的数量
+            fetch_k (int): 混合检索时向量检索和关键词检索各自取出的候选数量
             rerank (bool): 是否使用重排序。这需要在实例化时提供 rerank_provider, 如果未提供并且 rerank 为 True, 不会抛出异常。
-            metadata_filters (dict): 元数据过滤器
+            metadata_filters (dict): 元数据过滤器，值需要与元数据完全相等。先从 SQLite 中查出符合条件的文档，再只在这些文档的向量中搜索
+            hybrid (bool): 是否同时进行 BM25 关键词检索，并与向量检索的结果进行倒数排名融合（RRF）。
+                适合错误码、产品名、群号等需要精确匹配的查询。此时 similarity 为归一化的融合分数。
+                两路检索的第一名相同时，认为结果足够可信，跳过重排序。
 
         Returns:
             List[Result]: 查询结果
         """
+        ids = None
+        if metadata_filters:
+            ids = await self.document_storage.get_ids(metadata_filters)
+            if not ids:
+                return []
+        n = max(k, fetch_k) if hybrid else k
         embedding = await self.embedding_provider.get_embedding(query)
         scores, indices = await self.embedding_storage.search(
             vector=np.array([embedding]).astype("float32"),
-            k=fetch_k if metadata_filters else k,
+            k=n,
+            ids=ids,
         )
-        if len(indices[0]) == 0 or indices[0][0] == -1:
-            return []
         # normalize scores
-        scores[0] = 1.0 - (scores[0] / 2.0)
+        vector_hits = [
+            (int(idx), float(1.0 - score / 2.0))
+            for score, idx in zip(scores[0], indices[0])
+            if idx != -1
+        ]
+
+        lexical_ids = []
+        if hybrid:
+            lexical_ids = await self.document_storage.search_fts(
+                query, n, metadata_filters
+            )
+        if lexical_ids:
+            top_hits = self._reciprocal_rank_fusion(
+                [[idx for idx, _ in vector_hits], lexical_ids]
+            )[:k]
+            confident = bool(vector_hits) and vector_hits[0][0] == lexical_ids[0]
+        else:
+            top_hits = vector_hits[:k]
+            confident = False
+        if not top_hits:
+            return []
+
         # NOTE: maybe the size is less than k.
         fetched_docs = await self.document_storage.get_documents(
-            metadata_filters=metadata_filters or {}, ids=indices[0]
+            metadata_filters={}, ids=[idx for idx, _ in top_hits]
         )
         if not fetched_docs:
             return []
-        result_docs: list[Result] = []
+        docs_by_id = {fetch_doc["id"]: fetch_doc for fetch_doc in fetched_docs}
+        top_k_results = [
+            Result(similarity=score, data=docs_by_id[idx])
+            for idx, score in top_hits
+            if idx in docs_by_id
+        ]
 
-        idx_pos = {fetch_doc["id"]: idx for idx, fetch_doc in enumerate(fetched_docs)}
-        for i, indice_idx in enumerate(indices[0]):
-            pos = idx_pos.get(indice_idx)
-            if pos is None:
-                continue
-            fetch_doc = fetched_docs[pos]
-            score = scores[0][i]
-            result_docs.append(Result(similarity=float(score), data=fetch_doc))
-
-        top_k_results = result_docs[:k]
-
-        if rerank and self.rerank_provider:
+        if rerank and self.rerank_provider and not confident:
             documents = [doc.data["text"] for doc in top_k_results]
             reranked_results = await self.rerank_provider.rerank(query, documents)
             reranked_results = sorted(
@@ -119,16 +250,88 @@ class FaissVecDB(BaseVecDB):
 
         return top_k_results
 
-    async def delete(self, doc_id: int):
+    @staticmethod
+    def _reciprocal_rank_fusion(
+        rankings: list[list[int]], rrf_k: int = 60
+    ) -> list[tuple[int, float]]:
+        """倒数排名融合。返回按融合分数降序排列的 (id, 分数)，分数归一化到 [0, 1]"""
+        fused: dict[int, float] = {}
+        for ranking in rankings:
+            for rank, idx in enumerate(ranking):
+                fused[idx] = fused.get(idx, 0.0) + 1.0 / (rrf_k + rank + 1)
+        max_score = len(rankings) / (rrf_k + 1)
+        return sorted(
+            ((idx, score / max_score) for idx, score in fused.items()),
+            key=lambda x: x[1],
+            reverse=True,
+        )
+
+    async def delete(self, doc_id: str) -> bool:
         """
-        删除一条文档
+        删除一条文档及其向量
         """
-        await self.document_storage.connection.execute(
-            "DELETE FROM documents WHERE doc_id = ?", (doc_id,)
-        )
-        await self.document_storage.connection.commit()
+        conn = self.document_storage.connection
+        async with self._write_lock:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT id FROM documents WHERE doc_id = ?", (doc_id,)
+                )
+                ids = [row[0] for row in await cursor.fetchall()]
+                if not ids:
+                    return False
+                await cursor.execute(
+                    "DELETE FROM documents WHERE doc_id = ?", (doc_id,)
+                )
+            await conn.commit()
+            await self.embedding_storage.delete(ids)
+        return True
+
+    async def check_integrity(self, repair: bool = True, batch_size: int = 32) -> dict:
+        """
+        检查 FAISS 索引与文档表是否一致，例如在写入索引文件前崩溃后。
+
+        Args:
+            repair (bool): 是否修复。索引中多余的向量会被删除，缺少向量的文档会重新计算向量
+            batch_size (int): 重新计算向量时每次请求的文本数量
+
+        Returns:
+            dict: orphan_vectors 为没有对应文档的向量数量，missing_vectors 为没有向量的文档数量
+        """
+        async with self._write_lock:
+            index_ids = await self.embedding_storage.get_ids()
+            async with self.document_storage.connection.cursor() as cursor:
+                await cursor.execute("SELECT id FROM documents")
+                doc_ids = {row[0] for row in await cursor.fetchall()}
+            orphans = sorted(index_ids - doc_ids)
+            missing = sorted(doc_ids - index_ids)
+            if orphans or missing:
+                logger.warning(
+                    f"向量数据库 {self.doc_store_path} 不一致：{len(orphans)} 条向量没有对应的文档，{len(missing)} 条文档没有向量。"
+                )
+            if repair and orphans:
+                await self.embedding_storage.delete(orphans)
+            if repair and missing:
+                for start in range(0, len(missing), batch_size):
+                    batch = missing[start : start + batch_size]
+                    docs = await self.document_storage.get_documents({}, ids=batch)
+                    vectors = await self.embedding_provider.get_embeddings(
+                        [doc["text"] for doc in docs]
+                    )
+                    await self.embedding_storage.insert_batch(
+                        np.array(vectors, dtype=np.float32),
+                        [doc["id"] for doc in docs],
+                    )
+                logger.info(f"已为 {len(missing)} 条文档重新计算向量。")
+        return {"orphan_vectors": len(orphans), "missing_vectors": len(missing)}
+
+    async def flush(self):
+        """
+        将尚未保存的 FAISS 索引写入磁盘
+        """
+        await self.embedding_storage.flush()
 
     async def close(self):
+        await self.flush()
         await self.document_storage.close()
 
     async def count_documents(self) -> int:
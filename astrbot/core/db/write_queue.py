@@ -0,0 +1,124 @@
+"""
+SQLite 单写入者队列
+
+SQLite 同一时间只允许一个写事务，每条消息都会触发的小写入（消息记录、偏好设置、统计）如果各自开启事务，
+会互相等待数据库锁，并且每个事务都要单独提交一次。
+
+WriteQueue 把写入操作交给一个后台任务串行执行：队列中积压的写入会合并到同一个事务中提交，
+提交成功后调用方才会得到结果。合并的事务中有写入失败时，回滚整个事务并逐个重新执行，失败只影响对应的调用方。
+"""
+
+import asyncio
+import typing as T
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+R = T.TypeVar("R")
+WriteJob = T.Callable[[AsyncSession], T.Awaitable[T.Any]]
+
+
+class WriteQueue:
+    def __init__(
+        self,
+        session_factory: T.Callable[[], T.AsyncContextManager[AsyncSession]],
+        max_batch_size: int = 64,
+    ) -> None:
+        self.session_factory = session_factory
+        """返回 AsyncSession 的异步上下文管理器工厂"""
+        self.max_batch_size = max_batch_size
+        """一个事务中最多合并的写入数量"""
+        self._queue: asyncio.Queue[tuple[WriteJob, asyncio.Future]] | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        # 统计信息
+        self.jobs = 0
+        self.transactions = 0
+
+    async def submit(self, job: T.Callable[[AsyncSession], T.Awaitable[R]]) -> R:
+        """在写入任务中执行 job(session)，事务提交后返回 job 的返回值。
+
+        job 会在事务中执行，不需要自己开启或提交事务，并且可能被重新执行，不应有数据库以外的副作用。
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        elif self._loop is not loop:
+            # 其他事件循环（例如兼容旧接口的同步方法）中的写入直接执行
+            return await self._run_single(job)
+        assert self._queue is not None
+        fut = loop.create_future()
+        self._queue.put_nowait((job, fut))
+        return await fut
+
+    async def _run(self):
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            # 调用方已经取消的写入不再执行
+            batch = [(job, fut) for job, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            try:
+                await self._run_batch(batch)
+            except Exception as e:
+                from astrbot.core import logger
+
+                logger.error(f"数据库写入队列执行失败: {e}")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    async def _run_batch(self, batch: list[tuple[WriteJob, asyncio.Future]]):
+        self.jobs += len(batch)
+        results = []
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    for job, _ in batch:
+                        results.append(await job(session))
+            self.transactions += 1
+        except Exception as e:
+            if len(batch) == 1:
+                self._set_exception(batch[0][1], e)
+                return
+            # 找出失败的写入，其他写入不受影响
+            for job, fut in batch:
+                try:
+                    result = await self._run_single(job)
+                except Exception as e:
+                    self._set_exception(fut, e)
+                else:
+                    if not fut.done():
+                        fut.set_result(result)
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    async def _run_single(self, job: WriteJob):
+        async with self.session_factory() as session:
+            async with session.begin():
+                result = await job(session)
+        self.transactions += 1
+        return result
+
+    @staticmethod
+    def _set_exception(fut: asyncio.Future, e: Exception):
+        if not fut.done():
+            fut.set_exception(e)
+            # 避免调用方已经离开时出现 "Future exception was never retrieved"
+            fut.exception()
+
+    def get_stats(self) -> dict:
+        """获取写入与事务的数量"""
+        return {
+            "jobs": self.jobs,
+            "transactions": self.transactions,
+            "pending": self._queue.qsize() if self._queue else 0,
+        }
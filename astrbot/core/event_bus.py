@@ -1,24 +1,68 @@
 """
 事件总线, 用于处理事件的分发和处理
 事件总线是一个异步队列, 用于接收各种消息事件, 并将其发送到Scheduler调度器进行处理
-其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并创建一个新的异步任务来执行管道调度器的处理逻辑
+其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并按会话放入有序的执行通道中处理
 
 class:
     EventBus: 事件总线, 用于处理事件的分发和处理
 
 工作流程:
-1. 维护一个异步队列, 来接受各种消息事件
-2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并创建一个新的异步任务来执行管道调度器的处理逻辑
+1. 维护一个有界的异步队列(EventQueue), 来接受各种消息事件, 队列满时按 overflow_policy 丢弃事件
+2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并放入该事件所属会话(unified_msg_origin)的执行通道
+3. 同一个会话的事件按顺序依次执行, 不同会话的事件并发执行
+4. 某个会话积压的事件超过 max_session_pending 时, 按 overflow_policy 丢弃或合并事件
+5. 所有会话积压的事件总数超过 max_pending 时, 暂停从事件队列中取出事件, 直到积压减少
+
+max_concurrency 限制的是同时在做实际工作的事件数。事件开始执行时获得一个许可, 在以下情况提前归还:
+- 处理函数开始长时间空闲等待时(如 session_waiter 等待用户的下一条消息), 见 utils/event_permit.py
+- 事件持有许可超过 max_permit_hold 秒(如较长的 LLM 工具调用循环)
+归还许可后事件继续执行, 同一会话后续的事件仍然排在它之后, 但不再占用其他会话的并发名额。
 """
 
 import asyncio
+import time
+import traceback
 from asyncio import Queue
+from collections import deque
+from dataclasses import dataclass, field
 from astrbot.core.pipeline.scheduler import PipelineScheduler
 from astrbot.core import logger
+from astrbot.core.utils.session_waiter import USER_SESSIONS, FILTERS
+from astrbot.core.utils.event_permit import EventPermit, current_event_permit
 from .platform import AstrMessageEvent
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
 
 
+class EventQueue(Queue):
+    """有界的事件队列。队列已满时 put_nowait 按 overflow_policy 丢弃事件, 而不是抛出 QueueFull"""
+
+    def __init__(self, maxsize: int = 0, overflow_policy: str = "drop_oldest"):
+        super().__init__(maxsize)
+        self.overflow_policy = overflow_policy
+        """drop_newest 丢弃新的事件, 其余策略丢弃最早的事件"""
+        self.dropped = 0
+
+    def put_nowait(self, item):
+        if self.full():
+            self.dropped += 1
+            if self.overflow_policy == "drop_newest":
+                logger.warning("事件队列已满，丢弃最新的事件。")
+                return
+            self.get_nowait()
+            logger.warning("事件队列已满，丢弃最早的事件。")
+        super().put_nowait(item)
+
+
+@dataclass
+class _SessionLane:
+    """一个会话的事件执行通道"""
+
+    events: deque[tuple[AstrMessageEvent, PipelineScheduler, float]] = field(
+        default_factory=deque
+    )
+    task: asyncio.Task | None = None
+
+
 class EventBus:
     """用于处理事件的分发和处理"""
 
@@ -33,13 +77,180 @@ class EventBus:
         self.pipeline_scheduler_mapping = pipeline_scheduler_mapping
         self.astrbot_config_mgr = astrbot_config_mgr
 
+        cfg = {}
+        if astrbot_config_mgr:
+            cfg = astrbot_config_mgr.confs["default"].get("event_bus", {})
+        self.max_concurrency: int = max(1, cfg.get("max_concurrency", 64))
+        """同时执行的事件数上限"""
+        self.max_session_pending: int = max(1, cfg.get("max_session_pending", 20))
+        """单个会话最多积压的事件数"""
+        self.max_pending: int = max(1, cfg.get("max_pending", 2000))
+        """所有会话最多积压的事件总数, 超过后暂停消费事件队列"""
+        self.overflow_policy: str = cfg.get("overflow_policy", "drop_oldest")
+        """drop_oldest, drop_newest, coalesce"""
+        self.max_permit_hold: float = cfg.get("max_permit_hold", 30)
+        """事件最多占用并发名额的时间(秒), 超过后归还许可并继续执行。0 表示不限制"""
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._lanes: dict[str, _SessionLane] = {}
+        self._pending = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+        # 统计信息
+        self._running = 0
+        self._dropped = 0
+        self._coalesced = 0
+        self._processed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
     async def dispatch(self):
         while True:
+            await self._drained.wait()
             event: AstrMessageEvent = await self.event_queue.get()
             conf_info = self.astrbot_config_mgr.get_conf_info(event.unified_msg_origin)
             self._print_event(event, conf_info["name"])
             scheduler = self.pipeline_scheduler_mapping.get(conf_info["id"])
-            asyncio.create_task(scheduler.execute(event))
+            if self._is_session_waiting(event):
+                # 该会话正在等待用户输入(session_waiter), 不能排在等待者之后, 直接执行
+                asyncio.create_task(self._execute(event, scheduler, time.monotonic()))
+                continue
+            self._enqueue(event, scheduler)
+
+    def _is_session_waiting(self, event: AstrMessageEvent) -> bool:
+        if not USER_SESSIONS:
+            return False
+        for session_filter in FILTERS:
+            if session_filter.filter(event) in USER_SESSIONS:
+                return True
+        return False
+
+    def _enqueue(self, event: AstrMessageEvent, scheduler: PipelineScheduler):
+        umo = event.unified_msg_origin
+        lane = self._lanes.get(umo)
+        if lane is None:
+            lane = _SessionLane()
+            self._lanes[umo] = lane
+
+        if self.overflow_policy == "coalesce" and lane.events:
+            # 丢弃同一发送者尚未执行的相同消息
+            outline = event.get_message_outline()
+            sender = event.get_sender_id()
+            kept = deque(
+                item
+                for item in lane.events
+                if item[0].get_sender_id() != sender
+                or item[0].get_message_outline() != outline
+            )
+            removed = len(lane.events) - len(kept)
+            if removed:
+                lane.events = kept
+                self._pending -= removed
+                self._coalesced += removed
+
+        if len(lane.events) >= self.max_session_pending:
+            self._dropped += 1
+            if self.overflow_policy == "drop_newest":
+                logger.warning(f"会话 {umo} 积压的事件过多，丢弃最新的事件。")
+                return
+            lane.events.popleft()
+            self._pending -= 1
+            logger.warning(f"会话 {umo} 积压的事件过多，丢弃最早的事件。")
+
+        lane.events.append((event, scheduler, time.monotonic()))
+        self._pending += 1
+        if self._pending >= self.max_pending:
+            logger.warning(
+                f"积压的事件数达到上限 {self.max_pending}，暂停处理新的事件。"
+            )
+            self._drained.clear()
+
+        if lane.task is None:
+            lane.task = asyncio.create_task(self._run_lane(umo, lane))
+
+    async def _run_lane(self, umo: str, lane: _SessionLane):
+        """按顺序执行一个会话的所有事件, 执行完毕后移除该通道
+
+        获得执行许可之后事件才会离开通道, 等待许可的事件仍计入积压总数。
+        因此通道(以及其任务)的数量不会超过 max_pending + max_concurrency。
+        """
+        try:
+            while lane.events:
+                await self._semaphore.acquire()
+                permit = EventPermit(self._semaphore)
+                try:
+                    if not lane.events:
+                        break
+                    event, scheduler, enqueued_at = lane.events.popleft()
+                    self._pending -= 1
+                    if (
+                        not self._drained.is_set()
+                        and self._pending <= self.max_pending // 2
+                    ):
+                        self._drained.set()
+                    await self._execute(event, scheduler, enqueued_at, permit)
+                finally:
+                    permit.release()
+        finally:
+            lane.task = None
+            if self._lanes.get(umo) is lane:
+                del self._lanes[umo]
+
+    async def _execute(
+        self,
+        event: AstrMessageEvent,
+        scheduler: PipelineScheduler,
+        enqueued_at: float,
+        permit: EventPermit | None = None,
+    ):
+        wait = time.monotonic() - enqueued_at
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._running += 1
+        task = asyncio.create_task(self._run_pipeline(event, scheduler, permit))
+        try:
+            if permit is not None and self.max_permit_hold > 0:
+                await asyncio.wait({task}, timeout=self.max_permit_hold)
+                if not task.done():
+                    # 长时间运行的事件不再占用并发名额
+                    permit.release()
+            await task
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except Exception:
+            logger.error(traceback.format_exc())
+        finally:
+            self._running -= 1
+            self._processed += 1
+
+    @staticmethod
+    async def _run_pipeline(
+        event: AstrMessageEvent,
+        scheduler: PipelineScheduler,
+        permit: EventPermit | None,
+    ):
+        # 处理函数通过 release_event_permit() 归还的是这个事件的许可
+        current_event_permit.set(permit)
+        await scheduler.execute(event)
+
+    def get_stats(self) -> dict:
+        """获取事件总线的运行状态"""
+        return {
+            "queue_depth": self.event_queue.qsize(),
+            "pending": self._pending,
+            "running": self._running,
+            "lane_count": len(self._lanes),
+            "processed": self._processed,
+            "dropped": self._dropped + getattr(self.event_queue, "dropped", 0),
+            "coalesced": self._coalesced,
+            "avg_wait_ms": round(
+                self._total_wait / self._processed * 1000 if self._processed else 0,
+                2,
+            ),
+            "max_wait_ms": round(self._max_wait * 1000, 2),
+        }
 
     def _print_event(self, event: AstrMessageEvent, conf_name: str):
         """用于记录事件信息
@@ -2,7 +2,8 @@ from typing import Union, AsyncGenerator
 from ..stage import Stage, register_stage
 from ..context import PipelineContext
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
-from astrbot.core.message.message_event_result import MessageEventResult
+from astrbot.core.message.message_event_result import MessageEventResult, MessageChain
+from astrbot.core.message.components import Plain
 from astrbot.core import logger
 from .strategies.strategy import StrategySelector
 
@@ -11,7 +12,7 @@ from .strategies.strategy import StrategySelector
 class ContentSafetyCheckStage(Stage):
     """检查内容安全
 
-    当前只会检查文本的。
+    当前只会检查文本的。流式输出可以通过 guard_stream 逐段检查。
     """
 
     async def initialize(self, ctx: PipelineContext):
@@ -35,3 +36,29 @@ class ContentSafetyCheckStage(Stage):
             event.stop_event()
             logger.info(f"内容安全检查不通过，原因：{info}")
             return
+
+    async def guard_stream(
+        self, event: AstrMessageEvent, stream: AsyncGenerator
+    ) -> AsyncGenerator:
+        """包装流式输出，逐段检查其中的文本。检查不通过时停止输出并发送屏蔽提示"""
+        scanners = self.strategy_selector.create_stream_scanners()
+        if not scanners:
+            async for chain in stream:
+                yield chain
+            return
+        async for chain in stream:
+            if isinstance(chain, MessageChain):
+                text = "".join(
+                    comp.text for comp in chain.chain if isinstance(comp, Plain)
+                )
+                for scanner in scanners:
+                    ok, info = scanner.feed(text) if text else (True, "")
+                    if not ok:
+                        logger.info(f"流式输出内容安全检查不通过，原因：{info}")
+                        await stream.aclose()
+                        yield MessageChain().message(
+                            "大模型的响应中包含不适当的内容，已被屏蔽。"
+                        )
+                        event.stop_event()
+                        return
+            yield chain
@@ -1,9 +1,118 @@
+"""
+关键词内容安全检查
+
+关键词列表在初始化时编译一次：不含正则元字符的关键词编译为 Aho-Corasick 自动机，只需扫描一遍文本；
+其余的正则表达式尽量合并为一个正则，含有分组（可能有反向引用）或者全局内联标志（如 (?i)）等无法合并的正则单独检查。
+检查的耗时与关键词的数量基本无关。
+
+可选的规范化：NFKC（全角转半角等）和大小写不敏感，以及繁体转简体（需要安装 opencc）。
+
+create_stream_scanner() 返回的扫描器可以逐段检查流式输出，不需要重新扫描已经检查过的文本。
+"""
+
 import re
+import unicodedata
 from . import ContentSafetyStrategy
+from astrbot.core import logger
+
+_REGEX_META = set(".^$*+?{}[]\\|()")
+_GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+
+class _AhoCorasick:
+    """多模式字符串匹配自动机"""
+
+    def __init__(self, patterns: list[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[int] = [-1]
+        """状态匹配到的模式下标（包括 fail 链上的），-1 表示没有"""
+        for i, pattern in enumerate(patterns):
+            self._add(pattern, i)
+        self._build()
+
+    def _add(self, pattern: str, idx: int):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(-1)
+                self._goto[state][ch] = nxt
+            state = nxt
+        if self._out[state] == -1:
+            self._out[state] = idx
+
+    def _build(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                if self._out[nxt] == -1:
+                    self._out[nxt] = self._out[self._fail[nxt]]
+
+    def scan(self, text: str, state: int = 0) -> tuple[int, int]:
+        """从 state 开始扫描 text。返回 (匹配到的模式下标或 -1, 扫描结束时的状态)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if out[state] != -1:
+                return out[state], state
+        return -1, state
+
+
+class KeywordStreamScanner:
+    """逐段检查流式输出。自动机的状态跨段保留；正则只重新扫描上一段末尾的 overlap 个字符"""
+
+    def __init__(self, strategy: "KeywordsStrategy", overlap: int = 256):
+        self._strategy = strategy
+        self._state = 0
+        self._tail = ""
+        self._overlap = overlap
+        self.blocked = False
+
+    def feed(self, delta: str) -> tuple[bool, str]:
+        """检查新的一段文本，返回值与 KeywordsStrategy.check 相同。一旦不通过，之后的检查都不通过"""
+        if self.blocked:
+            return False, "内容安全检查不通过，匹配到敏感词。"
+        delta = self._strategy.normalize(delta)
+        if self._strategy._automaton:
+            idx, self._state = self._strategy._automaton.scan(delta, self._state)
+            if idx != -1:
+                self.blocked = True
+                return False, "内容安全检查不通过，匹配到敏感词。"
+        if self._strategy._regexes:
+            window = self._tail + delta
+            if self._strategy._search_regexes(window):
+                self.blocked = True
+                return False, "内容安全检查不通过，匹配到敏感词。"
+            self._tail = window[-self._overlap :]
+        return True, ""
 
 
 class KeywordsStrategy(ContentSafetyStrategy):
-    def __init__(self, extra_keywords: list) -> None:
+    def __init__(
+        self,
+        extra_keywords: list,
+        normalize: bool = False,
+        traditional_to_simplified: bool = False,
+    ) -> None:
         self.keywords = []
         if extra_keywords is None:
             extra_keywords = []
@@ -15,9 +124,90 @@ class KeywordsStrategy(ContentSafetyStrategy):
         #         self.keywords.extend(
         #             json.loads(base64.b64decode(f.read()).decode("utf-8"))["keywords"]
         #         )
+        self.normalize_width_and_case = normalize
+        """是否进行 NFKC 规范化（全角转半角等）并忽略大小写"""
+        self._t2s = None
+        if traditional_to_simplified:
+            self._t2s = self._load_t2s()
+        self._compile()
 
-    def check(self, content: str) -> tuple[bool, str]:
+    @staticmethod
+    def _load_t2s():
+        try:
+            import opencc
+        except ImportError:
+            logger.warning(
+                "繁体转简体需要安装 opencc：pip install opencc-python-reimplemented"
+            )
+            return None
+        for config in ("t2s", "t2s.json"):
+            try:
+                return opencc.OpenCC(config)
+            except Exception:
+                continue
+        logger.warning("加载 opencc 繁体转简体配置失败。")
+        return None
+
+    def normalize(self, text: str) -> str:
+        if self.normalize_width_and_case:
+            text = unicodedata.normalize("NFKC", text).lower()
+        if self._t2s:
+            text = self._t2s.convert(text)
+        return text
+
+    def _compile(self):
+        literals = []
+        patterns = []
         for keyword in self.keywords:
-            if re.search(keyword, content):
-                return False, "内容安全检查不通过，匹配到敏感词。"
+            if not keyword:
+                continue
+            if _REGEX_META.isdisjoint(keyword):
+                literals.append(self.normalize(keyword))
+            else:
+                patterns.append(keyword)
+        self._automaton = _AhoCorasick(literals) if literals else None
+        self._regexes = self._compile_regexes(patterns)
+
+    def _compile_regexes(self, patterns: list[str]) -> list[re.Pattern]:
+        """逐个编译正则，能合并的合并为一个，其余的单独保留"""
+        flags = re.IGNORECASE if self.normalize_width_and_case else 0
+        mergeable = []
+        regexes = []
+        for pattern in patterns:
+            try:
+                compiled = re.compile(pattern, flags)
+            except re.error as e:
+                logger.warning(
+                    f"内容安全检查的关键词 {pattern} 不是有效的正则表达式: {e}"
+                )
+                continue
+            if compiled.groups:
+                # 合并后分组会重新编号，反向引用会失效
+                regexes.append(compiled)
+                continue
+            if _GLOBAL_FLAGS.search(pattern):
+                # 全局内联标志（如 (?i)）不在开头时，Python 3.11+ 会报错，更早的版本会作用于整个合并的正则
+                regexes.append(compiled)
+                continue
+            mergeable.append(pattern)
+        if len(mergeable) == 1:
+            regexes.insert(0, re.compile(mergeable[0], flags))
+        elif mergeable:
+            regexes.insert(
+                0, re.compile("|".join(f"(?:{p})" for p in mergeable), flags)
+            )
+        return regexes
+
+    def _search_regexes(self, content: str) -> bool:
+        return any(regex.search(content) for regex in self._regexes)
+
+    def check(self, content: str) -> tuple[bool, str]:
+        content = self.normalize(content)
+        if self._automaton and self._automaton.scan(content)[0] != -1:
+            return False, "内容安全检查不通过，匹配到敏感词。"
+        if self._regexes and self._search_regexes(content):
+            return False, "内容安全检查不通过，匹配到敏感词。"
         return True, ""
+
+    def create_stream_scanner(self) -> KeywordStreamScanner:
+        return KeywordStreamScanner(self)
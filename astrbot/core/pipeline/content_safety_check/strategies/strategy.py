@@ -10,7 +10,13 @@ class StrategySelector:
             from .keywords import KeywordsStrategy
 
             self.enabled_strategies.append(
-                KeywordsStrategy(config["internal_keywords"]["extra_keywords"])
+                KeywordsStrategy(
+                    config["internal_keywords"]["extra_keywords"],
+                    normalize=config["internal_keywords"].get("normalize", False),
+                    traditional_to_simplified=config["internal_keywords"].get(
+                        "traditional_to_simplified", False
+                    ),
+                )
             )
         if config["baidu_aip"]["enable"]:
             try:
@@ -32,3 +38,11 @@ class StrategySelector:
             if not ok:
                 return False, info
         return True, ""
+
+    def create_stream_scanners(self) -> list:
+        """为支持增量检查的策略创建流式扫描器，用于逐段检查流式输出"""
+        return [
+            strategy.create_stream_scanner()
+            for strategy in self.enabled_strategies
+            if hasattr(strategy, "create_stream_scanner")
+        ]
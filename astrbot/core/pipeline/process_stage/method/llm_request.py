@@ -3,7 +3,6 @@
 """
 
 import asyncio
-import copy
 import json
 import traceback
 from typing import AsyncGenerator, Union
@@ -305,11 +304,20 @@ class LLMRequestSubStage(Stage):
             max(1, settings["dequeue_context_length"]),
             self.max_context_length - 1,
         )
+        # 只读取最近的几轮历史记录。多读取 dequeue_context_length 轮, 使下面的截断逻辑仍然按批丢弃旧的记录
+        self.history_limit: int | None = (
+            None
+            if self.max_context_length == -1
+            else (self.max_context_length + self.dequeue_context_length) * 2
+        )
         self.streaming_response: bool = settings["streaming_response"]
         self.max_step: int = settings.get("max_agent_step", 30)
         if isinstance(self.max_step, bool):  # workaround: #2622
             self.max_step = 30
         self.show_tool_use: bool = settings.get("show_tool_use_status", True)
+        self.parallel_tool_calls: bool = settings.get("parallel_tool_calls", False)
+        self.max_parallel_tool_calls: int = settings.get("max_parallel_tool_calls", 4)
+        self.tool_call_timeout: int = settings.get("tool_call_timeout", 0)
 
         for bwp in self.bot_wake_prefixs:
             if self.provider_wake_prefix.startswith(bwp):
@@ -340,10 +348,14 @@ class LLMRequestSubStage(Stage):
         cid = await conv_mgr.get_curr_conversation_id(umo)
         if not cid:
             cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-        conversation = await conv_mgr.get_conversation(umo, cid)
+        conversation = await conv_mgr.get_conversation(
+            umo, cid, history_limit=self.history_limit
+        )
         if not conversation:
             cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-            conversation = await conv_mgr.get_conversation(umo, cid)
+            conversation = await conv_mgr.get_conversation(
+                umo, cid, history_limit=self.history_limit
+            )
         if not conversation:
             raise RuntimeError("无法创建新的对话。")
         return conversation
@@ -406,6 +418,17 @@ class LLMRequestSubStage(Stage):
         if isinstance(req.contexts, str):
             req.contexts = json.loads(req.contexts)
 
+        # 记录读取到的历史记录条数, 以及插件是否修改了历史记录, 用于保存时决定是追加还是覆盖
+        history_len = 0
+        history_changed = False
+        if req.conversation:
+            history = json.loads(req.conversation.history)
+            history_len = len(history)
+            history_changed = (
+                json.dumps([item for item in req.contexts if "_no_save" not in item])
+                != req.conversation.history
+            )
+
         # max context length
         if (
             self.max_context_length != -1  # -1 为不限制
@@ -481,6 +504,9 @@ class LLMRequestSubStage(Stage):
             tool_executor=FunctionToolExecutor(),
             agent_hooks=MAIN_AGENT_HOOKS,
             streaming=self.streaming_response,
+            parallel_tool_calls=self.parallel_tool_calls,
+            max_parallel_tool_calls=self.max_parallel_tool_calls,
+            tool_call_timeout=self.tool_call_timeout,
         )
 
         if self.streaming_response:
@@ -511,18 +537,22 @@ class LLMRequestSubStage(Stage):
             async for _ in run_agent(agent_runner, self.max_step, self.show_tool_use):
                 yield
 
-        await self._save_to_history(event, req, agent_runner.get_final_llm_resp())
+        await self._save_to_history(
+            event,
+            req,
+            agent_runner.get_final_llm_resp(),
+            history_len,
+            history_changed,
+        )
 
         # 异步处理 WebChat 特殊情况
         if event.get_platform_name() == "webchat":
             asyncio.create_task(self._handle_webchat(event, req, provider))
 
-        asyncio.create_task(
-            Metric.upload(
-                llm_tick=1,
-                model_name=agent_runner.provider.get_model(),
-                provider_type=agent_runner.provider.meta().type,
-            )
+        Metric.record(
+            llm_tick=1,
+            model_name=agent_runner.provider.get_model(),
+            provider_type=agent_runner.provider.meta().type,
         )
 
     async def _handle_webchat(
@@ -530,7 +560,7 @@ class LLMRequestSubStage(Stage):
     ):
         """处理 WebChat 平台的特殊情况，包括第一次 LLM 对话时总结对话内容生成 title"""
         conversation = await self.conv_manager.get_conversation(
-            event.unified_msg_origin, req.conversation.cid
+            event.unified_msg_origin, req.conversation.cid, history_limit=2
         )
         if conversation and not req.conversation.title:
             messages = json.loads(conversation.history)
@@ -583,7 +613,13 @@ class LLMRequestSubStage(Stage):
         event: AstrMessageEvent,
         req: ProviderRequest,
         llm_response: LLMResponse | None,
+        history_len: int = 0,
+        history_changed: bool = False,
     ):
+        """保存这一轮对话到历史记录。
+
+        如果插件没有修改历史上下文, 则只追加这一轮的消息; 否则用修改后的上下文覆盖读取到的那部分历史记录。
+        """
         if (
             not req
             or not req.conversation
@@ -596,8 +632,10 @@ class LLMRequestSubStage(Stage):
             logger.debug("LLM 响应为空，不保存记录。")
             return
 
-        # 历史上下文
-        messages = copy.deepcopy(req.contexts)
+        messages = []
+        if history_changed:
+            # 历史上下文
+            messages.extend(req.contexts)
         # 这一轮对话请求的用户输入
         messages.append(await req.assemble_context())
         # 这一轮对话的 LLM 响应
@@ -609,8 +647,11 @@ class LLMRequestSubStage(Stage):
                     messages.extend(tcr.to_openai_messages())
         messages.append({"role": "assistant", "content": llm_response.completion_text})
         messages = list(filter(lambda item: "_no_save" not in item, messages))
-        await self.conv_manager.update_conversation(
-            event.unified_msg_origin, req.conversation.cid, history=messages
+        await self.conv_manager.append_history(
+            event.unified_msg_origin,
+            messages,
+            conversation_id=req.conversation.cid,
+            replace_last=history_len if history_changed else 0,
         )
 
     def fix_messages(self, messages: list[dict]) -> list[dict]:
@@ -0,0 +1,80 @@
+"""
+GCRA（Generic Cell Rate Algorithm）限流器
+
+GCRA 等价于令牌桶：每个键只需要保存一个浮点数 TAT（theoretical arrival time，理论到达时间），
+在 period 秒内最多放行 count 次请求，并允许 count 次的突发。
+
+- TAT 不晚于当前时间的键等价于满令牌的桶，会被定期清除，内存只与近期活跃的键数量有关。
+- 同一个请求可以同时受多个作用域（会话、用户、群组、平台、全局）的限制，只有所有作用域都允许时才放行。
+- 需要等待时可以直接预约一个时间点，调用方等待到该时间点即可，不需要持有锁或者反复检查。
+"""
+
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    count: int
+    """时间窗口内最多允许的请求数"""
+    period: float
+    """时间窗口（秒）"""
+
+    @property
+    def interval(self) -> float:
+        """两次请求之间的平均间隔"""
+        return self.period / self.count
+
+
+class GCRALimiter:
+    def __init__(self, sweep_interval: float = 60):
+        self.sweep_interval = sweep_interval
+        """清除空闲键的间隔（秒）"""
+        self._tat: dict[str, float] = {}
+        """键 -> 理论到达时间"""
+        self._last_sweep = time.monotonic()
+
+    def acquire(
+        self,
+        scopes: list[tuple[str, RateLimitRule]],
+        max_wait: float = 0,
+        now: float | None = None,
+    ) -> tuple[bool, float]:
+        """尝试获取一次请求的许可。
+
+        Args:
+            scopes: (键, 规则) 列表，所有作用域都允许时才放行
+            max_wait: 最多愿意等待的时间（秒）。需要等待的时间不超过 max_wait 时预约许可，调用方需要等待返回的时间后再继续
+            now: 当前时间（time.monotonic()），用于测试
+
+        Returns:
+            (是否获得许可, 需要等待的时间)。没有获得许可时，第二项为最早可以获得许可的等待时间
+        """
+        if now is None:
+            now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+        wait = 0.0
+        new_tats = []
+        for key, rule in scopes:
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + rule.interval
+            # 允许突发 count 次：new_tat 最多领先当前时间 period 秒
+            wait = max(wait, new_tat - rule.period - now)
+            new_tats.append((key, new_tat))
+        if wait > max_wait:
+            return False, wait
+        for key, new_tat in new_tats:
+            self._tat[key] = new_tat
+        return True, wait
+
+    def sweep(self, now: float | None = None):
+        """清除已经恢复到满令牌状态的键"""
+        if now is None:
+            now = time.monotonic()
+        self._tat = {key: tat for key, tat in self._tat.items() if tat > now}
+        self._last_sweep = now
+
+    def __len__(self) -> int:
+        return len(self._tat)
@@ -1,12 +1,12 @@
 import asyncio
-from datetime import datetime, timedelta
-from collections import defaultdict, deque
-from typing import DefaultDict, Deque, Union, AsyncGenerator
+from typing import Union, AsyncGenerator
 from ..stage import Stage, register_stage
 from ..context import PipelineContext
+from .limiter import GCRALimiter, RateLimitRule
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core import logger
 from astrbot.core.config.astrbot_config import RateLimitStrategy
+from astrbot.core.utils.event_permit import release_event_permit
 
 
 @register_stage
@@ -14,38 +14,65 @@ class RateLimitStage(Stage):
     """
     检查是否需要限制消息发送的限流器。
 
-    使用 Fixed Window 算法。
-    如果触发限流，将 stall 流水线，直到下一个时间窗口来临时自动唤醒。
+    使用 GCRA（令牌桶）算法，每个会话、用户、群组、平台只保存一个时间戳，空闲的状态会被定期清除。
+    如果触发限流，stall 策略会预约下一个可用的时间点并等待，等待时间超过一个时间窗口时丢弃该请求（旧版本会一直等待）；
+    discard 策略直接丢弃。
+
+    等待期间归还事件总线的并发许可，被限流的会话只会阻塞自己后续的消息，不占用其他会话的并发名额。
+    被限流的事件不重新放回事件队列，因为之前的阶段（如唤醒检查会去掉唤醒前缀）已经修改了事件。
     """
 
     def __init__(self):
-        # 存储每个会话的请求时间队列
-        self.event_timestamps: DefaultDict[str, Deque[datetime]] = defaultdict(deque)
-        # 为每个会话设置一个锁，避免并发冲突
-        self.locks: DefaultDict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.limiter = GCRALimiter()
         # 限流参数
         self.rate_limit_count: int = 0
-        self.rate_limit_time: timedelta = timedelta(0)
+        self.rate_limit_time: float = 0
+        self.scope_rules: dict[str, RateLimitRule] = {}
+        """作用域 -> 限流规则。session 为每个会话，user、group、platform 分别为每个用户、群组、平台，global 为全局"""
 
     async def initialize(self, ctx: PipelineContext) -> None:
         """
         初始化限流器，根据配置设置限流参数。
         """
-        self.rate_limit_count = ctx.astrbot_config["platform_settings"]["rate_limit"][
-            "count"
+        rate_limit_cfg = ctx.astrbot_config["platform_settings"]["rate_limit"]
+        self.rate_limit_count = rate_limit_cfg["count"]
+        self.rate_limit_time = rate_limit_cfg["time"]
+        self.rl_strategy = rate_limit_cfg["strategy"]  # stall or discard
+
+        counts = {
+            "session": self.rate_limit_count,
+            "user": rate_limit_cfg.get("user_count", 0),
+            "group": rate_limit_cfg.get("group_count", 0),
+            "platform": rate_limit_cfg.get("platform_count", 0),
+            "global": rate_limit_cfg.get("global_count", 0),
+        }
+        self.scope_rules = {
+            scope: RateLimitRule(count, self.rate_limit_time)
+            for scope, count in counts.items()
+            if count > 0 and self.rate_limit_time > 0
+        }
+
+    def _get_scopes(self, event: AstrMessageEvent) -> list[tuple[str, RateLimitRule]]:
+        platform_id = event.get_platform_id()
+        keys = {
+            "session": event.session_id,
+            "user": f"{platform_id}:{event.get_sender_id()}",
+            "platform": platform_id,
+            "global": "",
+        }
+        if group_id := event.get_group_id():
+            keys["group"] = f"{platform_id}:{group_id}"
+        return [
+            (f"{scope}:{keys[scope]}", rule)
+            for scope, rule in self.scope_rules.items()
+            if scope in keys
         ]
-        self.rate_limit_time = timedelta(
-            seconds=ctx.astrbot_config["platform_settings"]["rate_limit"]["time"]
-        )
-        self.rl_strategy = ctx.astrbot_config["platform_settings"]["rate_limit"][
-            "strategy"
-        ]  # stall or discard
 
     async def process(
         self, event: AstrMessageEvent
     ) -> Union[None, AsyncGenerator[None, None]]:
         """
-        检查并处理限流逻辑。如果触发限流，流水线会 stall 并在窗口期后自动恢复。
+        检查并处理限流逻辑。如果触发限流，流水线会 stall 并在获得许可后自动恢复。
 
         Args:
             event (AstrMessageEvent): 当前消息事件。
@@ -54,45 +81,25 @@ class RateLimitStage(Stage):
         Returns:
             MessageEventResult: 继续或停止事件处理的结果。
         """
-        session_id = event.session_id
-        now = datetime.now()
-
-        async with self.locks[session_id]:  # 确保同一会话不会并发修改队列
-            # 检查并处理限流，可能需要多次检查直到满足条件
-            while True:
-                timestamps = self.event_timestamps[session_id]
-                self._remove_expired_timestamps(timestamps, now)
-
-                if len(timestamps) < self.rate_limit_count:
-                    timestamps.append(now)
-                    break
-                else:
-                    next_window_time = timestamps[0] + self.rate_limit_time
-                    stall_duration = (next_window_time - now).total_seconds() + 0.3
-
-                    match self.rl_strategy:
-                        case RateLimitStrategy.STALL.value:
-                            logger.info(
-                                f"会话 {session_id} 被限流。根据限流策略，此会话处理将被暂停 {stall_duration:.2f} 秒。"
-                            )
-                            await asyncio.sleep(stall_duration)
-                            now = datetime.now()
-                        case RateLimitStrategy.DISCARD.value:
-                            logger.info(
-                                f"会话 {session_id} 被限流。根据限流策略，此请求已被丢弃，直到限额于 {stall_duration:.2f} 秒后重置。"
-                            )
-                            return event.stop_event()
-
-    def _remove_expired_timestamps(
-        self, timestamps: Deque[datetime], now: datetime
-    ) -> None:
-        """
-        移除时间窗口外的时间戳。
+        scopes = self._get_scopes(event)
+        if not scopes:
+            return
 
-        Args:
-            timestamps (Deque[datetime]): 当前会话的时间戳队列。
-            now (datetime): 当前时间，用于计算过期时间。
-        """
-        expiry_threshold: datetime = now - self.rate_limit_time
-        while timestamps and timestamps[0] < expiry_threshold:
-            timestamps.popleft()
+        session_id = event.session_id
+        max_wait = (
+            self.rate_limit_time
+            if self.rl_strategy == RateLimitStrategy.STALL.value
+            else 0
+        )
+        allowed, wait = self.limiter.acquire(scopes, max_wait=max_wait)
+        if not allowed:
+            logger.info(
+                f"会话 {session_id} 被限流。根据限流策略，此请求已被丢弃，直到限额于 {wait:.2f} 秒后恢复。"
+            )
+            return event.stop_event()
+        if wait > 0:
+            logger.info(
+                f"会话 {session_id} 被限流。根据限流策略，此会话处理将被暂停 {wait:.2f} 秒。"
+            )
+            release_event_permit()
+            await asyncio.sleep(wait)
@@ -1,3 +1,4 @@
+import asyncio
 import re
 import time
 import traceback
@@ -74,10 +75,22 @@ class ResultDecorateStage(Stage):
         self, event: AstrMessageEvent
     ) -> Union[None, AsyncGenerator[None, None]]:
         result = event.get_result()
-        if result is None or not result.chain:
+        if result is None:
             return
 
         if result.result_content_type == ResultContentType.STREAMING_RESULT:
+            # 流式输出逐段检查内容安全
+            if (
+                self.content_safe_check_reply
+                and self.content_safe_check_stage
+                and result.async_stream is not None
+            ):
+                result.async_stream = self.content_safe_check_stage.guard_stream(
+                    event, result.async_stream
+                )
+            return
+
+        if not result.chain:
             return
 
         is_stream = result.result_content_type == ResultContentType.STREAMING_FINISH
@@ -87,7 +100,7 @@ class ResultDecorateStage(Stage):
             self.content_safe_check_reply
             and self.content_safe_check_stage
             and result.is_llm_result()
-            and not is_stream  # 流式输出不检查内容安全
+            and not is_stream  # 流式输出已经在输出时逐段检查
         ):
             text = ""
             for comp in result.chain:
@@ -190,12 +203,29 @@ class ResultDecorateStage(Stage):
                         f"会话 {event.unified_msg_origin} 未配置文本转语音模型。"
                     )
                     return
+                # 各个消息段并发合成，提供商的并发数由 CachedTTSProvider 限制
+                tts_comps = [
+                    comp
+                    for comp in result.chain
+                    if isinstance(comp, Plain) and len(comp.text) > 1
+                ]
+                for comp in tts_comps:
+                    logger.info(f"TTS 请求: {comp.text}")
+                audio_results = await asyncio.gather(
+                    *(tts_provider.get_audio(comp.text) for comp in tts_comps),
+                    return_exceptions=True,
+                )
+                audio_map = {
+                    id(comp): audio for comp, audio in zip(tts_comps, audio_results)
+                }
+
                 new_chain = []
                 for comp in result.chain:
-                    if isinstance(comp, Plain) and len(comp.text) > 1:
+                    if id(comp) in audio_map:
                         try:
-                            logger.info(f"TTS 请求: {comp.text}")
-                            audio_path = await tts_provider.get_audio(comp.text)
+                            audio_path = audio_map[id(comp)]
+                            if isinstance(audio_path, BaseException):
+                                raise audio_path
                             logger.info(f"TTS 结果: {audio_path}")
                             if not audio_path:
                                 logger.error(
@@ -5,7 +5,9 @@ from astrbot.core.message.components import At, AtAll, Reply
 from astrbot.core.message.message_event_result import MessageChain, MessageEventResult
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.star.filter.permission import PermissionTypeFilter
+from astrbot.core.star.filter.command import get_command_str
 from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.command_index import command_dispatch_index
 from astrbot.core.star.session_plugin_manager import SessionPluginManager
 from astrbot.core.star.star import star_map
 from astrbot.core.star.star_handler import EventType, star_handlers_registry
@@ -122,9 +124,15 @@ class WakingCheckStage(Stage):
             event.plugins_name = enabled_plugins_name
         logger.debug(f"enabled_plugins_name: {enabled_plugins_name}")
 
-        for handler in star_handlers_registry.get_handlers_by_event_type(
-            EventType.AdapterMessageEvent, plugins_name=event.plugins_name
-        ):
+        # 通过指令索引跳过不可能匹配的指令处理函数，消息文本只规范化一次
+        handlers = command_dispatch_index.select(
+            star_handlers_registry.get_handlers_by_event_type(
+                EventType.AdapterMessageEvent, plugins_name=event.plugins_name
+            ),
+            get_command_str(event),
+            event.message_str,
+        )
+        for handler in handlers:
             # filter 需满足 AND 逻辑关系
             passed = True
             permission_not_pass = False
@@ -70,6 +70,9 @@ class AstrMessageEvent(abc.ABC):
         self.plugins_name: list[str] | None = None
         """该事件启用的插件名称列表。None 表示所有插件都启用。空列表表示没有启用任何插件。"""
 
+        self._command_str: tuple[str, str] | None = None
+        """(消息文本, 规范化后用于匹配指令的消息文本)，见 star.filter.command.get_command_str"""
+
         # back_compability
         self.platform = platform_meta
 
@@ -231,9 +234,7 @@ class AstrMessageEvent(abc.ABC):
         目前仅支持: telegram，qq official 私聊。
         Fallback仅支持 aiocqhttp。
         """
-        asyncio.create_task(
-            Metric.upload(msg_event_tick=1, adapter_name=self.platform_meta.name)
-        )
+        Metric.record(msg_event_tick=1, adapter_name=self.platform_meta.name)
         self._has_send_oper = True
 
     async def _pre_send(self):
@@ -409,11 +410,7 @@ class AstrMessageEvent(abc.ABC):
         # Leverage BLAKE2 hash function to generate a non-reversible hash of the sender ID for privacy.
         hash_obj = hashlib.blake2b(self.get_sender_id().encode("utf-8"), digest_size=16)
         sid = str(uuid.UUID(bytes=hash_obj.digest()))
-        asyncio.create_task(
-            Metric.upload(
-                msg_event_tick=1, adapter_name=self.platform_meta.name, sid=sid
-            )
-        )
+        Metric.record(msg_event_tick=1, adapter_name=self.platform_meta.name, sid=sid)
         self._has_send_oper = True
 
     async def react(self, emoji: str):
@@ -44,7 +44,7 @@ class Platform(abc.ABC):
 
         异步方法。
         """
-        await Metric.upload(msg_event_tick=1, adapter_name=self.meta().name)
+        Metric.record(msg_event_tick=1, adapter_name=self.meta().name)
 
     def commit_event(self, event: AstrMessageEvent):
         """
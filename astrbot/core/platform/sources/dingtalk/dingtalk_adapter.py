@@ -1,7 +1,6 @@
 import asyncio
 import os
 import uuid
-import aiohttp
 import dingtalk_stream
 import threading
 
@@ -21,6 +20,7 @@ from astrbot import logger
 from dingtalk_stream import AckMessage
 from astrbot.core.utils.io import download_file
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 
 
 class MyEventHandler(dingtalk_stream.EventHandler):
@@ -156,20 +156,18 @@ class DingtalkPlatformAdapter(Platform):
         }
         temp_dir = os.path.join(get_astrbot_data_path(), "temp")
         f_path = os.path.join(temp_dir, f"dingtalk_file_{uuid.uuid4()}.{ext}")
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.dingtalk.com/v1.0/robot/messageFiles/download",
-                headers=headers,
-                json=payload,
-            ) as resp:
-                if resp.status != 200:
-                    logger.error(
-                        f"下载钉钉文件失败: {resp.status}, {await resp.text()}"
-                    )
-                    return None
-                resp_data = await resp.json()
-                download_url = resp_data["data"]["downloadUrl"]
-                await download_file(download_url, f_path)
+        session = http_client.get_session(trust_env=False)
+        async with session.post(
+            "https://api.dingtalk.com/v1.0/robot/messageFiles/download",
+            headers=headers,
+            json=payload,
+        ) as resp:
+            if resp.status != 200:
+                logger.error(f"下载钉钉文件失败: {resp.status}, {await resp.text()}")
+                return None
+            resp_data = await resp.json()
+            download_url = resp_data["data"]["downloadUrl"]
+            await download_file(download_url, f_path)
         return f_path
 
     async def get_access_token(self) -> str:
@@ -177,17 +175,17 @@ class DingtalkPlatformAdapter(Platform):
             "appKey": self.client_id,
             "appSecret": self.client_secret,
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.dingtalk.com/v1.0/oauth2/accessToken",
-                json=payload,
-            ) as resp:
-                if resp.status != 200:
-                    logger.error(
-                        f"获取钉钉机器人 access_token 失败: {resp.status}, {await resp.text()}"
-                    )
-                    return None
-                return (await resp.json())["data"]["accessToken"]
+        session = http_client.get_session(trust_env=False)
+        async with session.post(
+            "https://api.dingtalk.com/v1.0/oauth2/accessToken",
+            json=payload,
+        ) as resp:
+            if resp.status != 200:
+                logger.error(
+                    f"获取钉钉机器人 access_token 失败: {resp.status}, {await resp.text()}"
+                )
+                return None
+            return (await resp.json())["data"]["accessToken"]
 
     async def handle_msg(self, abm: AstrBotMessage):
         event = DingtalkMessageEvent(
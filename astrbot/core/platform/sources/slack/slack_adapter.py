@@ -1,7 +1,6 @@
 import time
 import asyncio
 import uuid
-import aiohttp
 import re
 import base64
 from typing import Awaitable, Any
@@ -21,6 +20,7 @@ from astrbot.api.message_components import *  # noqa: F403
 from astrbot.api import logger
 from astrbot.core.platform.astr_message_event import MessageSesion
 from ...register import register_platform_adapter
+from astrbot.core.utils.http_client import http_client
 
 
 @register_platform_adapter(
@@ -301,17 +301,17 @@ class SlackAdapter(Platform):
     async def get_file_base64(self, url: str) -> str:
         """下载 Slack 文件并返回 Base64 编码的内容"""
         headers = {"Authorization": f"Bearer {self.bot_token}"}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as resp:
-                if resp.status == 200:
-                    content = await resp.read()
-                    base64_content = base64.b64encode(content).decode("utf-8")
-                    return base64_content
-                else:
-                    logger.error(
-                        f"Failed to download slack file: {resp.status} {await resp.text()}"
-                    )
-                    raise Exception(f"下载文件失败: {resp.status}")
+        session = http_client.get_session(trust_env=False)
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 200:
+                content = await resp.read()
+                base64_content = base64.b64encode(content).decode("utf-8")
+                return base64_content
+            else:
+                logger.error(
+                    f"Failed to download slack file: {resp.status} {await resp.text()}"
+                )
+                raise Exception(f"下载文件失败: {resp.status}")
 
     async def run(self) -> Awaitable[Any]:
         self.bot_self_id = await self.get_bot_user_id()
@@ -23,6 +23,7 @@ from astrbot.core.platform.astr_message_event import MessageSesion
 
 from ...register import register_platform_adapter
 from .wechatpadpro_message_event import WeChatPadProMessageEvent
+from astrbot.core.utils.http_client import http_client
 
 try:
     from .xml_data_parser import GeweDataParser
@@ -171,44 +172,44 @@ class WeChatPadProAdapter(Platform):
         url = f"{self.base_url}/login/GetLoginStatus"
         params = {"key": self.auth_key}
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, params=params) as response:
-                    response_data = await response.json()
-                    # 根据提供的在线接口返回示例，成功状态码是 200，loginState 为 1 表示在线
-                    if response.status == 200 and response_data.get("Code") == 200:
-                        login_state = response_data.get("Data", {}).get("loginState")
-                        if login_state == 1:
-                            logger.info("WeChatPadPro 设备当前在线。")
-                            return True
-                        # login_state == 3 为离线状态
-                        elif login_state == 3:
-                            logger.info("WeChatPadPro 设备不在线。")
-                            return False
-                        else:
-                            logger.error(f"未知的在线状态: {response_data}")
-                            return False
-                    # Code == 300 为微信退出状态。
-                    elif response.status == 200 and response_data.get("Code") == 300:
-                        logger.info("WeChatPadPro 设备已退出。")
-                        return False
-                    elif response.status == 200 and response_data.get("Code") == -2:
-                        # 该链接不存在
-                        self.auth_key = None
+        session = http_client.get_session(trust_env=False)
+        try:
+            async with session.get(url, params=params) as response:
+                response_data = await response.json()
+                # 根据提供的在线接口返回示例，成功状态码是 200，loginState 为 1 表示在线
+                if response.status == 200 and response_data.get("Code") == 200:
+                    login_state = response_data.get("Data", {}).get("loginState")
+                    if login_state == 1:
+                        logger.info("WeChatPadPro 设备当前在线。")
+                        return True
+                    # login_state == 3 为离线状态
+                    elif login_state == 3:
+                        logger.info("WeChatPadPro 设备不在线。")
                         return False
                     else:
-                        logger.error(
-                            f"检查在线状态失败: {response.status}, {response_data}"
-                        )
+                        logger.error(f"未知的在线状态: {response_data}")
                         return False
+                # Code == 300 为微信退出状态。
+                elif response.status == 200 and response_data.get("Code") == 300:
+                    logger.info("WeChatPadPro 设备已退出。")
+                    return False
+                elif response.status == 200 and response_data.get("Code") == -2:
+                    # 该链接不存在
+                    self.auth_key = None
+                    return False
+                else:
+                    logger.error(
+                        f"检查在线状态失败: {response.status}, {response_data}"
+                    )
+                    return False
 
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-                return False
-            except Exception as e:
-                logger.error(f"检查在线状态时发生错误: {e}")
-                logger.error(traceback.format_exc())
-                return False
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"检查在线状态时发生错误: {e}")
+            logger.error(traceback.format_exc())
+            return False
 
     def _extract_auth_key(self, data):
         """Helper method to extract auth_key from response data."""
@@ -230,32 +231,30 @@ class WeChatPadProAdapter(Platform):
 
         self.auth_key = None  # Reset auth_key before generating a new one
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, params=params, json=payload) as response:
-                    if response.status != 200:
-                        logger.error(
-                            f"生成授权码失败: {response.status}, {await response.text()}"
-                        )
-                        return
+        session = http_client.get_session(trust_env=False)
+        try:
+            async with session.post(url, params=params, json=payload) as response:
+                if response.status != 200:
+                    logger.error(
+                        f"生成授权码失败: {response.status}, {await response.text()}"
+                    )
+                    return
 
-                    response_data = await response.json()
-                    if response_data.get("Code") == 200:
-                        if data := response_data.get("Data"):
-                            self.auth_key = self._extract_auth_key(data)
+                response_data = await response.json()
+                if response_data.get("Code") == 200:
+                    if data := response_data.get("Data"):
+                        self.auth_key = self._extract_auth_key(data)
 
-                        if self.auth_key:
-                            logger.info("成功获取授权码")
-                        else:
-                            logger.error(
-                                f"生成授权码成功但未找到授权码: {response_data}"
-                            )
+                    if self.auth_key:
+                        logger.info("成功获取授权码")
                     else:
-                        logger.error(f"生成授权码失败: {response_data}")
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-            except Exception as e:
-                logger.error(f"生成授权码时发生错误: {e}")
+                        logger.error(f"生成授权码成功但未找到授权码: {response_data}")
+                else:
+                    logger.error(f"生成授权码失败: {response_data}")
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+        except Exception as e:
+            logger.error(f"生成授权码时发生错误: {e}")
 
     async def get_login_qr_code(self):
         """
@@ -265,39 +264,39 @@ class WeChatPadProAdapter(Platform):
         params = {"key": self.auth_key}
         payload = {}  # 根据文档，这个接口的 body 可以为空
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, params=params, json=payload) as response:
-                    response_data = await response.json()
-                    if response.status == 200 and response_data.get("Code") == 200:
-                        # 二维码地址在 Data.QrCodeUrl 字段中
-                        if response_data.get("Data") and response_data["Data"].get(
-                            "QrCodeUrl"
-                        ):
-                            return response_data["Data"]["QrCodeUrl"]
-                        else:
-                            logger.error(
-                                f"获取登录二维码成功但未找到二维码地址: {response_data}"
-                            )
-                            return None
-                    elif "该 key 无效" in response_data.get("Text"):
-                        logger.error(
-                            "授权码无效，已经清除。请重新启动 AstrBot 或者本消息适配器。原因也可能是 WeChatPadPro 的 MySQL 服务没有启动成功，请检查 WeChatPadPro 服务的日志。"
-                        )
-                        self.auth_key = None
-                        self.save_credentials()
-                        return None
+        session = http_client.get_session(trust_env=False)
+        try:
+            async with session.post(url, params=params, json=payload) as response:
+                response_data = await response.json()
+                if response.status == 200 and response_data.get("Code") == 200:
+                    # 二维码地址在 Data.QrCodeUrl 字段中
+                    if response_data.get("Data") and response_data["Data"].get(
+                        "QrCodeUrl"
+                    ):
+                        return response_data["Data"]["QrCodeUrl"]
                     else:
                         logger.error(
-                            f"获取登录二维码失败: {response.status}, {response_data}"
+                            f"获取登录二维码成功但未找到二维码地址: {response_data}"
                         )
                         return None
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"获取登录二维码时发生错误: {e}")
-                return None
+                elif "该 key 无效" in response_data.get("Text"):
+                    logger.error(
+                        "授权码无效，已经清除。请重新启动 AstrBot 或者本消息适配器。原因也可能是 WeChatPadPro 的 MySQL 服务没有启动成功，请检查 WeChatPadPro 服务的日志。"
+                    )
+                    self.auth_key = None
+                    self.save_credentials()
+                    return None
+                else:
+                    logger.error(
+                        f"获取登录二维码失败: {response.status}, {response_data}"
+                    )
+                    return None
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"获取登录二维码时发生错误: {e}")
+            return None
 
     async def check_login_status(self):
         """
@@ -313,54 +312,52 @@ class WeChatPadProAdapter(Platform):
         countdown = 180  # 倒计时时长
         logger.info(f"请在 {countdown} 秒内扫码登录。")
         while attempts < max_attempts:
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.get(url, params=params) as response:
-                        response_data = await response.json()
-                        # 成功判断条件和数据提取路径
-                        if response.status == 200 and response_data.get("Code") == 200:
-                            if (
-                                response_data.get("Data")
-                                and response_data["Data"].get("state") is not None
-                            ):
-                                status = response_data["Data"]["state"]
+            session = http_client.get_session(trust_env=False)
+            try:
+                async with session.get(url, params=params) as response:
+                    response_data = await response.json()
+                    # 成功判断条件和数据提取路径
+                    if response.status == 200 and response_data.get("Code") == 200:
+                        if (
+                            response_data.get("Data")
+                            and response_data["Data"].get("state") is not None
+                        ):
+                            status = response_data["Data"]["state"]
+                            logger.info(
+                                f"第 {attempts + 1} 次尝试，当前登录状态: {status}，还剩{countdown - attempts * 5}秒"
+                            )
+                            if status == 2:  # 状态 2 表示登录成功
+                                self.wxid = response_data["Data"].get("wxid")
+                                self.wxnewpass = response_data["Data"].get("wxnewpass")
                                 logger.info(
-                                    f"第 {attempts + 1} 次尝试，当前登录状态: {status}，还剩{countdown - attempts * 5}秒"
-                                )
-                                if status == 2:  # 状态 2 表示登录成功
-                                    self.wxid = response_data["Data"].get("wxid")
-                                    self.wxnewpass = response_data["Data"].get(
-                                        "wxnewpass"
-                                    )
-                                    logger.info(
-                                        f"登录成功，wxid: {self.wxid}, wxnewpass: {self.wxnewpass}"
-                                    )
-                                    self.save_credentials()  # 登录成功后保存凭据
-                                    return True
-                                elif status == -2:  # 二维码过期
-                                    logger.error("二维码已过期，请重新获取。")
-                                    return False
-                            else:
-                                logger.error(
-                                    f"检测登录状态成功但未找到登录状态: {response_data}"
+                                    f"登录成功，wxid: {self.wxid}, wxnewpass: {self.wxnewpass}"
                                 )
-                        elif response_data.get("Code") == 300:
-                            # "不存在状态"
-                            pass
+                                self.save_credentials()  # 登录成功后保存凭据
+                                return True
+                            elif status == -2:  # 二维码过期
+                                logger.error("二维码已过期，请重新获取。")
+                                return False
                         else:
-                            logger.info(
-                                f"检测登录状态失败: {response.status}, {response_data}"
+                            logger.error(
+                                f"检测登录状态成功但未找到登录状态: {response_data}"
                             )
+                    elif response_data.get("Code") == 300:
+                        # "不存在状态"
+                        pass
+                    else:
+                        logger.info(
+                            f"检测登录状态失败: {response.status}, {response_data}"
+                        )
 
-                except aiohttp.ClientConnectorError as e:
-                    logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-                    await asyncio.sleep(5)
-                    attempts += 1
-                    continue
-                except Exception as e:
-                    logger.error(f"检测登录状态时发生错误: {e}")
-                    attempts += 1
-                    continue
+            except aiohttp.ClientConnectorError as e:
+                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+                await asyncio.sleep(5)
+                attempts += 1
+                continue
+            except Exception as e:
+                logger.error(f"检测登录状态时发生错误: {e}")
+                attempts += 1
+                continue
 
             attempts += 1
             await asyncio.sleep(5)  # 每隔5秒检测一次
@@ -550,34 +547,32 @@ class WeChatPadProAdapter(Platform):
             "ChatRoomName": group_id,
         }
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, params=params, json=payload) as response:
-                    response_data = await response.json()
-                    if response.status == 200 and response_data.get("Code") == 200:
-                        # 从返回数据中查找对应成员的昵称
-                        member_list = (
-                            response_data.get("Data", {})
-                            .get("member_data", {})
-                            .get("chatroom_member_list", [])
-                        )
-                        for member in member_list:
-                            if member.get("user_name") == member_wxid:
-                                return member.get("nick_name")
-                        logger.warning(
-                            f"在群 {group_id} 中未找到成员 {member_wxid} 的昵称"
-                        )
-                    else:
-                        logger.error(
-                            f"获取群成员详情失败: {response.status}, {response_data}"
-                        )
-                    return None
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"获取群成员详情时发生错误: {e}")
+        session = http_client.get_session(trust_env=False)
+        try:
+            async with session.post(url, params=params, json=payload) as response:
+                response_data = await response.json()
+                if response.status == 200 and response_data.get("Code") == 200:
+                    # 从返回数据中查找对应成员的昵称
+                    member_list = (
+                        response_data.get("Data", {})
+                        .get("member_data", {})
+                        .get("chatroom_member_list", [])
+                    )
+                    for member in member_list:
+                        if member.get("user_name") == member_wxid:
+                            return member.get("nick_name")
+                    logger.warning(f"在群 {group_id} 中未找到成员 {member_wxid} 的昵称")
+                else:
+                    logger.error(
+                        f"获取群成员详情失败: {response.status}, {response_data}"
+                    )
                 return None
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"获取群成员详情时发生错误: {e}")
+            return None
 
     async def _download_raw_image(
         self, from_user_name: str, to_user_name: str, msg_id: int
@@ -593,20 +588,20 @@ class WeChatPadProAdapter(Platform):
             "ToUserName": to_user_name,
             "TotalLen": 0,
         }
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, params=params, json=payload) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        logger.error(f"下载图片失败: {response.status}")
-                        return None
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"下载图片时发生错误: {e}")
-                return None
+        session = http_client.get_session(trust_env=False)
+        try:
+            async with session.post(url, params=params, json=payload) as response:
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    logger.error(f"下载图片失败: {response.status}")
+                    return None
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"下载图片时发生错误: {e}")
+            return None
 
     async def download_voice(
         self, to_user_name: str, new_msg_id: str, bufid: str, length: int
@@ -620,19 +615,19 @@ class WeChatPadProAdapter(Platform):
             "NewMsgId": new_msg_id,
             "Length": length,
         }
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, params=params, json=payload) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    logger.error(f"下载音频失败: {response.status}")
-                    return None
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"下载音频时发生错误: {e}")
+        session = http_client.get_session(trust_env=False)
+        try:
+            async with session.post(url, params=params, json=payload) as response:
+                if response.status == 200:
+                    return await response.json()
+                logger.error(f"下载音频失败: {response.status}")
                 return None
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"下载音频时发生错误: {e}")
+            return None
 
     async def _process_message_content(
         self, abm: AstrBotMessage, raw_message: dict, msg_type: int, content: str
@@ -870,29 +865,29 @@ class WeChatPadProAdapter(Platform):
         url = f"{self.base_url}/friend/GetContactList"
         params = {"key": self.auth_key}
         payload = {"CurrentChatRoomContactSeq": 0, "CurrentWxcontactSeq": 0}
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, params=params, json=payload) as response:
-                    if response.status != 200:
-                        logger.error(f"获取联系人列表失败: {response.status}")
-                        return None
-                    result = await response.json()
-                    if result.get("Code") == 200 and result.get("Data"):
-                        contact_list = (
-                            result.get("Data", {})
-                            .get("ContactList", {})
-                            .get("contactUsernameList", [])
-                        )
-                        return contact_list
-                    else:
-                        logger.error(f"获取联系人列表失败: {result}")
-                        return None
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"获取联系人列表时发生错误: {e}")
-                return None
+        session = http_client.get_session(trust_env=False)
+        try:
+            async with session.post(url, params=params, json=payload) as response:
+                if response.status != 200:
+                    logger.error(f"获取联系人列表失败: {response.status}")
+                    return None
+                result = await response.json()
+                if result.get("Code") == 200 and result.get("Data"):
+                    contact_list = (
+                        result.get("Data", {})
+                        .get("ContactList", {})
+                        .get("contactUsernameList", [])
+                    )
+                    return contact_list
+                else:
+                    logger.error(f"获取联系人列表失败: {result}")
+                    return None
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"获取联系人列表时发生错误: {e}")
+            return None
 
     async def get_contact_details_list(
         self, room_wx_id_list: list[str] = None, user_names: list[str] = None
@@ -907,22 +902,22 @@ class WeChatPadProAdapter(Platform):
         url = f"{self.base_url}/friend/GetContactDetailsList"
         params = {"key": self.auth_key}
         payload = {"RoomWxIDList": room_wx_id_list, "UserNames": user_names}
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, params=params, json=payload) as response:
-                    if response.status != 200:
-                        logger.error(f"获取联系人详情列表失败: {response.status}")
-                        return None
-                    result = await response.json()
-                    if result.get("Code") == 200 and result.get("Data"):
-                        contact_list = result.get("Data", {}).get("contactList", {})
-                        return contact_list
-                    else:
-                        logger.error(f"获取联系人详情列表失败: {result}")
-                        return None
-            except aiohttp.ClientConnectorError as e:
-                logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"获取联系人详情列表时发生错误: {e}")
-                return None
+        session = http_client.get_session(trust_env=False)
+        try:
+            async with session.post(url, params=params, json=payload) as response:
+                if response.status != 200:
+                    logger.error(f"获取联系人详情列表失败: {response.status}")
+                    return None
+                result = await response.json()
+                if result.get("Code") == 200 and result.get("Data"):
+                    contact_list = result.get("Data", {}).get("contactList", {})
+                    return contact_list
+                else:
+                    logger.error(f"获取联系人详情列表失败: {result}")
+                    return None
+        except aiohttp.ClientConnectorError as e:
+            logger.error(f"连接到 WeChatPadPro 服务失败: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"获取联系人详情列表时发生错误: {e}")
+            return None
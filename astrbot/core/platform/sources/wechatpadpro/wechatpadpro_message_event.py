@@ -18,6 +18,7 @@ from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.platform.astrbot_message import AstrBotMessage, MessageType
 from astrbot.core.platform.platform_metadata import PlatformMetadata
 from astrbot.core.utils.tencent_record_helper import audio_to_tencent_silk_base64
+from astrbot.core.utils.http_client import http_client
 
 if TYPE_CHECKING:
     from .wechatpadpro_adapter import WeChatPadProAdapter
@@ -37,17 +38,17 @@ class WeChatPadProMessageEvent(AstrMessageEvent):
         self.adapter = adapter  # Save the adapter instance
 
     async def send(self, message: MessageChain):
-        async with aiohttp.ClientSession() as session:
-            for comp in message.chain:
-                await asyncio.sleep(1)
-                if isinstance(comp, Plain):
-                    await self._send_text(session, comp.text)
-                elif isinstance(comp, Image):
-                    await self._send_image(session, comp)
-                elif isinstance(comp, WechatEmoji):
-                    await self._send_emoji(session, comp)
-                elif isinstance(comp, Record):
-                    await self._send_voice(session, comp)
+        session = http_client.get_session(trust_env=False)
+        for comp in message.chain:
+            await asyncio.sleep(1)
+            if isinstance(comp, Plain):
+                await self._send_text(session, comp.text)
+            elif isinstance(comp, Image):
+                await self._send_image(session, comp)
+            elif isinstance(comp, WechatEmoji):
+                await self._send_emoji(session, comp)
+            elif isinstance(comp, Record):
+                await self._send_voice(session, comp)
         await super().send(message)
 
     async def _send_image(self, session: aiohttp.ClientSession, comp: Image):
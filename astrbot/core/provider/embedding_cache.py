@@ -0,0 +1,165 @@
+"""
+查询向量缓存与请求合并
+
+知识库、长期记忆等检索场景中，相同的问题会被反复转换为向量，而并发的检索各自发起一次 HTTP 请求。
+CachedEmbeddingProvider 包装一个 EmbeddingProvider：
+
+- 以 (模型, 维度, 规范化后的文本) 为键缓存 get_embedding 的结果（LRU + 过期时间）。
+- 在 batch_window 秒内到达的 get_embedding 请求会合并为一次 get_embeddings 批量请求，降低延迟和提供商的限流压力。
+
+get_embeddings（批量导入文档）不经过缓存，直接调用被包装的提供商。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from astrbot.core import logger
+
+from .provider import EmbeddingProvider, ProviderMeta
+
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        cache_size: int = 2048,
+        ttl: float = 3600,
+        batch_window: float = 0.005,
+        max_batch_size: int = 64,
+    ) -> None:
+        super().__init__(provider.provider_config, provider.provider_settings)
+        self.provider = provider
+        """被包装的 EmbeddingProvider"""
+        self.cache_size = cache_size
+        """最多缓存的向量数量，0 表示不缓存"""
+        self.ttl = ttl
+        """缓存的有效期（秒）"""
+        self.batch_window = batch_window
+        """合并请求的等待时间（秒），0 表示不合并"""
+        self.max_batch_size = max_batch_size
+        """一次合并请求的最大文本数量"""
+
+        self._cache: OrderedDict[tuple, tuple[list[float], float]] = OrderedDict()
+        """key -> (向量, 写入时间)"""
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._batch: list[tuple[tuple, str]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def __getattr__(self, name: str):
+        # 其余属性（client、model 等）转发给被包装的提供商
+        return getattr(self.provider, name)
+
+    def meta(self) -> ProviderMeta:
+        return self.provider.meta()
+
+    def get_model(self) -> str:
+        return self.provider.get_model()
+
+    def set_model(self, model_name: str):
+        self.provider.set_model(model_name)
+
+    def get_dim(self) -> int:
+        return self.provider.get_dim()
+
+    def _make_key(self, text: str) -> tuple:
+        model = getattr(self.provider, "model", None) or self.provider.get_model()
+        return (model, self.provider.get_dim(), " ".join(text.split()))
+
+    def _get_cached(self, key: tuple) -> list[float] | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        vector, created_at = entry
+        if time.monotonic() - created_at > self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return vector
+
+    def _put(self, key: tuple, vector: list[float]):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = (vector, time.monotonic())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def get_embedding(self, text: str) -> list[float]:
+        key = self._make_key(text)
+        if (vector := self._get_cached(key)) is not None:
+            self.hits += 1
+            return list(vector)
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            # 没有相同的文本正在请求
+            self.misses += 1
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            self._inflight[key] = fut
+            self._batch.append((key, text))
+            if self.batch_window <= 0 or len(self._batch) >= self.max_batch_size:
+                self._flush_batch()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(
+                    self.batch_window, self._flush_batch
+                )
+        # 调用者被取消时不影响其他等待同一结果的调用者
+        return list(await asyncio.shield(fut))
+
+    def _flush_batch(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[tuple, str]]):
+        self.batches += 1
+        texts = [text for _, text in batch]
+        try:
+            if len(texts) == 1:
+                vectors = [await self.provider.get_embedding(texts[0])]
+            else:
+                vectors = await self.provider.get_embeddings(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(
+                    f"Embedding 提供商返回的向量数量 {len(vectors)} 与文本数量 {len(texts)} 不一致"
+                )
+        except Exception as e:
+            logger.debug(f"合并的 Embedding 请求失败: {e}")
+            for key, _ in batch:
+                fut = self._inflight.pop(key, None)
+                if fut and not fut.done():
+                    fut.set_exception(e)
+                    # 避免没有等待者时出现 "Future exception was never retrieved"
+                    fut.exception()
+            return
+        for (key, _), vector in zip(batch, vectors):
+            self._put(key, vector)
+            fut = self._inflight.pop(key, None)
+            if fut and not fut.done():
+                fut.set_result(vector)
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        return await self.provider.get_embeddings(text)
+
+    def get_stats(self) -> dict:
+        """获取缓存的命中情况"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "cached": len(self._cache),
+        }
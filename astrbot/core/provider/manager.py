@@ -14,6 +14,8 @@ from .provider import (
     EmbeddingProvider,
     RerankProvider,
 )
+from .embedding_cache import CachedEmbeddingProvider
+from .tts_cache import CachedTTSProvider, tts_audio_cache
 from .register import llm_tools, provider_cls_map
 from ..persona_mgr import PersonaManager
 
@@ -134,11 +136,8 @@ class ProviderManager:
         """
         provider = None
         if umo:
-            provider_id = sp.get(
-                f"provider_perf_{provider_type.value}",
-                None,
-                scope="umo",
-                scope_id=umo,
+            provider_id = sp.get_cached(
+                "umo", umo, f"provider_perf_{provider_type.value}", None
             )
             if provider_id:
                 provider = self.inst_map.get(provider_id)
@@ -359,6 +358,21 @@ class ProviderManager:
                 if getattr(inst, "initialize", None):
                     await inst.initialize()
 
+                cache_enable = self.provider_tts_settings.get("cache_enable", True)
+                max_concurrency = self.provider_tts_settings.get("max_concurrency", 3)
+                if cache_enable or max_concurrency > 0:
+                    # 缓存合成的音频，并限制同时进行的合成请求数量
+                    tts_audio_cache.max_bytes = (
+                        self.provider_tts_settings.get("cache_max_mb", 256)
+                        * 1024
+                        * 1024
+                    )
+                    inst = CachedTTSProvider(
+                        inst,
+                        cache=tts_audio_cache if cache_enable else None,
+                        max_concurrency=max_concurrency,
+                    )
+
                 self.tts_provider_insts.append(inst)
                 if self.provider_settings.get("provider_id") == provider_config["id"]:
                     self.curr_tts_provider_inst = inst
@@ -395,6 +409,16 @@ class ProviderManager:
                 inst = cls_type(provider_config, self.provider_settings)
                 if getattr(inst, "initialize", None):
                     await inst.initialize()
+                cache_size = provider_config.get("embedding_cache_size", 2048)
+                batch_window_ms = provider_config.get("embedding_batch_window_ms", 5)
+                if cache_size > 0 or batch_window_ms > 0:
+                    # 缓存查询向量，并合并并发的请求
+                    inst = CachedEmbeddingProvider(
+                        inst,
+                        cache_size=cache_size,
+                        ttl=provider_config.get("embedding_cache_ttl", 3600),
+                        batch_window=batch_window_ms / 1000,
+                    )
                 self.embedding_provider_insts.append(inst)
             elif provider_metadata.provider_type == ProviderType.RERANK:
                 inst = cls_type(provider_config, self.provider_settings)
@@ -1,11 +1,11 @@
 import os
 import uuid
-import aiohttp
 import urllib.parse
 from ..provider import TTSProvider
 from ..entities import ProviderType
 from ..register import register_provider_adapter
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.http_client import http_client
 
 
 @register_provider_adapter(
@@ -41,15 +41,15 @@ class ProviderGSVITTS(TTSProvider):
 
         url = f"{self.api_base}/tts?{'&'.join(query_parts)}"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    with open(path, "wb") as f:
-                        f.write(await response.read())
-                else:
-                    error_text = await response.text()
-                    raise Exception(
-                        f"GSVI TTS API 请求失败，状态码: {response.status}，错误: {error_text}"
-                    )
+        session = http_client.get_session(trust_env=False)
+        async with session.get(url) as response:
+            if response.status == 200:
+                with open(path, "wb") as f:
+                    f.write(await response.read())
+            else:
+                error_text = await response.text()
+                raise Exception(
+                    f"GSVI TTS API 请求失败，状态码: {response.status}，错误: {error_text}"
+                )
 
         return path
@@ -8,6 +8,7 @@ from astrbot.api import logger
 from ..entities import ProviderType
 from ..provider import TTSProvider
 from ..register import register_provider_adapter
+from astrbot.core.utils.http_client import http_client
 
 
 @register_provider_adapter(
@@ -82,41 +83,41 @@ class ProviderMiniMaxTTSAPI(TTSProvider):
     async def _call_tts_stream(self, text: str) -> AsyncIterator[bytes]:
         """进行流式请求"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.concat_base_url,
-                    headers=self.headers,
-                    data=self._build_tts_stream_body(text),
-                    timeout=aiohttp.ClientTimeout(total=60),
-                ) as response:
-                    response.raise_for_status()
-
-                    buffer = b""
-                    while True:
-                        chunk = await response.content.read(8192)
-                        if not chunk:
-                            break
-
-                        buffer += chunk
-
-                        while b"\n\n" in buffer:
-                            try:
-                                message, buffer = buffer.split(b"\n\n", 1)
-                                if message.startswith(b"data: "):
-                                    try:
-                                        data = json.loads(message[6:])
-                                        if "extra_info" in data:
-                                            continue
-                                        audio = data.get("data", {}).get("audio")
-                                        if audio is not None:
-                                            yield audio
-                                    except json.JSONDecodeError:
-                                        logger.warning(
-                                            "Failed to parse JSON data from SSE message"
-                                        )
+            session = http_client.get_session(trust_env=False)
+            async with session.post(
+                self.concat_base_url,
+                headers=self.headers,
+                data=self._build_tts_stream_body(text),
+                timeout=aiohttp.ClientTimeout(total=60),
+            ) as response:
+                response.raise_for_status()
+
+                buffer = b""
+                while True:
+                    chunk = await response.content.read(8192)
+                    if not chunk:
+                        break
+
+                    buffer += chunk
+
+                    while b"\n\n" in buffer:
+                        try:
+                            message, buffer = buffer.split(b"\n\n", 1)
+                            if message.startswith(b"data: "):
+                                try:
+                                    data = json.loads(message[6:])
+                                    if "extra_info" in data:
                                         continue
-                            except ValueError:
-                                buffer = buffer[-1024:]
+                                    audio = data.get("data", {}).get("audio")
+                                    if audio is not None:
+                                        yield audio
+                                except json.JSONDecodeError:
+                                    logger.warning(
+                                        "Failed to parse JSON data from SSE message"
+                                    )
+                                    continue
+                        except ValueError:
+                            buffer = buffer[-1024:]
 
         except aiohttp.ClientError as e:
             raise Exception(f"MiniMax TTS API请求失败: {str(e)}")
@@ -16,6 +16,7 @@ from astrbot.core.utils.io import download_file
 from ..register import register_provider_adapter
 from astrbot.core import logger
 from astrbot.core.utils.tencent_record_helper import tencent_silk_to_wav
+from astrbot.core.utils.media_cache import media_cache
 
 
 @register_provider_adapter(
@@ -76,9 +77,9 @@ class ProviderSenseVoiceSTTSelfHost(STTProvider):
                 is_silk = await self._is_silk_file(audio_url)
                 if is_silk:
                     logger.info("Converting silk file to wav ...")
-                    output_path = await self.get_timestamped_path() + ".wav"
-                    await tencent_silk_to_wav(audio_url, output_path)
-                    audio_url = output_path
+                    audio_url = await media_cache.get_converted(
+                        audio_url, ".wav", tencent_silk_to_wav
+                    )
 
             # 使用 run_in_executor 来调用模型进行识别
             loop = asyncio.get_event_loop()
@@ -4,11 +4,11 @@ import json
 import os
 import traceback
 import asyncio
-import aiohttp
 from ..provider import TTSProvider
 from ..entities import ProviderType
 from ..register import register_provider_adapter
 from astrbot import logger
+from astrbot.core.utils.http_client import http_client
 
 
 @register_provider_adapter(
@@ -66,41 +66,41 @@ class ProviderVolcengineTTS(TTSProvider):
         logger.debug(f"请求体: {json.dumps(payload, ensure_ascii=False)[:100]}...")
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_base,
-                    data=json.dumps(payload),
-                    headers=headers,
-                    timeout=self.timeout,
-                ) as response:
-                    logger.debug(f"响应状态码: {response.status}")
+            session = http_client.get_session(trust_env=False)
+            async with session.post(
+                self.api_base,
+                data=json.dumps(payload),
+                headers=headers,
+                timeout=self.timeout,
+            ) as response:
+                logger.debug(f"响应状态码: {response.status}")
 
-                    response_text = await response.text()
-                    logger.debug(f"响应内容: {response_text[:200]}...")
+                response_text = await response.text()
+                logger.debug(f"响应内容: {response_text[:200]}...")
 
-                    if response.status == 200:
-                        resp_data = json.loads(response_text)
+                if response.status == 200:
+                    resp_data = json.loads(response_text)
 
-                        if "data" in resp_data:
-                            audio_data = base64.b64decode(resp_data["data"])
+                    if "data" in resp_data:
+                        audio_data = base64.b64decode(resp_data["data"])
 
-                            os.makedirs("data/temp", exist_ok=True)
+                        os.makedirs("data/temp", exist_ok=True)
 
-                            file_path = f"data/temp/volcengine_tts_{uuid.uuid4()}.mp3"
+                        file_path = f"data/temp/volcengine_tts_{uuid.uuid4()}.mp3"
 
-                            loop = asyncio.get_running_loop()
-                            await loop.run_in_executor(
-                                None, lambda: open(file_path, "wb").write(audio_data)
-                            )
+                        loop = asyncio.get_running_loop()
+                        await loop.run_in_executor(
+                            None, lambda: open(file_path, "wb").write(audio_data)
+                        )
 
-                            return file_path
-                        else:
-                            error_msg = resp_data.get("message", "未知错误")
-                            raise Exception(f"火山引擎 TTS API 返回错误: {error_msg}")
+                        return file_path
                     else:
-                        raise Exception(
-                            f"火山引擎 TTS API 请求失败: {response.status}, {response_text}"
-                        )
+                        error_msg = resp_data.get("message", "未知错误")
+                        raise Exception(f"火山引擎 TTS API 返回错误: {error_msg}")
+                else:
+                    raise Exception(
+                        f"火山引擎 TTS API 请求失败: {response.status}, {response_text}"
+                    )
 
         except Exception as e:
             error_details = traceback.format_exc()
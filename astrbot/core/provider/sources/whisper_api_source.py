@@ -7,6 +7,7 @@ from astrbot.core.utils.io import download_file
 from ..register import register_provider_adapter
 from astrbot.core import logger
 from astrbot.core.utils.tencent_record_helper import tencent_silk_to_wav
+from astrbot.core.utils.media_cache import media_cache
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 
 
@@ -63,10 +64,9 @@ class ProviderOpenAIWhisperAPI(STTProvider):
             is_silk = await self._is_silk_file(audio_url)
             if is_silk:
                 logger.info("Converting silk file to wav ...")
-                temp_dir = os.path.join(get_astrbot_data_path(), "temp")
-                output_path = os.path.join(temp_dir, str(uuid.uuid4()) + ".wav")
-                await tencent_silk_to_wav(audio_url, output_path)
-                audio_url = output_path
+                audio_url = await media_cache.get_converted(
+                    audio_url, ".wav", tencent_silk_to_wav
+                )
 
         result = await self.client.audio.transcriptions.create(
             model=self.model_name,
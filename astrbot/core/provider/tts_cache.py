@@ -0,0 +1,110 @@
+"""
+文本转语音结果缓存
+
+问候语、固定回复等相同的文本会被反复合成。CachedTTSProvider 包装一个 TTSProvider：
+
+- 以 (提供商 ID, 模型与音色等参数, 文本) 的 sha256 为键，将合成的音频文件保存在 data/tts_cache 下，
+  缓存的总大小有上限，超出时淘汰最久未使用的文件。
+- 同时进行的相同文本的合成只请求一次。
+- 限制同时向提供商发起的合成请求数量，多段回复可以并发合成而不会触发提供商的限流。
+"""
+
+import asyncio
+import json
+import os
+
+from astrbot.core import logger
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.media_cache import MediaCache
+
+from .provider import ProviderMeta, TTSProvider
+
+_IGNORED_PARAM_KEYWORDS = ("key", "secret", "token", "proxy", "timeout", "enable")
+"""不影响合成结果的配置项，不作为缓存键的一部分（更换 API Key 后缓存依然有效）"""
+
+tts_audio_cache = MediaCache(
+    cache_dir=os.path.join(get_astrbot_data_path(), "tts_cache"),
+    max_bytes=256 * 1024 * 1024,
+    max_age=30 * 24 * 3600,
+)
+"""所有 TTS 提供商共享的音频缓存"""
+
+
+class CachedTTSProvider(TTSProvider):
+    def __init__(
+        self,
+        provider: TTSProvider,
+        cache: MediaCache | None = tts_audio_cache,
+        max_concurrency: int = 3,
+    ) -> None:
+        super().__init__(provider.provider_config, provider.provider_settings)
+        self.provider = provider
+        """被包装的 TTSProvider"""
+        self.cache = cache
+        """音频缓存，None 表示不缓存"""
+        self.max_concurrency = max_concurrency
+        """同时向提供商发起的合成请求数量上限，0 表示不限制"""
+        self._semaphore = (
+            asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        )
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name: str):
+        # 其余属性（terminate、client 等）转发给被包装的提供商
+        return getattr(self.provider, name)
+
+    def meta(self) -> ProviderMeta:
+        return self.provider.meta()
+
+    def get_model(self) -> str:
+        return self.provider.get_model()
+
+    def set_model(self, model_name: str):
+        self.provider.set_model(model_name)
+
+    def _make_key(self, text: str) -> str:
+        params = {
+            k: v
+            for k, v in self.provider.provider_config.items()
+            if not any(word in k.lower() for word in _IGNORED_PARAM_KEYWORDS)
+        }
+        raw = json.dumps(
+            [params, self.provider.get_model(), text],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return MediaCache.make_key(raw)
+
+    async def _synthesize(self, text: str) -> str:
+        if self._semaphore is None:
+            return await self.provider.get_audio(text)
+        async with self._semaphore:
+            return await self.provider.get_audio(text)
+
+    async def get_audio(self, text: str) -> str:
+        if self.cache is None:
+            return await self._synthesize(text)
+
+        key = self._make_key(text)
+        hit = True
+
+        async def generate() -> str:
+            nonlocal hit
+            hit = False
+            return await self._synthesize(text)
+
+        path = await self.cache.get_stored(key, generate)
+        if hit:
+            self.hits += 1
+            logger.debug(f"TTS 缓存命中: {text[:20]}")
+        else:
+            self.misses += 1
+        return path
+
+    def get_stats(self) -> dict:
+        """获取缓存的命中情况"""
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,132 @@
+"""
+指令分发索引
+
+WakingCheckStage 需要对每条消息检查所有 AdapterMessageEvent 处理函数的过滤器。
+对于注册了指令（CommandFilter / CommandGroupFilter）的处理函数，只有消息以其完整指令名开头时才可能通过过滤器。
+这里将所有完整指令名（包括别名）编译为一棵前缀树，每条消息只需要遍历一次前缀树即可得到候选的指令处理函数，
+其余的处理函数（正则、自定义过滤器、消息类型等）照常检查。
+
+索引在注册表版本号（StarHandlerRegistry.generation）变化后惰性重建。插件的载入、卸载、启用、禁用以及 alter_cmd 都会使版本号递增。
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+from .filter.command import CommandFilter
+from .filter.command_group import CommandGroupFilter
+from .star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    StarHandlerRegistry,
+    star_handlers_registry,
+)
+
+
+class _TrieNode:
+    __slots__ = ("children", "commands", "groups")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.commands: list[str] = []
+        """以该节点结尾的指令对应的 handler_full_name"""
+        self.groups: list[str] = []
+        """以该节点结尾的指令组对应的 handler_full_name"""
+
+
+class CommandDispatchIndex:
+    """AdapterMessageEvent 处理函数的指令前缀树索引"""
+
+    def __init__(self, registry: StarHandlerRegistry = star_handlers_registry):
+        self._registry = registry
+        self._generation = -1
+        self._root = _TrieNode()
+        self._indexed: set[str] = set()
+        """注册了指令或指令组的处理函数"""
+
+    def _insert(self, name: str, handler_full_name: str, is_group: bool):
+        node = self._root
+        for ch in name:
+            nxt = node.children.get(ch)
+            if nxt is None:
+                nxt = _TrieNode()
+                node.children[ch] = nxt
+            node = nxt
+        bucket = node.groups if is_group else node.commands
+        if handler_full_name not in bucket:
+            bucket.append(handler_full_name)
+
+    def rebuild(self):
+        """根据注册表重建索引"""
+        self._root = _TrieNode()
+        self._indexed = set()
+        for handler in self._registry:
+            if handler.event_type != EventType.AdapterMessageEvent:
+                continue
+            for filter_ in handler.event_filters:
+                if isinstance(filter_, (CommandFilter, CommandGroupFilter)):
+                    is_group = isinstance(filter_, CommandGroupFilter)
+                    for name in filter_.get_complete_command_names():
+                        self._insert(name, handler.handler_full_name, is_group)
+                    self._indexed.add(handler.handler_full_name)
+        self._generation = self._registry.generation
+
+    def _ensure_fresh(self):
+        if self._generation != self._registry.generation:
+            self.rebuild()
+
+    def match(self, message_str: str, raw_message_str: str) -> set[str]:
+        """返回可能匹配该消息的指令处理函数。
+
+        Args:
+            message_str: 经过 get_command_str 规范化后的消息文本，用于匹配指令。指令要求完整指令名后为空格或者消息结尾。
+            raw_message_str: 原始的消息文本，用于匹配指令组。指令组只要求消息以完整指令名开头。
+        """
+        self._ensure_fresh()
+        hits: set[str] = set()
+        node = self._root
+        length = len(message_str)
+        i = 0
+        while True:
+            if node.commands and (i == length or message_str[i] == " "):
+                hits.update(node.commands)
+            if i == length:
+                break
+            node = node.children.get(message_str[i])
+            if node is None:
+                break
+            i += 1
+
+        node = self._root
+        for ch in raw_message_str:
+            if node.groups:
+                hits.update(node.groups)
+            node = node.children.get(ch)
+            if node is None:
+                break
+        else:
+            if node.groups:
+                hits.update(node.groups)
+        return hits
+
+    def select(
+        self,
+        handlers: List[StarHandlerMetadata],
+        message_str: str,
+        raw_message_str: str,
+    ) -> List[StarHandlerMetadata]:
+        """从 handlers 中筛选出需要检查过滤器的处理函数，保持原有的优先级顺序。
+
+        未注册指令的处理函数总是保留；注册了指令的处理函数只有在消息可能匹配其指令时才保留。
+        """
+        hits = self.match(message_str, raw_message_str)
+        indexed = self._indexed
+        return [
+            handler
+            for handler in handlers
+            if handler.handler_full_name not in indexed
+            or handler.handler_full_name in hits
+        ]
+
+
+command_dispatch_index = CommandDispatchIndex()
@@ -8,6 +8,23 @@ from .custom_filter import CustomFilter
 from ..star_handler import StarHandlerMetadata
 
 
+def normalize_command_str(message_str: str) -> str:
+    """去除首尾空白并将连续的空白合并为一个空格。"""
+    return re.sub(r"\s+", " ", message_str.strip())
+
+
+def get_command_str(event: AstrMessageEvent) -> str:
+    """获取事件规范化后的消息文本。
+
+    同一条消息会被所有指令过滤器匹配，因此结果缓存在事件上，使每个事件只计算一次；消息文本被修改后重新计算。"""
+    message_str = event.get_message_str()
+    cached = getattr(event, "_command_str", None)
+    if cached is None or cached[0] != message_str:
+        cached = (message_str, normalize_command_str(message_str))
+        event._command_str = cached
+    return cached[1]
+
+
 class GreedyStr(str):
     """标记指令完成其他参数接收后的所有剩余文本。"""
 
@@ -163,7 +180,7 @@ class CommandFilter(HandlerFilter):
             return False
 
         # 检查是否以指令开头
-        message_str = re.sub(r"\s+", " ", event.get_message_str().strip())
+        message_str = get_command_str(event)
         ok = False
         for full_cmd in self.get_complete_command_names():
             if message_str.startswith(f"{full_cmd} ") or message_str == full_cmd:
@@ -384,6 +384,9 @@ def register_llm_tool(name: str | None = None, **kwargs):
     event.stop_event()
     yield
     ```
+
+    开启并行工具调用时，插件工具默认串行执行。不会发送消息、没有其他副作用的工具可以声明 `serial=False`，
+    与其他工具并行执行。也可以通过 `timeout` 单独设置该工具的超时时间（秒）。
     """
 
     name_ = name
@@ -413,6 +416,7 @@ def register_llm_tool(name: str | None = None, **kwargs):
             doc_desc = docstring.description.strip() if docstring.description else ""
             md = get_handler_or_create(awaitable, EventType.OnCallingFuncToolEvent)
             llm_tools.add_func(llm_tool_name, args, doc_desc, md.handler)
+            tool = llm_tools.get_func(llm_tool_name)
         else:
             assert isinstance(registering_agent, RegisteringAgent)
             # print(f"Registering tool {llm_tool_name} for agent", registering_agent._agent.name)
@@ -423,6 +427,10 @@ def register_llm_tool(name: str | None = None, **kwargs):
             tool = llm_tools.spec_to_func(llm_tool_name, args, desc, awaitable)
             registering_agent._agent.tools.append(tool)
 
+        if tool:
+            tool.serial = kwargs.get("serial", True)
+            tool.timeout = kwargs.get("timeout")
+
         return awaitable
 
     return decorator
@@ -24,8 +24,8 @@ class SessionServiceManager:
             bool: True表示启用，False表示禁用
         """
         # 获取会话服务配置
-        session_services = sp.get(
-            "session_service_config", {}, scope="umo", scope_id=session_id
+        session_services = sp.get_cached(
+            "umo", session_id, "session_service_config", {}
         )
 
         # 如果配置了该会话的LLM状态，返回该状态
@@ -80,8 +80,8 @@ class SessionServiceManager:
             bool: True表示启用，False表示禁用
         """
         # 获取会话服务配置
-        session_services = sp.get(
-            "session_service_config", {}, scope="umo", scope_id=session_id
+        session_services = sp.get_cached(
+            "umo", session_id, "session_service_config", {}
         )
 
         # 如果配置了该会话的TTS状态，返回该状态
@@ -140,8 +140,8 @@ class SessionServiceManager:
             bool: True表示启用，False表示禁用
         """
         # 获取会话服务配置
-        session_services = sp.get(
-            "session_service_config", {}, scope="umo", scope_id=session_id
+        session_services = sp.get_cached(
+            "umo", session_id, "session_service_config", {}
         )
 
         # 如果配置了该会话的整体状态，返回该状态
@@ -199,8 +199,8 @@ class SessionServiceManager:
         Returns:
             str: 自定义名称，如果没有设置则返回None
         """
-        session_services = sp.get(
-            "session_service_config", {}, scope="umo", scope_id=session_id
+        session_services = sp.get_cached(
+            "umo", session_id, "session_service_config", {}
         )
         return session_services.get("custom_name")
 
@@ -22,8 +22,8 @@ class SessionPluginManager:
             bool: True表示启用，False表示禁用
         """
         # 获取会话插件配置
-        session_plugin_config = sp.get(
-            "session_plugin_config", {}, scope="umo", scope_id=session_id
+        session_plugin_config = sp.get_cached(
+            "umo", session_id, "session_plugin_config", {}
         )
         session_config = session_plugin_config.get(session_id, {})
 
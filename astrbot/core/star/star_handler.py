@@ -1,4 +1,5 @@
 from __future__ import annotations
+import bisect
 import enum
 from dataclasses import dataclass, field
 from typing import Callable, Awaitable, Any, List, Dict, TypeVar, Generic
@@ -12,6 +13,16 @@ class StarHandlerRegistry(Generic[T]):
     def __init__(self):
         self.star_handlers_map: Dict[str, StarHandlerMetadata] = {}
         self._handlers: List[StarHandlerMetadata] = []
+        self._handlers_by_type: Dict[EventType, List[StarHandlerMetadata]] = {}
+        """按事件类型分桶的 Handler，桶内按优先级有序"""
+        self.generation = 0
+        """注册表的版本号。处理函数被注册、移除，插件被启用、禁用或者指令被修改时递增，用于使依赖注册表的缓存和索引失效"""
+        self._lookup_cache: Dict[tuple, List[StarHandlerMetadata]] = {}
+        self._lookup_cache_generation = 0
+
+    def mark_changed(self):
+        """标记注册表已经发生变化"""
+        self.generation += 1
 
     def append(self, handler: StarHandlerMetadata):
         """添加一个 Handler，并保持按优先级有序"""
@@ -19,8 +30,18 @@ class StarHandlerRegistry(Generic[T]):
             handler.extras_configs["priority"] = 0
 
         self.star_handlers_map[handler.handler_full_name] = handler
-        self._handlers.append(handler)
-        self._handlers.sort(key=lambda h: -h.extras_configs["priority"])
+        for handlers in (
+            self._handlers,
+            self._handlers_by_type.setdefault(handler.event_type, []),
+        ):
+            # 插入到相同优先级的 Handler 之后，与稳定排序的结果一致
+            idx = bisect.bisect_right(
+                handlers,
+                -handler.extras_configs["priority"],
+                key=lambda h: -h.extras_configs["priority"],
+            )
+            handlers.insert(idx, handler)
+        self.mark_changed()
 
     def _print_handlers(self):
         for handler in self._handlers:
@@ -32,18 +53,29 @@ class StarHandlerRegistry(Generic[T]):
         only_activated=True,
         plugins_name: list[str] | None = None,
     ) -> List[StarHandlerMetadata]:
+        if plugins_name is not None and plugins_name != ["*"]:
+            plugins_key = tuple(plugins_name)
+        else:
+            plugins_name = None
+            plugins_key = None
+
+        if self._lookup_cache_generation != self.generation:
+            self._lookup_cache.clear()
+            self._lookup_cache_generation = self.generation
+        key = (event_type, only_activated, plugins_key)
+        cached = self._lookup_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
         handlers = []
-        for handler in self._handlers:
-            # 过滤事件类型
-            if handler.event_type != event_type:
-                continue
+        for handler in self._handlers_by_type.get(event_type, []):
             # 过滤启用状态
             if only_activated:
                 plugin = star_map.get(handler.handler_module_path)
                 if not (plugin and plugin.activated):
                     continue
             # 过滤插件白名单
-            if plugins_name is not None and plugins_name != ["*"]:
+            if plugins_name is not None:
                 plugin = star_map.get(handler.handler_module_path)
                 if not plugin:
                     continue
@@ -58,7 +90,8 @@ class StarHandlerRegistry(Generic[T]):
                 ):
                     continue
             handlers.append(handler)
-        return handlers
+        self._lookup_cache[key] = handlers
+        return list(handlers)
 
     def get_handler_by_full_name(self, full_name: str) -> StarHandlerMetadata | None:
         return self.star_handlers_map.get(full_name, None)
@@ -75,10 +108,18 @@ class StarHandlerRegistry(Generic[T]):
     def clear(self):
         self.star_handlers_map.clear()
         self._handlers.clear()
+        self._handlers_by_type.clear()
+        self.mark_changed()
 
     def remove(self, handler: StarHandlerMetadata):
         self.star_handlers_map.pop(handler.handler_full_name, None)
         self._handlers = [h for h in self._handlers if h != handler]
+        bucket = self._handlers_by_type.get(handler.event_type)
+        if bucket is not None:
+            self._handlers_by_type[handler.event_type] = [
+                h for h in bucket if h != handler
+            ]
+        self.mark_changed()
 
     def __iter__(self):
         return iter(self._handlers)
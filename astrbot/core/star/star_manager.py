@@ -318,9 +318,9 @@ class PluginManager:
                     if smd.name and smd.module_path:
                         await self._unbind_plugin(smd.name, smd.module_path)
 
-                star_handlers_registry.clear()
                 star_map.clear()
                 star_registry.clear()
+                star_handlers_registry.clear()
             else:
                 # 只重载指定插件
                 smd = star_map.get(specified_module_path)
@@ -539,6 +539,7 @@ class PluginManager:
                 # 禁用/启用插件
                 if metadata.module_path in inactivated_plugins:
                     metadata.activated = False
+                star_handlers_registry.mark_changed()
 
                 assert metadata.module_path is not None, (
                     f"插件 {metadata.name} 的模块路径为空。"
@@ -708,6 +709,7 @@ class PluginManager:
         """
         plugin = None
         del star_map[plugin_module_path]
+        star_handlers_registry.mark_changed()
         for i, p in enumerate(star_registry):
             if p.name == plugin_name:
                 plugin = p
@@ -781,6 +783,7 @@ class PluginManager:
             await sp.global_put("inactivated_llm_tools", inactivated_llm_tools)
 
             plugin.activated = False
+            star_handlers_registry.mark_changed()
 
     @staticmethod
     async def _terminate_plugin(star_metadata: StarMetadata):
@@ -0,0 +1,38 @@
+"""
+事件总线的执行许可
+
+EventBus 用一个全局的信号量限制同时执行的事件数量。事件在执行期间持有一个许可，但处理函数可能会长时间空闲等待，
+例如 session_waiter 等待用户的下一条消息、限流时等待下一个时间窗口。空闲的事件继续持有许可会阻塞其他会话。
+
+处理函数在开始长时间等待之前调用 release_event_permit() 提前归还许可。归还之后事件继续执行，但不再占用并发名额；
+同一会话后续的事件仍然排在它之后。
+"""
+
+import asyncio
+from contextvars import ContextVar
+
+
+class EventPermit:
+    """一次事件执行持有的许可，可以提前归还，重复归还无效"""
+
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self._semaphore = semaphore
+        self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self._semaphore.release()
+
+
+current_event_permit: ContextVar[EventPermit | None] = ContextVar(
+    "current_event_permit", default=None
+)
+"""当前正在执行的事件持有的许可，由 EventBus 在执行事件时设置"""
+
+
+def release_event_permit():
+    """当前事件即将长时间空闲等待时调用，提前归还全局并发许可。不在事件执行中调用时无效"""
+    permit = current_event_permit.get()
+    if permit is not None:
+        permit.release()
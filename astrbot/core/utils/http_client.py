@@ -0,0 +1,120 @@
+"""
+进程级共享的 HTTP 客户端
+
+为每次请求创建一个新的 aiohttp.ClientSession 意味着每次请求都要重新建立 TCP 连接、进行 TLS 握手和 DNS 解析。
+这里维护一组共享的 ClientSession，复用连接池（支持 keep-alive、按主机限制连接数）、DNS 缓存和 SSL 上下文。
+
+使用方式：
+
+```
+from astrbot.core.utils.http_client import http_client
+
+session = http_client.get_session()
+async with session.get(url) as resp:
+    ...
+```
+
+注意不要使用 `async with http_client.get_session() as session`，这会关闭共享的 ClientSession。
+"""
+
+import asyncio
+import logging
+import ssl
+
+import aiohttp
+import certifi
+
+logger = logging.getLogger("astrbot")
+
+
+class HttpClientManager:
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        ttl_dns_cache: int = 300,
+        keepalive_timeout: float = 30,
+    ):
+        self.limit = limit
+        """连接池的总连接数上限"""
+        self.limit_per_host = limit_per_host
+        """对同一主机的连接数上限"""
+        self.ttl_dns_cache = ttl_dns_cache
+        """DNS 缓存时间（秒）"""
+        self.keepalive_timeout = keepalive_timeout
+        """空闲连接的保持时间（秒）"""
+
+        self._sessions: dict[
+            asyncio.AbstractEventLoop, dict[bool, aiohttp.ClientSession]
+        ] = {}
+        """事件循环 -> trust_env -> ClientSession"""
+        self._ssl_context: ssl.SSLContext | None = None
+        self._fallback_ssl_context: ssl.SSLContext | None = None
+
+    def get_ssl_context(self) -> ssl.SSLContext:
+        """获取使用 certifi 根证书的 SSL 上下文"""
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context(cafile=certifi.where())
+        return self._ssl_context
+
+    def get_fallback_ssl_context(self) -> ssl.SSLContext:
+        """获取使用系统根证书、放宽加密套件的 SSL 上下文，用于 certifi 证书校验失败时重试"""
+        if self._fallback_ssl_context is None:
+            ctx = ssl.create_default_context()
+            ctx.set_ciphers("DEFAULT")
+            self._fallback_ssl_context = ctx
+        return self._fallback_ssl_context
+
+    def get_session(self, trust_env: bool = True) -> aiohttp.ClientSession:
+        """获取共享的 ClientSession，必须在事件循环中调用。
+
+        Args:
+            trust_env: 是否读取环境变量中的代理配置
+        """
+        loop = asyncio.get_running_loop()
+        sessions = self._sessions.get(loop)
+        if sessions is None:
+            # ClientSession 绑定在创建它的事件循环上，每个事件循环使用各自的 ClientSession
+            self._drop_closed_loops()
+            sessions = self._sessions[loop] = {}
+
+        session = sessions.get(trust_env)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=self.get_ssl_context(),
+            )
+            session = aiohttp.ClientSession(connector=connector, trust_env=trust_env)
+            sessions[trust_env] = session
+        return session
+
+    def _drop_closed_loops(self):
+        for loop in [loop for loop in self._sessions if loop.is_closed()]:
+            # 事件循环已经关闭，其中的连接已无法正常关闭
+            del self._sessions[loop]
+
+    async def close(self):
+        """关闭所有共享的 ClientSession。
+
+        其他事件循环中的 ClientSession 如果其事件循环仍在运行，则提交到该事件循环中关闭。
+        """
+        current = asyncio.get_running_loop()
+        all_sessions, self._sessions = self._sessions, {}
+        for loop, sessions in all_sessions.items():
+            for session in sessions.values():
+                if session.closed:
+                    continue
+                try:
+                    if loop is current:
+                        await session.close()
+                    elif loop.is_running():
+                        fut = asyncio.run_coroutine_threadsafe(session.close(), loop)
+                        await asyncio.wait_for(asyncio.wrap_future(fut), 5)
+                except Exception as e:
+                    logger.warning(f"关闭 HTTP 客户端失败: {e}")
+
+
+http_client = HttpClientManager()
@@ -0,0 +1,192 @@
+"""
+图片转述结果缓存
+
+群聊中同一张表情包、同一张图片会被反复转述，每次都需要调用一次多模态模型。
+这里以 (图片内容的 sha256, 转述模型提供商 ID, 提示词) 作为键缓存转述结果，并持久化到 data/image_caption_cache.json。
+同时进行的相同转述请求会共享同一次模型调用。
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from .astrbot_path import get_astrbot_data_path
+from .io import download_image_by_url
+
+logger = logging.getLogger("astrbot")
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ImageCaptionCache:
+    def __init__(
+        self,
+        path: str | None = None,
+        max_entries: int = 5000,
+        ttl: float = 7 * 24 * 3600,
+        save_delay: float = 10,
+    ):
+        self.path = path or os.path.join(
+            get_astrbot_data_path(), "image_caption_cache.json"
+        )
+        self.max_entries = max_entries
+        """最多缓存的转述结果数"""
+        self.ttl = ttl
+        """转述结果的有效期（秒）"""
+        self.save_delay = save_delay
+        """缓存变化后延迟写入磁盘的时间（秒）"""
+
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        """key -> (caption, created_at)"""
+        self._loaded = False
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._save_task: asyncio.Task | None = None
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            for key, (caption, created_at) in data.items():
+                if now - created_at <= self.ttl:
+                    self._entries[key] = (caption, created_at)
+        except Exception as e:
+            logger.warning(f"读取图片转述缓存失败: {e}")
+
+    @staticmethod
+    async def _hash_image(image_url: str) -> str:
+        """计算图片内容的 sha256。image_url 可以是 http(s) URL、base64:// 数据或本地路径"""
+        if image_url.startswith("base64://"):
+            data = base64.b64decode(image_url.removeprefix("base64://"))
+        else:
+            if image_url.startswith("http"):
+                path = await download_image_by_url(image_url)
+            else:
+                path = image_url.removeprefix("file:///")
+            return await asyncio.to_thread(_hash_file, path)
+        return hashlib.sha256(data).hexdigest()
+
+    async def make_key(
+        self, image_urls: list[str], provider_id: str, prompt: str
+    ) -> str:
+        image_hashes = [await self._hash_image(url) for url in image_urls]
+        raw = json.dumps([image_hashes, provider_id, prompt], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> str | None:
+        self._load()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        caption, created_at = entry
+        if time.time() - created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return caption
+
+    def _put(self, key: str, caption: str):
+        self._entries[key] = (caption, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._schedule_save()
+
+    async def get_caption(
+        self,
+        image_urls: list[str],
+        provider_id: str,
+        prompt: str,
+        caption_func: Callable[[], Awaitable[str | None]],
+    ) -> str | None:
+        """获取图片的转述结果。命中缓存时直接返回，否则调用 caption_func 并缓存非空的结果。
+
+        Args:
+            image_urls: 图片列表，多张图片会作为一个整体缓存
+            provider_id: 转述模型提供商 ID
+            prompt: 转述提示词
+            caption_func: 调用模型进行转述的函数
+        """
+        try:
+            key = await self.make_key(image_urls, provider_id, prompt)
+        except Exception as e:
+            # 无法读取图片内容时不使用缓存
+            logger.debug(f"计算图片哈希失败，跳过图片转述缓存: {e}")
+            return await caption_func()
+
+        if (caption := self._get(key)) is not None:
+            self.hits += 1
+            return caption
+
+        if fut := self._inflight.get(key):
+            # 相同的图片正在转述
+            return await asyncio.shield(fut)
+
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            caption = await caption_func()
+            if caption:
+                self._put(key, caption)
+            fut.set_result(caption)
+            return caption
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # 避免没有等待者时出现 "Future exception was never retrieved"
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _schedule_save(self):
+        if self._save_task and not self._save_task.done():
+            return
+        self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(self.save_delay)
+        await self.flush()
+
+    async def flush(self):
+        """将缓存写入磁盘"""
+        if not self._loaded:
+            return
+        data = dict(self._entries)
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            logger.warning(f"保存图片转述缓存失败: {e}")
+
+    def _write(self, data: dict):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+image_caption_cache = ImageCaptionCache()
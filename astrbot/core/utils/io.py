@@ -1,5 +1,4 @@
 import os
-import ssl
 import shutil
 import socket
 import time
@@ -10,12 +9,12 @@ import uuid
 import psutil
 import logging
 
-import certifi
-
 from typing import Union
 
 from PIL import Image
 from .astrbot_path import get_astrbot_data_path
+from .http_client import http_client
+from .media_cache import is_immutable_url, media_cache
 
 logger = logging.getLogger("astrbot")
 
@@ -52,18 +51,9 @@ def port_checker(port: int, host: str = "localhost"):
         return False
 
 
-def save_temp_img(img: Union[Image.Image, str]) -> str:
+def save_temp_img(img: Union[Image.Image, str, bytes]) -> str:
+    # 过期的临时文件由 media_cache.janitor() 在后台定期清理
     temp_dir = os.path.join(get_astrbot_data_path(), "temp")
-    # 获得文件创建时间，清除超过 12 小时的
-    try:
-        for f in os.listdir(temp_dir):
-            path = os.path.join(temp_dir, f)
-            if os.path.isfile(path):
-                ctime = os.path.getctime(path)
-                if time.time() - ctime > 3600 * 12:
-                    os.remove(path)
-    except Exception as e:
-        print(f"清除临时文件失败: {e}")
 
     # 获得时间戳
     timestamp = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
@@ -78,109 +68,88 @@ def save_temp_img(img: Union[Image.Image, str]) -> str:
 
 
 async def download_image_by_url(
-    url: str, post: bool = False, post_data: dict = None, path=None
+    url: str,
+    post: bool = False,
+    post_data: dict = None,
+    path=None,
+    cache: bool | None = None,
 ) -> str:
     """
     下载图片, 返回 path
+
+    cache 为 True 时使用媒体缓存, 同一 URL 只下载一次。只应用于内容不会变化的 URL（例如平台的媒体文件），
+    随机图片等接口的 URL 不变但内容会变化。为 None 时只缓存 media_cache.is_immutable_url() 认可的平台媒体文件。
     """
+    if cache is None:
+        cache = is_immutable_url(url)
+    if cache and not post and not path:
+        return await media_cache.get_file(url)
+    session = http_client.get_session()
     try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where()
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)  # 使用 certifi 的根证书
-        async with aiohttp.ClientSession(
-            trust_env=True, connector=connector
-        ) as session:
-            if post:
-                async with session.post(url, json=post_data) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    else:
-                        with open(path, "wb") as f:
-                            f.write(await resp.read())
-                        return path
-            else:
-                async with session.get(url) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    else:
-                        with open(path, "wb") as f:
-                            f.write(await resp.read())
-                        return path
-    except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
-        # 关闭SSL验证
-        ssl_context = ssl.create_default_context()
-        ssl_context.set_ciphers("DEFAULT")
-        async with aiohttp.ClientSession() as session:
-            if post:
-                async with session.get(url, ssl=ssl_context) as resp:
+        if post:
+            async with session.post(url, json=post_data) as resp:
+                if not path:
                     return save_temp_img(await resp.read())
-            else:
-                async with session.get(url, ssl=ssl_context) as resp:
+                else:
+                    with open(path, "wb") as f:
+                        f.write(await resp.read())
+                    return path
+        else:
+            async with session.get(url) as resp:
+                if not path:
                     return save_temp_img(await resp.read())
+                else:
+                    with open(path, "wb") as f:
+                        f.write(await resp.read())
+                    return path
+    except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
+        # 关闭SSL验证
+        ssl_context = http_client.get_fallback_ssl_context()
+        async with session.get(url, ssl=ssl_context) as resp:
+            return save_temp_img(await resp.read())
     except Exception as e:
         raise e
 
 
+async def _write_response_to_file(
+    resp: aiohttp.ClientResponse, url: str, path: str, show_progress: bool
+):
+    total_size = int(resp.headers.get("content-length", 0))
+    downloaded_size = 0
+    start_time = time.time()
+    if show_progress:
+        print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
+    with open(path, "wb") as f:
+        while True:
+            chunk = await resp.content.read(8192)
+            if not chunk:
+                break
+            f.write(chunk)
+            downloaded_size += len(chunk)
+            if show_progress:
+                elapsed_time = time.time() - start_time
+                speed = downloaded_size / 1024 / elapsed_time  # KB/s
+                print(
+                    f"\r下载进度: {downloaded_size / total_size:.2%} 速度: {speed:.2f} KB/s",
+                    end="",
+                )
+
+
 async def download_file(url: str, path: str, show_progress: bool = False):
     """
     从指定 url 下载文件到指定路径 path
     """
+    session = http_client.get_session()
     try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where()
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(
-            trust_env=True, connector=connector
-        ) as session:
-            async with session.get(url, timeout=1800) as resp:
-                if resp.status != 200:
-                    raise Exception(f"下载文件失败: {resp.status}")
-                total_size = int(resp.headers.get("content-length", 0))
-                downloaded_size = 0
-                start_time = time.time()
-                if show_progress:
-                    print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
-                with open(path, "wb") as f:
-                    while True:
-                        chunk = await resp.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if show_progress:
-                            elapsed_time = time.time() - start_time
-                            speed = downloaded_size / 1024 / elapsed_time  # KB/s
-                            print(
-                                f"\r下载进度: {downloaded_size / total_size:.2%} 速度: {speed:.2f} KB/s",
-                                end="",
-                            )
+        async with session.get(url, timeout=1800) as resp:
+            if resp.status != 200:
+                raise Exception(f"下载文件失败: {resp.status}")
+            await _write_response_to_file(resp, url, path, show_progress)
     except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
         # 关闭SSL验证
-        ssl_context = ssl.create_default_context()
-        ssl_context.set_ciphers("DEFAULT")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, ssl=ssl_context, timeout=120) as resp:
-                total_size = int(resp.headers.get("content-length", 0))
-                downloaded_size = 0
-                start_time = time.time()
-                if show_progress:
-                    print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
-                with open(path, "wb") as f:
-                    while True:
-                        chunk = await resp.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if show_progress:
-                            elapsed_time = time.time() - start_time
-                            speed = downloaded_size / 1024 / elapsed_time  # KB/s
-                            print(
-                                f"\r下载进度: {downloaded_size / total_size:.2%} 速度: {speed:.2f} KB/s",
-                                end="",
-                            )
+        ssl_context = http_client.get_fallback_ssl_context()
+        async with session.get(url, ssl=ssl_context, timeout=120) as resp:
+            await _write_response_to_file(resp, url, path, show_progress)
     if show_progress:
         print()
 
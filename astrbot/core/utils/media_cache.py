@@ -0,0 +1,483 @@
+"""
+内容寻址的媒体缓存
+
+表情包、转发的图片等媒体会被反复下载和编码，同一事件中的 LLM 请求、图片转述、合并转发也会多次转换同一张图片。
+媒体缓存以来源（URL、base64 数据或者本地文件内容）的 sha256 作为键，将下载或者转换后的文件保存在 data/temp/media_cache 下，
+并在内存中维护索引和最近使用的 base64 编码。
+
+缓存的淘汰（按大小和时间）以及 data/temp 下过期临时文件的清理由后台任务 janitor() 定期执行，不会阻塞消息处理。
+文件的读写和删除都在线程中执行，不会阻塞事件循环。
+
+URL 对应的内容可能会变化（例如随机图片接口），因此只有平台的媒体文件 URL（见 is_immutable_url()）才按 URL 缓存。
+"""
+
+import asyncio
+import base64
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .astrbot_path import get_astrbot_data_path
+from .http_client import http_client
+
+logger = logging.getLogger("astrbot")
+
+_KNOWN_EXTS = {
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".gif",
+    ".webp",
+    ".bmp",
+    ".mp3",
+    ".wav",
+    ".amr",
+    ".silk",
+    ".ogg",
+    ".mp4",
+}
+
+_IMMUTABLE_URL_PREFIXES = (
+    # QQ
+    ("multimedia.nt.qq.com.cn", "/"),
+    ("gchat.qpic.cn", "/"),
+    ("c2cpicdw.qpic.cn", "/"),
+    # Discord 附件
+    ("cdn.discordapp.com", "/attachments/"),
+    ("media.discordapp.net", "/attachments/"),
+    # Telegram 文件服务
+    ("api.telegram.org", "/file/"),
+)
+"""(域名, 路径前缀)。这些平台的媒体文件 URL 指向一个固定的文件，内容不会变化"""
+
+
+def is_immutable_url(url: str) -> bool:
+    """URL 是否是内容不会变化的平台媒体文件，可以按 URL 缓存"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        return False
+    host = (parsed.hostname or "").lower()
+    return any(
+        host == domain and parsed.path.startswith(prefix)
+        for domain, prefix in _IMMUTABLE_URL_PREFIXES
+    )
+
+
+@dataclass
+class _MediaEntry:
+    path: str
+    size: int
+    last_access: float
+
+
+class MediaCache:
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age: float = 12 * 3600,
+        max_base64_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir or os.path.join(
+            get_astrbot_data_path(), "temp", "media_cache"
+        )
+        self.max_bytes = max_bytes
+        """磁盘缓存的总大小上限"""
+        self.max_age = max_age
+        """缓存文件和 data/temp 下临时文件的最长保留时间（秒）"""
+        self.max_base64_bytes = max_base64_bytes
+        """内存中 base64 缓存的总大小上限"""
+
+        self._index: OrderedDict[str, _MediaEntry] = OrderedDict()
+        self._index_loaded = False
+        self._total_bytes = 0
+        self._base64: OrderedDict[str, str] = OrderedDict()
+        self._base64_bytes = 0
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._evict_task: asyncio.Task | None = None
+
+    @staticmethod
+    def make_key(source: str | bytes) -> str:
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        return hashlib.sha256(source).hexdigest()
+
+    def _scan_dir(self) -> list[tuple[str, _MediaEntry]]:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if ".tmp" in name or not os.path.isfile(path):
+                # 未完成的写入
+                continue
+            key = name.split(".", 1)[0]
+            stat = os.stat(path)
+            entries.append((key, _MediaEntry(path, stat.st_size, stat.st_mtime)))
+        entries.sort(key=lambda e: e[1].last_access)
+        return entries
+
+    async def _load_index(self):
+        """从磁盘恢复索引，只在第一次使用时执行"""
+        if self._index_loaded:
+            return
+        entries = await asyncio.to_thread(self._scan_dir)
+        if self._index_loaded:
+            return
+        self._index_loaded = True
+        # 磁盘上的文件排在读取期间加入的条目之前
+        index = OrderedDict(
+            (key, entry) for key, entry in entries if key not in self._index
+        )
+        self._total_bytes += sum(entry.size for entry in index.values())
+        index.update(self._index)
+        self._index = index
+
+    async def _lookup(self, key: str) -> str | None:
+        await self._load_index()
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        if not await asyncio.to_thread(os.path.exists, entry.path):
+            # 文件被外部删除
+            self._drop(key)
+            return None
+        entry.last_access = time.time()
+        self._index.move_to_end(key)
+        return entry.path
+
+    def _drop(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry.size
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        tmp_path = path + f".{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _move_into_cache(tmp_path: str, path: str) -> int:
+        """将生成的临时文件移动到缓存中，返回文件大小"""
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    @staticmethod
+    def _remove_quietly(path: str):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+    async def _store(self, key: str, ext: str, data: bytes) -> str:
+        await self._load_index()
+        path = os.path.join(self.cache_dir, key + ext)
+        await asyncio.to_thread(self._write_file, path, data)
+        self._register(key, path, len(data))
+        return path
+
+    def _register(self, key: str, path: str, size: int):
+        self._drop(key)
+        self._index[key] = _MediaEntry(path, size, time.time())
+        self._total_bytes += size
+        if self._total_bytes > self.max_bytes:
+            self._schedule_evict()
+
+    def _schedule_evict(self):
+        """超出大小上限时在后台任务中淘汰，不阻塞写入缓存的调用方"""
+        if self._evict_task is None or self._evict_task.done():
+            self._evict_task = asyncio.create_task(self._evict_quietly())
+
+    async def _evict_quietly(self):
+        try:
+            await self.evict()
+        except Exception as e:
+            logger.error(f"淘汰媒体缓存失败: {e}")
+
+    def _get_lock(self, key: str) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def _release_lock(self, key: str, lock: asyncio.Lock):
+        if not lock.locked() and self._locks.get(key) is lock:
+            del self._locks[key]
+
+    @staticmethod
+    def _guess_ext(url: str, default: str) -> str:
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        return ext if ext in _KNOWN_EXTS else default
+
+    @staticmethod
+    async def _fetch(url: str) -> bytes:
+        session = http_client.get_session()
+        try:
+            async with session.get(url) as resp:
+                # 错误页面不能作为媒体文件缓存
+                resp.raise_for_status()
+                return await resp.read()
+        except (
+            aiohttp.ClientConnectorSSLError,
+            aiohttp.ClientConnectorCertificateError,
+        ):
+            # 关闭SSL验证
+            ssl_context = http_client.get_fallback_ssl_context()
+            async with session.get(url, ssl=ssl_context) as resp:
+                resp.raise_for_status()
+                return await resp.read()
+
+    async def get_file(self, url: str, default_ext: str = ".jpg") -> str:
+        """下载 URL 对应的文件并返回本地路径，同一 URL 只会下载一次。
+
+        只适用于内容不会变化的 URL（例如平台的媒体文件）。下载失败（包括 HTTP 状态码不小于 400）时抛出异常，不会缓存。
+        """
+        key = self.make_key(url)
+        if path := await self._lookup(key):
+            return path
+        lock = self._get_lock(key)
+        try:
+            async with lock:
+                if path := await self._lookup(key):
+                    return path
+                data = await self._fetch(url)
+                return await self._store(key, self._guess_ext(url, default_ext), data)
+        finally:
+            self._release_lock(key, lock)
+
+    async def put_base64(self, bs64_data: str, ext: str = ".jpg") -> str:
+        """将 base64 数据保存为文件并返回本地路径，相同的数据只会保存一次"""
+        key = self.make_key(bs64_data)
+        if path := await self._lookup(key):
+            return path
+        return await self._store(key, ext, base64.b64decode(bs64_data))
+
+    @staticmethod
+    def _hash_file(path: str, suffix: bytes = b"") -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                h.update(chunk)
+        h.update(suffix)
+        return h.hexdigest()
+
+    async def get_converted(
+        self,
+        src_path: str,
+        ext: str,
+        converter: Callable[[str, str], Awaitable[object]],
+    ) -> str:
+        """获取 src_path 转换格式后的文件，例如 silk 解码得到的 wav。相同内容的文件只会转换一次。
+
+        Args:
+            src_path: 源文件路径
+            ext: 转换后文件的扩展名，如 .wav
+            converter: 转换函数，接收 (源文件路径, 输出路径)
+        """
+        key = await asyncio.to_thread(self._hash_file, src_path, ext.encode())
+        return await self.get_generated(
+            key, ext, lambda tmp_path: converter(src_path, tmp_path)
+        )
+
+    async def get_generated(
+        self,
+        key: str,
+        ext: str,
+        generator: Callable[[str], Awaitable[object]],
+    ) -> str:
+        """获取 key 对应的缓存文件，不存在时调用 generator 生成。同一个 key 同时只会生成一次。
+
+        Args:
+            key: 缓存键，通常为 make_key() 的结果
+            ext: 文件扩展名，如 .jpg
+            generator: 生成函数，接收输出路径
+        """
+        if path := await self._lookup(key):
+            return path
+        lock = self._get_lock(key)
+        try:
+            async with lock:
+                if path := await self._lookup(key):
+                    return path
+                await self._load_index()
+                path = os.path.join(self.cache_dir, key + ext)
+                tmp_path = os.path.join(
+                    self.cache_dir, f"{key}.{uuid.uuid4().hex[:8]}.tmp{ext}"
+                )
+                try:
+                    await generator(tmp_path)
+                    size = await asyncio.to_thread(
+                        self._move_into_cache, tmp_path, path
+                    )
+                except BaseException:
+                    await asyncio.to_thread(self._remove_quietly, tmp_path)
+                    raise
+                self._register(key, path, size)
+                return path
+        finally:
+            self._release_lock(key, lock)
+
+    async def get_stored(
+        self,
+        key: str,
+        producer: Callable[[], Awaitable[str]],
+    ) -> str:
+        """获取 key 对应的缓存文件，不存在时调用 producer 生成文件，并将其复制到缓存中（保留扩展名）。
+        同一个 key 同时只会生成一次。producer 返回的不是本地文件（如 URL 或空值）时不缓存，原样返回。
+
+        Args:
+            key: 缓存键，通常为 make_key() 的结果
+            producer: 生成函数，返回生成的文件路径
+        """
+        if path := await self._lookup(key):
+            return path
+        lock = self._get_lock(key)
+        try:
+            async with lock:
+                if path := await self._lookup(key):
+                    return path
+                src_path = await producer()
+                if not src_path or not await asyncio.to_thread(
+                    os.path.isfile, src_path
+                ):
+                    return src_path
+                await self._load_index()
+                ext = os.path.splitext(src_path)[1]
+                path = os.path.join(self.cache_dir, key + ext)
+                tmp_path = os.path.join(
+                    self.cache_dir, f"{key}.{uuid.uuid4().hex[:8]}.tmp{ext}"
+                )
+                try:
+                    await asyncio.to_thread(shutil.copyfile, src_path, tmp_path)
+                    size = await asyncio.to_thread(
+                        self._move_into_cache, tmp_path, path
+                    )
+                except BaseException:
+                    await asyncio.to_thread(self._remove_quietly, tmp_path)
+                    raise
+                self._register(key, path, size)
+                return path
+        finally:
+            self._release_lock(key, lock)
+
+    def _remember_base64(self, key: str, bs64_data: str):
+        if len(bs64_data) > self.max_base64_bytes // 4:
+            return
+        old = self._base64.pop(key, None)
+        if old is not None:
+            self._base64_bytes -= len(old)
+        self._base64[key] = bs64_data
+        self._base64_bytes += len(bs64_data)
+        while self._base64_bytes > self.max_base64_bytes and self._base64:
+            _, evicted = self._base64.popitem(last=False)
+            self._base64_bytes -= len(evicted)
+
+    def get_cached_base64(self, key: str) -> str | None:
+        bs64_data = self._base64.get(key)
+        if bs64_data is not None:
+            self._base64.move_to_end(key)
+        return bs64_data
+
+    async def get_base64(self, url: str) -> str:
+        """获取 URL 对应文件的 base64 编码（不含 base64:// 前缀）"""
+        key = self.make_key(url)
+        if bs64_data := self.get_cached_base64(key):
+            return bs64_data
+        path = await self.get_file(url)
+        bs64_data = await asyncio.to_thread(self._read_base64, path)
+        self._remember_base64(key, bs64_data)
+        return bs64_data
+
+    @staticmethod
+    def _read_base64(path: str) -> str:
+        with open(path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+
+    def file_to_base64(self, path: str) -> str:
+        """读取本地文件的 base64 编码（不含 base64:// 前缀），以路径、大小和修改时间作为缓存键"""
+        stat = os.stat(path)
+        key = self.make_key(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime}")
+        if bs64_data := self.get_cached_base64(key):
+            return bs64_data
+        with open(path, "rb") as f:
+            bs64_data = base64.b64encode(f.read()).decode()
+        self._remember_base64(key, bs64_data)
+        return bs64_data
+
+    async def evict(self):
+        """按时间和大小淘汰缓存文件。索引在事件循环中更新，文件在线程中删除"""
+        await self._load_index()
+        paths = []
+        now = time.time()
+        for key in list(self._index.keys()):
+            entry = self._index[key]
+            if now - entry.last_access <= self.max_age:
+                break
+            paths.append(self._remove_entry(key))
+        # 保留最近使用的文件，它可能刚刚返回给调用方
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            paths.append(self._remove_entry(key))
+        if paths:
+            await asyncio.to_thread(self._remove_files, paths)
+
+    def _remove_entry(self, key: str) -> str:
+        entry = self._index[key]
+        self._drop(key)
+        bs64_data = self._base64.pop(key, None)
+        if bs64_data is not None:
+            self._base64_bytes -= len(bs64_data)
+        return entry.path
+
+    @staticmethod
+    def _remove_files(paths: list[str]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"删除媒体缓存文件 {path} 失败: {e}")
+
+    def clean_temp_dir(self):
+        """清理 data/temp 下超过 max_age 的临时文件"""
+        temp_dir = os.path.join(get_astrbot_data_path(), "temp")
+        if not os.path.isdir(temp_dir):
+            return
+        now = time.time()
+        for name in os.listdir(temp_dir):
+            path = os.path.join(temp_dir, name)
+            try:
+                if os.path.isfile(path) and now - os.path.getctime(path) > self.max_age:
+                    os.remove(path)
+            except Exception as e:
+                logger.warning(f"清除临时文件 {path} 失败: {e}")
+
+    async def janitor(self, interval: float = 600, clean_temp: bool = True):
+        """定期淘汰媒体缓存，clean_temp 为 True 时同时清理 data/temp 下的临时文件"""
+        while True:
+            try:
+                if clean_temp:
+                    await asyncio.to_thread(self.clean_temp_dir)
+                await self.evict()
+            except Exception as e:
+                logger.error(f"清理媒体缓存失败: {e}")
+            await asyncio.sleep(interval)
+
+
+media_cache = MediaCache()
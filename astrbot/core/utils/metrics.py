@@ -1,10 +1,12 @@
-import aiohttp
 import sys
 import os
 import socket
 import uuid
+import asyncio
+from datetime import datetime
 from astrbot.core.config import VERSION
-from astrbot.core import db_helper, logger
+from astrbot.core import astrbot_config, db_helper, logger
+from astrbot.core.utils.http_client import http_client
 
 
 class Metric:
@@ -37,13 +39,24 @@ class Metric:
             Metric._iid_cache = "null"
             return "null"
 
+    @staticmethod
+    def record(**kwargs):
+        """记录一次指标。指标在内存中按小时累加，由 metric_aggregator 定期批量写入数据库并上传"""
+        metric_aggregator.add(**kwargs)
+
     @staticmethod
     async def upload(**kwargs):
         """
         上传相关非敏感的指标以更好地了解 AstrBot 的使用情况。上传的指标不会包含任何有关消息文本、用户信息等敏感信息。
 
+        由 MetricAggregator 批量上传时，每条数据是一个 (小时, 维度) 在一次 flush 内的汇总：
+        *_tick 为这段时间内的累计次数（逐条上传时为 1），sid_count 为不同发送者的数量，
+        sid 为其中一个发送者 ID 的哈希（逐条上传时为该条消息的发送者），batch 为 1 表示是汇总数据。
+
         Powered by TickStats.
         """
+        if not astrbot_config.get("metrics_upload_enable", True):
+            return
         base_url = "https://tickstats.soulter.top/api/metric/90a6c2a1"
         kwargs["v"] = VERSION
         kwargs["os"] = sys.platform
@@ -56,20 +69,121 @@ class Metric:
             kwargs["iid"] = Metric.get_installation_id()
         except Exception:
             pass
+
         try:
-            if "adapter_name" in kwargs:
-                await db_helper.insert_platform_stats(
-                    platform_id=kwargs["adapter_name"],
-                    platform_type=kwargs.get("adapter_type", "unknown"),
-                )
-        except Exception as e:
-            logger.error(f"保存指标到数据库失败: {e}")
+            session = http_client.get_session()
+            async with session.post(base_url, json=payload, timeout=3) as response:
+                if response.status != 200:
+                    pass
+        except Exception:
             pass
 
+
+class MetricAggregator:
+    """在内存中累加指标，定期批量写入 platform_stats 并上传
+
+    每条消息、每次 LLM 请求都会产生一次指标。逐条写入数据库并发起 HTTPS 请求在消息量大时开销很高，
+    这里按 (小时, 指标维度) 累加各个 *_tick 计数，每 flush_interval 秒以及关闭时一次性写入。
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 60,
+        max_keys: int = 10000,
+        upload_timeout: float = 10,
+    ):
+        self.flush_interval = flush_interval
+        """批量写入的间隔（秒）"""
+        self.upload_timeout = upload_timeout
+        """一次 flush 中上传的总时间上限（秒），避免关闭时长时间等待"""
+        self.max_keys = max_keys
+        """最多同时累加的维度组合数，超出时提前写入"""
+        self._counters: dict[tuple, dict[str, int]] = {}
+        """(小时, 维度) -> {tick 名称: 计数}"""
+        self._sids: dict[tuple, set[str]] = {}
+        """(小时, 维度) -> 发送者 ID 的哈希，用于统计发送者数量"""
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+        # 统计信息
+        self.dropped = 0
+
+    def add(self, **kwargs):
+        hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+        sid = kwargs.pop("sid", None)
+        ticks = {k: v for k, v in kwargs.items() if k.endswith("_tick")}
+        dims = tuple(sorted((k, v) for k, v in kwargs.items() if k not in ticks))
+        key = (hour, dims)
+
+        counters = self._counters.get(key)
+        if counters is None:
+            if len(self._counters) >= self.max_keys:
+                # 维度组合过多，提前写入。写入完成前到达的指标被丢弃
+                self.dropped += 1
+                self._schedule_flush()
+                return
+            counters = self._counters[key] = {}
+        for tick, value in ticks.items():
+            counters[tick] = counters.get(tick, 0) + value
+        if sid:
+            sids = self._sids.setdefault(key, set())
+            if len(sids) < 1000:
+                sids.add(sid)
+
+    def _schedule_flush(self):
+        if self._flush_task and not self._flush_task.done():
+            return
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.post(base_url, json=payload, timeout=3) as response:
-                    if response.status != 200:
-                        pass
-        except Exception:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
             pass
+
+    async def flush(self):
+        """将累加的指标写入数据库并上传"""
+        async with self._flush_lock:
+            counters, self._counters = self._counters, {}
+            sids, self._sids = self._sids, {}
+            if not counters:
+                return
+
+            for (hour, dims), ticks in counters.items():
+                dim_dict = dict(dims)
+                if "adapter_name" in dim_dict and ticks.get("msg_event_tick"):
+                    try:
+                        await db_helper.insert_platform_stats(
+                            platform_id=dim_dict["adapter_name"],
+                            platform_type=dim_dict.get("adapter_type", "unknown"),
+                            count=ticks["msg_event_tick"],
+                            timestamp=hour,
+                        )
+                    except Exception as e:
+                        logger.error(f"保存指标到数据库失败: {e}")
+
+            if not astrbot_config.get("metrics_upload_enable", True):
+                return
+            uploads = []
+            for key, ticks in counters.items():
+                data = dict(key[1]) | ticks
+                data["batch"] = 1
+                if key_sids := sids.get(key):
+                    data["sid"] = next(iter(key_sids))
+                    data["sid_count"] = len(key_sids)
+                uploads.append(Metric.upload(**data))
+            try:
+                await asyncio.wait_for(asyncio.gather(*uploads), self.upload_timeout)
+            except asyncio.TimeoutError:
+                logger.debug("上传指标超时，已放弃本次上传。")
+
+    async def run(self):
+        """定期批量写入指标"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"批量写入指标失败: {e}")
+
+
+metric_aggregator = MetricAggregator(
+    flush_interval=astrbot_config.get("metrics_flush_interval", 60)
+)
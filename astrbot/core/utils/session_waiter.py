@@ -10,6 +10,7 @@ import copy
 import astrbot.core.message.components as Comp
 from typing import Dict, Any, Callable, Awaitable, List
 from astrbot.core.platform import AstrMessageEvent
+from astrbot.core.utils.event_permit import release_event_permit
 
 USER_SESSIONS: Dict[str, "SessionWaiter"] = {}  # 存储 SessionWaiter 实例
 FILTERS: List["SessionFilter"] = []  # 存储 SessionFilter 实例
@@ -128,6 +129,8 @@ class SessionWaiter:
 
         # 开始一个会话保持事件
         self.session_controller.keep(timeout, reset_timeout=True)
+        # 等待用户输入期间不占用事件总线的并发名额
+        release_event_permit()
 
         try:
             return await self.session_controller.future
@@ -2,6 +2,7 @@ from astrbot.core.db import BaseDatabase
 from astrbot.core.db.po import Preference
 import threading
 import asyncio
+import copy
 import os
 from typing import TypeVar, Any, overload
 from .astrbot_path import get_astrbot_data_path
@@ -19,10 +20,72 @@ class SharedPreferences:
         self.path = json_storage_path
         self.db_helper = db_helper
 
+        self._cache: dict[str, dict[str, dict[str, Any]]] = {}
+        """preferences 表的内存镜像, scope -> scope_id -> key -> val"""
+        self._cache_loaded = False
+
         self._sync_loop = asyncio.new_event_loop()
         t = threading.Thread(target=self._sync_loop.run_forever, daemon=True)
         t.start()
 
+    async def load_cache(self):
+        """从数据库批量加载所有偏好设置到内存缓存中。
+
+        加载完成后，读操作将直接命中内存，写操作会同时写入数据库和缓存。
+        """
+        prefs = await self.db_helper.get_all_preferences()
+        cache: dict[str, dict[str, dict[str, Any]]] = {}
+        for pref in prefs:
+            val = pref.value.get("val") if isinstance(pref.value, dict) else None
+            cache.setdefault(pref.scope, {}).setdefault(pref.scope_id, {})[pref.key] = (
+                val
+            )
+        self._cache = cache
+        self._cache_loaded = True
+
+    def _cache_get(self, scope: str, scope_id: str, key: str, default: _VT) -> _VT:
+        try:
+            val = self._cache[scope][scope_id][key]
+        except KeyError:
+            return default
+        if isinstance(val, (dict, list)):
+            # 避免调用方修改返回值后污染缓存
+            return copy.deepcopy(val)
+        return val
+
+    def _cache_set(self, scope: str, scope_id: str, key: str, value: Any):
+        if not self._cache_loaded:
+            return
+        self._cache.setdefault(scope, {}).setdefault(scope_id, {})[key] = copy.deepcopy(
+            value
+        )
+
+    def _cache_remove(self, scope: str, scope_id: str, key: str | None = None):
+        if not self._cache_loaded:
+            return
+        scope_ids = self._cache.get(scope)
+        if not scope_ids or scope_id not in scope_ids:
+            return
+        if key is None:
+            del scope_ids[scope_id]
+        else:
+            scope_ids[scope_id].pop(key, None)
+
+    def get_cached(
+        self,
+        scope: str,
+        scope_id: str,
+        key: str,
+        default: _VT = None,
+    ) -> _VT:
+        """从内存缓存中同步获取偏好设置，不会访问数据库，也不会阻塞事件循环。
+
+        Note: 在 load_cache() 完成之前调用时会回退到数据库查询。
+        """
+        if not self._cache_loaded:
+            return self.get(key, default, scope=scope, scope_id=scope_id)
+        return self._cache_get(scope, scope_id, key, default)
+
     async def get_async(
         self,
         scope: str,
@@ -32,6 +95,8 @@ class SharedPreferences:
     ) -> _VT:
         """获取指定范围和键的偏好设置"""
         if scope_id is not None and key is not None:
+            if self._cache_loaded:
+                return self._cache_get(scope, scope_id, key, default)
             result = await self.db_helper.get_preference(scope, scope_id, key)
             if result:
                 ret = result.value["val"]
@@ -100,6 +165,7 @@ class SharedPreferences:
         await self.db_helper.insert_preference_or_update(
             scope, scope_id, key, {"val": value}
         )
+        self._cache_set(scope, scope_id, key, value)
 
     async def session_put(self, umo: str, key: str, value: Any):
         await self.put_async("umo", umo, key, value)
@@ -110,6 +176,7 @@ class SharedPreferences:
     async def remove_async(self, scope: str, scope_id: str, key: str):
         """删除指定范围和键的偏好设置"""
         await self.db_helper.remove_preference(scope, scope_id, key)
+        self._cache_remove(scope, scope_id, key)
 
     async def session_remove(self, umo: str, key: str):
         await self.remove_async("umo", umo, key)
@@ -121,6 +188,7 @@ class SharedPreferences:
     async def clear_async(self, scope: str, scope_id: str):
         """清空指定范围的所有偏好设置"""
         await self.db_helper.clear_preferences(scope, scope_id)
+        self._cache_remove(scope, scope_id)
 
     # ====
     # DEPRECATED METHODS
@@ -141,6 +209,9 @@ class SharedPreferences:
             raise ValueError(
                 "scope_id and key cannot be None when getting a specific preference."
             )
+        if self._cache_loaded:
+            result = self._cache_get(scope or "unknown", scope_id, key, default)
+            return result if result is not None else default
         result = asyncio.run_coroutine_threadsafe(
             self.get_async(scope or "unknown", scope_id or "unknown", key, default),
             self._sync_loop,
@@ -0,0 +1,51 @@
+"""
+系统资源占用采样
+
+psutil.cpu_percent(interval=...) 会阻塞等待采样间隔。这里在后台定期采样 CPU、内存和线程数，
+WebUI 统计接口直接读取最近一次的结果。
+"""
+
+import asyncio
+import threading
+
+import psutil
+
+from astrbot.core import logger
+
+
+class SystemMetricsSampler:
+    def __init__(self, interval: float = 5):
+        self.interval = interval
+        """采样间隔（秒）"""
+        self._process = psutil.Process()
+        self._metrics: dict | None = None
+
+    def sample(self) -> dict:
+        """立即采样一次。CPU 占用率为距离上一次采样的平均值"""
+        self._metrics = {
+            "cpu_percent": round(psutil.cpu_percent(interval=None), 1),
+            "memory": {
+                "process": self._process.memory_info().rss >> 20,
+                "system": psutil.virtual_memory().total >> 20,
+            },
+            "thread_count": threading.active_count(),
+        }
+        return self._metrics
+
+    def get(self) -> dict:
+        """获取最近一次的采样结果"""
+        if self._metrics is None:
+            return self.sample()
+        return self._metrics
+
+    async def run(self):
+        """定期采样"""
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"采样系统资源占用失败: {e}")
+            await asyncio.sleep(self.interval)
+
+
+system_metrics = SystemMetricsSampler()
@@ -1,9 +1,20 @@
 import re
 import os
+import asyncio
+import bisect
+import multiprocessing
+import threading
 import aiohttp
 import ssl
 import certifi
 from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 from typing import List, Tuple
 from abc import ABC, abstractmethod
 from astrbot.core.config import VERSION
@@ -61,9 +72,48 @@ class FontManager:
         except Exception:
             raise RuntimeError("无法加载任何字体")
 
+    _styled_font_cache = {}
+
+    @classmethod
+    def get_styled_font(
+        cls, font_names: List[str], size: int
+    ) -> ImageFont.FreeTypeFont | None:
+        """按顺序尝试加载粗体、斜体等字体，结果（包括加载失败）会被缓存"""
+        key = (tuple(font_names), size)
+        if key in cls._styled_font_cache:
+            return cls._styled_font_cache[key]
+        font = None
+        for font_name in font_names:
+            try:
+                font = ImageFont.truetype(font_name, size)
+                break
+            except Exception:
+                continue
+        cls._styled_font_cache[key] = font
+        return font
+
 
 class TextMeasurer:
-    """测量文本尺寸的工具类"""
+    """测量文本尺寸的工具类
+
+    换行时使用逐字缓存的字形宽度计算前缀和，二分查找每行能容纳的字符数，只对候选的断点调用一次 getbbox 校验。
+    拆分结果会被缓存，元素在 calculate_height 和 render 中拆分同一段文本时只计算一次。
+    """
+
+    _glyph_widths: dict = {}
+    """字体 -> {字符: 宽度}"""
+    _layout_cache: OrderedDict = OrderedDict()
+    """(字体, 最大宽度, 文本) -> 拆分后的行"""
+    _layout_cache_size = 1024
+    _layout_lock = threading.Lock()
+    """在线程池中渲染时，多个线程会同时访问排版缓存"""
+
+    @staticmethod
+    def _font_key(font) -> tuple:
+        path = getattr(font, "path", None)
+        if path is None:
+            return (id(font),)
+        return (path, getattr(font, "size", None), getattr(font, "index", 0))
 
     @staticmethod
     def get_text_size(text: str, font: ImageFont.FreeTypeFont) -> Tuple[int, int]:
@@ -79,35 +129,98 @@ class TextMeasurer:
             # 兼容旧版本
             return font.getsize(text)
 
-    @staticmethod
+    @classmethod
+    def _prefix_widths(cls, text: str, font: ImageFont.FreeTypeFont) -> List[float]:
+        """计算文本每个前缀的宽度（字形宽度之和），prefix[i] 为 text[:i] 的宽度"""
+        widths = cls._glyph_widths.setdefault(cls._font_key(font), {})
+        prefix = [0.0]
+        total = 0.0
+        for ch in text:
+            width = widths.get(ch)
+            if width is None:
+                width = widths[ch] = font.getlength(ch)
+            total += width
+            prefix.append(total)
+        return prefix
+
+    @classmethod
     def split_text_to_fit_width(
-        text: str, font: ImageFont.FreeTypeFont, max_width: int
+        cls, text: str, font: ImageFont.FreeTypeFont, max_width: int
     ) -> List[str]:
         """将文本拆分为多行，确保每行不超过指定宽度"""
-        lines = []
         if not text:
-            return lines
+            return []
+
+        key = (cls._font_key(font), max_width, text)
+        with cls._layout_lock:
+            lines = cls._layout_cache.get(key)
+            if lines is not None:
+                cls._layout_cache.move_to_end(key)
+                return list(lines)
+
+        if hasattr(font, "getlength"):
+            lines = cls._split_by_prefix_widths(text, font, max_width)
+        else:
+            lines = cls._split_by_measuring(text, font, max_width)
+
+        with cls._layout_lock:
+            cls._layout_cache[key] = tuple(lines)
+            while len(cls._layout_cache) > cls._layout_cache_size:
+                cls._layout_cache.popitem(last=False)
+        return lines
+
+    @classmethod
+    def _split_by_prefix_widths(
+        cls, text: str, font: ImageFont.FreeTypeFont, max_width: int
+    ) -> List[str]:
+        prefix = cls._prefix_widths(text, font)
+        lines = []
+        start = 0
+        n = len(text)
+        while start < n:
+            # 二分查找使 text[start:end] 的字形宽度之和不超过 max_width 的最大 end
+            end = bisect.bisect_right(prefix, prefix[start] + max_width, start + 1) - 1
+            end = max(end, start + 1)
+            # 字形宽度之和与实际渲染宽度（字距、字形外伸）可能略有差异，用实际宽度校验
+            if cls.get_text_size(text[start:end], font)[0] > max_width:
+                while (
+                    end > start + 1
+                    and cls.get_text_size(text[start : end - 1], font)[0] > max_width
+                ):
+                    end -= 1
+                if end > start + 1:
+                    end -= 1
+            else:
+                while (
+                    end < n
+                    and cls.get_text_size(text[start : end + 1], font)[0] <= max_width
+                ):
+                    end += 1
+            lines.append(text[start:end])
+            start = end
+        return lines
 
+    @classmethod
+    def _split_by_measuring(
+        cls, text: str, font: ImageFont.FreeTypeFont, max_width: int
+    ) -> List[str]:
+        """不支持 getlength 的字体（如 PIL 默认位图字体），二分查找每行能容纳的字符数"""
+        lines = []
         remaining_text = text
         while remaining_text:
-            # 如果文本宽度小于最大宽度，直接添加
-            text_width = TextMeasurer.get_text_size(remaining_text, font)[0]
-            if text_width <= max_width:
+            if cls.get_text_size(remaining_text, font)[0] <= max_width:
                 lines.append(remaining_text)
                 break
-
-            # 尝试逐字计算能放入当前行的最多字符
-            for i in range(len(remaining_text), 0, -1):
-                width = TextMeasurer.get_text_size(remaining_text[:i], font)[0]
-                if width <= max_width:
-                    lines.append(remaining_text[:i])
-                    remaining_text = remaining_text[i:]
-                    break
-            else:
-                # 如果单个字符都放不下，强制放一个字符
-                lines.append(remaining_text[0])
-                remaining_text = remaining_text[1:]
-
+            lo, hi = 1, len(remaining_text) - 1
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if cls.get_text_size(remaining_text[:mid], font)[0] <= max_width:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            # 如果单个字符都放不下，强制放一个字符
+            lines.append(remaining_text[:lo])
+            remaining_text = remaining_text[lo:]
         return lines
 
 
@@ -200,13 +313,7 @@ class BoldTextElement(MarkdownElement):
                 "DejaVuSans-Bold.ttf",  # Linux粗体
             ]
 
-            bold_font = None
-            for font_name in bold_fonts:
-                try:
-                    bold_font = ImageFont.truetype(font_name, font_size)
-                    break
-                except Exception:
-                    continue
+            bold_font = FontManager.get_styled_font(bold_fonts, font_size)
 
             if bold_font:
                 lines = TextMeasurer.split_text_to_fit_width(
@@ -265,13 +372,7 @@ class ItalicTextElement(MarkdownElement):
                 "DejaVuSans-Oblique.ttf",  # Linux斜体
             ]
 
-            italic_font = None
-            for font_name in italic_fonts:
-                try:
-                    italic_font = ImageFont.truetype(font_name, font_size)
-                    break
-                except Exception:
-                    continue
+            italic_font = FontManager.get_styled_font(italic_fonts, font_size)
 
             if italic_font:
                 lines = TextMeasurer.split_text_to_fit_width(
@@ -913,8 +1014,65 @@ class MarkdownRenderer:
         return image
 
 
+def _render_to_bytes(text: str, font_size: int, width: int) -> bytes:
+    """在线程池或进程池中渲染 Markdown 文本，返回 JPEG 图片数据"""
+    renderer = MarkdownRenderer(font_size=font_size, width=width)
+    image = asyncio.run(renderer.render(text))
+    buf = BytesIO()
+    image.save(buf, format="JPEG")
+    return buf.getvalue()
+
+
 class LocalRenderStrategy(RenderStrategy):
-    """本地渲染策略实现"""
+    """本地渲染策略实现
+
+    PIL 的排版和光栅化是 CPU 密集的操作，会在线程池（或进程池）中执行，不阻塞事件循环。
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        use_process_pool: bool = False,
+        font_size: int = 26,
+        width: int = 800,
+    ):
+        self.workers = max(1, workers)
+        """同时进行渲染的线程或进程数"""
+        self.use_process_pool = use_process_pool
+        """是否使用进程池。进程池不受 GIL 限制，但每个进程需要单独加载字体"""
+        self.font_size = font_size
+        self.width = width
+        self._executor: Executor | None = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_process_pool:
+                # 使用 spawn，避免 fork 正在运行事件循环的进程
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="t2i_local"
+                )
+        return self._executor
+
+    async def render_to_bytes(self, text: str) -> bytes:
+        """渲染文本，返回 JPEG 图片数据"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(),
+                _render_to_bytes,
+                text,
+                self.font_size,
+                self.width,
+            )
+        except BrokenExecutor:
+            # 工作进程异常退出，下次渲染时重新创建进程池
+            self._executor = None
+            raise
 
     async def render_custom_template(
         self, tmpl_str: str, tmpl_data: dict, return_url: bool = True
@@ -922,11 +1080,10 @@ class LocalRenderStrategy(RenderStrategy):
         raise NotImplementedError
 
     async def render(self, text: str, return_url: bool = False) -> str:
-        # 创建渲染器
-        renderer = MarkdownRenderer(font_size=26, width=800)
-
-        # 渲染Markdown文本
-        image = await renderer.render(text)
+        # 渲染Markdown文本，保存图像并返回路径
+        return save_temp_img(await self.render_to_bytes(text))
 
-        # 保存图像并返回路径/URL
-        return save_temp_img(image)
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
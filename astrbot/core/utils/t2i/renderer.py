@@ -1,18 +1,58 @@
+"""
+文本转图像渲染器
+
+相同的长文本（帮助菜单、插件帮助、常见问题的回答等）会被反复渲染。渲染结果以
+(文本, 渲染策略, 模板或宽度) 的 sha256 为键缓存在 data/t2i_cache 下，重复渲染时直接返回缓存的图片，缓存的总大小有上限。
+网络渲染返回的图片 URL 只在内存中缓存一段时间。
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
+
 from .network_strategy import NetworkRenderStrategy
 from .local_strategy import LocalRenderStrategy
 from astrbot.core.log import LogManager
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.media_cache import MediaCache
 
 logger = LogManager.GetLogger(log_name="astrbot")
 
 
 class HtmlRenderer:
-    def __init__(self, endpoint_url: str | None = None):
+    def __init__(
+        self,
+        endpoint_url: str | None = None,
+        local_workers: int = 1,
+        local_use_process_pool: bool = False,
+        cache_max_mb: int = 256,
+        url_cache_ttl: float = 600,
+    ):
         self.network_strategy = NetworkRenderStrategy(endpoint_url)
-        self.local_strategy = LocalRenderStrategy()
+        self.local_strategy = LocalRenderStrategy(
+            workers=local_workers, use_process_pool=local_use_process_pool
+        )
+        self.render_cache: MediaCache | None = None
+        """渲染结果的磁盘缓存，cache_max_mb 为 0 时不缓存"""
+        if cache_max_mb > 0:
+            self.render_cache = MediaCache(
+                cache_dir=os.path.join(get_astrbot_data_path(), "t2i_cache"),
+                max_bytes=cache_max_mb * 1024 * 1024,
+                max_age=7 * 24 * 3600,
+            )
+        self.url_cache_ttl = url_cache_ttl
+        """网络渲染返回的图片 URL 的缓存时间（秒），0 表示不缓存"""
+        self._url_cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
 
     async def initialize(self):
         await self.network_strategy.initialize()
 
+    async def terminate(self):
+        self.local_strategy.shutdown()
+
     async def render_custom_template(
         self,
         tmpl_str: str,
@@ -43,13 +83,90 @@ class HtmlRenderer:
         """使用默认文转图模板。"""
         if use_network:
             try:
-                return await self.network_strategy.render(
-                    text, return_url=return_url, template_name=template_name
-                )
+                return await self._render_network(text, return_url, template_name)
             except BaseException as e:
                 logger.error(
                     f"Failed to render image via AstrBot API: {e}. Falling back to local rendering."
                 )
-                return await self.local_strategy.render(text)
+                return await self._render_local(text)
         else:
+            return await self._render_local(text)
+
+    async def _render_local(self, text: str) -> str:
+        if self.render_cache is None:
             return await self.local_strategy.render(text)
+
+        async def generate(path: str):
+            data = await self.local_strategy.render_to_bytes(text)
+            await asyncio.to_thread(_write_file, path, data)
+
+        key = MediaCache.make_key(
+            json.dumps(
+                [
+                    text,
+                    "local",
+                    self.local_strategy.width,
+                    self.local_strategy.font_size,
+                ],
+                ensure_ascii=False,
+            )
+        )
+        return await self._get_cached(key, generate)
+
+    async def _render_network(
+        self, text: str, return_url: bool, template_name: str | None
+    ) -> str:
+        if self.render_cache is None and not self.url_cache_ttl:
+            return await self.network_strategy.render(
+                text, return_url=return_url, template_name=template_name
+            )
+
+        template_name = template_name or "base"
+        # 模板可能被用户修改，模板内容也作为键的一部分
+        tmpl_str = await self.network_strategy.get_template(name=template_name)
+        key = MediaCache.make_key(
+            json.dumps(
+                [text, "remote", template_name, MediaCache.make_key(tmpl_str)],
+                ensure_ascii=False,
+            )
+        )
+
+        if return_url:
+            if not self.url_cache_ttl:
+                return await self.network_strategy.render(
+                    text, return_url=True, template_name=template_name
+                )
+            entry = self._url_cache.get(key)
+            if entry and time.time() - entry[1] <= self.url_cache_ttl:
+                self._url_cache.move_to_end(key)
+                return entry[0]
+            url = await self.network_strategy.render(
+                text, return_url=True, template_name=template_name
+            )
+            self._url_cache[key] = (url, time.time())
+            self._url_cache.move_to_end(key)
+            while len(self._url_cache) > 256:
+                self._url_cache.popitem(last=False)
+            return url
+
+        if self.render_cache is None:
+            return await self.network_strategy.render(
+                text, return_url=False, template_name=template_name
+            )
+
+        async def generate(path: str):
+            src = await self.network_strategy.render(
+                text, return_url=False, template_name=template_name
+            )
+            await asyncio.to_thread(shutil.copyfile, src, path)
+
+        return await self._get_cached(key, generate)
+
+    async def _get_cached(self, key: str, generate) -> str:
+        # 缓存的淘汰在后台任务中执行，见 MediaCache.janitor()
+        return await self.render_cache.get_generated(key, ".jpg", generate)
+
+
+def _write_file(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
@@ -297,7 +297,9 @@ class ChatRoute(Route):
         return Response().ok(message="重命名成功！").__dict__
 
     async def get_conversations(self):
-        conversations = await self.conv_mgr.get_conversations(platform_id="webchat")
+        conversations = await self.conv_mgr.get_conversations(
+            platform_id="webchat", with_history=False
+        )
         # remove content
         conversations_ = []
         for conv in conversations:
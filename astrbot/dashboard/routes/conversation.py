@@ -74,6 +74,7 @@ class ConversationRoute(Route):
                     search_query=search_query,
                     exclude_ids=exclude_id_list,
                     exclude_platforms=exclude_platform_list,
+                    with_history=False,
                 )
             except Exception as e:
                 logger.error(f"数据库查询出错: {str(e)}\n{traceback.format_exc()}")
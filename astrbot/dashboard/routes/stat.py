@@ -1,15 +1,15 @@
 import traceback
-import psutil
 import time
-import threading
 import aiohttp
 from .route import Route, Response, RouteContext
 from astrbot.core import logger
 from quart import request
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
+from astrbot.core.db.po import Platform
 from astrbot.core.config import VERSION
 from astrbot.core.utils.io import get_dashboard_version
+from astrbot.core.utils.system_metrics import system_metrics
 from astrbot.core import DEMO_MODE
 from astrbot.core.db.migration.helper import check_migration_needed_v4
 
@@ -82,26 +82,21 @@ class StatRoute(Route):
         offset_sec = request.args.get("offset_sec", 86400)
         offset_sec = int(offset_sec)
         try:
-            stat = self.db_helper.get_base_stats(offset_sec)
             now = int(time.time())
             start_time = now - offset_sec
+            timeline = await self.db_helper.get_platform_stats_timeline(offset_sec)
             message_time_based_stats = []
 
             idx = 0
             for bucket_end in range(start_time, now, 3600):
                 cnt = 0
-                while (
-                    idx < len(stat.platform)
-                    and stat.platform[idx].timestamp < bucket_end
-                ):
-                    cnt += stat.platform[idx].count
+                while idx < len(timeline) and timeline[idx][0].timestamp() < bucket_end:
+                    cnt += timeline[idx][1]
                     idx += 1
                 message_time_based_stats.append([bucket_end, cnt])
 
-            stat_dict = stat.__dict__
-
-            cpu_percent = psutil.cpu_percent(interval=0.5)
-            thread_count = threading.active_count()
+            grouped_stats = await self.db_helper.get_grouped_platform_stats(offset_sec)
+            metrics = system_metrics.get()
 
             # 获取插件信息
             plugins = self.core_lifecycle.star_context.get_all_stars()
@@ -119,28 +114,23 @@ class StatRoute(Route):
                 int(time.time()) - self.core_lifecycle.start_time
             )
 
-            stat_dict.update(
-                {
-                    "platform": self.db_helper.get_grouped_base_stats(
-                        offset_sec
-                    ).platform,
-                    "message_count": self.db_helper.get_total_message_count() or 0,
-                    "platform_count": len(
-                        self.core_lifecycle.platform_manager.get_insts()
-                    ),
-                    "plugin_count": len(plugins),
-                    "plugins": plugin_info,
-                    "message_time_series": message_time_based_stats,
-                    "running": running_time,  # 现在返回时间组件而不是格式化的字符串
-                    "memory": {
-                        "process": psutil.Process().memory_info().rss >> 20,
-                        "system": psutil.virtual_memory().total >> 20,
-                    },
-                    "cpu_percent": round(cpu_percent, 1),
-                    "thread_count": thread_count,
-                    "start_time": self.core_lifecycle.start_time,
-                }
-            )
+            stat_dict = {
+                "platform": [
+                    Platform(name=platform_id, count=count, timestamp=start_time)
+                    for platform_id, count in grouped_stats
+                ],
+                "message_count": await self.db_helper.get_platform_message_total(),
+                "platform_count": len(self.core_lifecycle.platform_manager.get_insts()),
+                "plugin_count": len(plugins),
+                "plugins": plugin_info,
+                "message_time_series": message_time_based_stats,
+                "running": running_time,  # 现在返回时间组件而不是格式化的字符串
+                "memory": metrics["memory"],
+                "cpu_percent": metrics["cpu_percent"],
+                "thread_count": metrics["thread_count"],
+                "event_bus": self.core_lifecycle.event_bus.get_stats(),
+                "start_time": self.core_lifecycle.start_time,
+            }
 
             return Response().ok(stat_dict).__dict__
         except Exception as e:
@@ -9,6 +9,7 @@ from astrbot.api.message_components import Plain, Image
 from astrbot import logger
 from collections import defaultdict
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
+from astrbot.core.utils.image_caption_cache import image_caption_cache
 
 """
 聊天记忆增强
@@ -73,13 +74,19 @@ class LongTermMemory:
             provider = self.context.get_provider_by_id(image_caption_provider_id)
             if not provider:
                 raise Exception(f"没有找到 ID 为 {image_caption_provider_id} 的提供商")
-        response = await provider.text_chat(
-            prompt=image_caption_prompt,
-            session_id=uuid.uuid4().hex,
-            image_urls=[image_url],
-            persist=False,
+
+        async def _caption():
+            response = await provider.text_chat(
+                prompt=image_caption_prompt,
+                session_id=uuid.uuid4().hex,
+                image_urls=[image_url],
+                persist=False,
+            )
+            return response.completion_text
+
+        return await image_caption_cache.get_caption(
+            [image_url], provider.meta().id, image_caption_prompt, _caption
         )
-        return response.completion_text
 
     async def need_active_reply(self, event: AstrMessageEvent) -> bool:
         cfg = self.cfg(event)
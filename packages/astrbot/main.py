@@ -15,6 +15,7 @@ from astrbot.core.platform.message_type import MessageType
 from astrbot.core.provider.entities import ProviderType
 from astrbot.core.provider.sources.dify_source import ProviderDify
 from astrbot.core.utils.io import download_dashboard, get_dashboard_version
+from astrbot.core.utils.image_caption_cache import image_caption_cache
 from astrbot.core.star.star_handler import star_handlers_registry, StarHandlerMetadata
 from astrbot.core.star.star import star_map
 from astrbot.core.star.star_manager import PluginManager
@@ -700,7 +701,7 @@ UID: {user_id} 此 ID 可用于设置管理员。
         size_per_page = 6
         """获取所有对话列表"""
         conversations_all = await self.context.conversation_manager.get_conversations(
-            message.unified_msg_origin
+            message.unified_msg_origin, with_history=False
         )
         """计算总页数"""
         total_pages = (len(conversations_all) + size_per_page - 1) // size_per_page
@@ -860,7 +861,7 @@ UID: {user_id} 此 ID 可用于设置管理员。
             )
             return
         conversations = await self.context.conversation_manager.get_conversations(
-            message.unified_msg_origin
+            message.unified_msg_origin, with_history=False
         )
         if index > len(conversations) or index < 1:
             message.set_result(
@@ -1292,12 +1293,20 @@ UID: {user_id} 此 ID 可用于设置管理员。
                         logger.debug(
                             f"Processing image caption with provider: {img_cap_prov_id}"
                         )
-                        llm_resp = await prov.text_chat(
-                            prompt=img_cap_prompt,
-                            image_urls=req.image_urls,
+                        image_urls = req.image_urls
+
+                        async def _caption():
+                            llm_resp = await prov.text_chat(
+                                prompt=img_cap_prompt,
+                                image_urls=image_urls,
+                            )
+                            return llm_resp.completion_text
+
+                        caption = await image_caption_cache.get_caption(
+                            image_urls, img_cap_prov_id, img_cap_prompt, _caption
                         )
-                        if llm_resp.completion_text:
-                            req.prompt = f"(Image Caption: {llm_resp.completion_text})\n\n{req.prompt}"
+                        if caption:
+                            req.prompt = f"(Image Caption: {caption})\n\n{req.prompt}"
                         req.image_urls = []
                 except Exception as e:
                     logger.error(f"处理图片描述失败: {e}")
@@ -1325,14 +1334,21 @@ UID: {user_id} 此 ID 可用于设置管理员。
                     if prov is None:
                         prov = self.context.get_using_provider(event.unified_msg_origin)
                     if prov:
-                        llm_resp = await prov.text_chat(
-                            prompt="Please describe the image content.",
-                            image_urls=[await image_seg.convert_to_file_path()],
-                        )
-                        if llm_resp.completion_text:
-                            req.system_prompt += (
-                                f"Image Caption: {llm_resp.completion_text}\n"
+                        quote_prompt = "Please describe the image content."
+                        image_urls = [await image_seg.convert_to_file_path()]
+
+                        async def _caption():
+                            llm_resp = await prov.text_chat(
+                                prompt=quote_prompt,
+                                image_urls=image_urls,
                             )
+                            return llm_resp.completion_text
+
+                        caption = await image_caption_cache.get_caption(
+                            image_urls, prov.meta().id, quote_prompt, _caption
+                        )
+                        if caption:
+                            req.system_prompt += f"Image Caption: {caption}\n"
                     else:
                         logger.warning("No provider found for image captioning.")
                 except BaseException as e:
@@ -1467,6 +1483,7 @@ UID: {user_id} 此 ID 可用于设置管理员。
                     else filter.PermissionType.MEMBER
                 ),
             )
+        star_handlers_registry.mark_changed()
         cmd_group_str = "指令组" if cmd_group else "指令"
         yield event.plain_result(
             f"已将「{cmd_name}」{cmd_group_str} 的权限级别调整为 {cmd_type}。"
@@ -1,4 +1,3 @@
-import aiohttp
 import asyncio
 import random
 import astrbot.api.star as star
@@ -14,6 +13,7 @@ from .engines.google import Google
 from readability import Document
 from bs4 import BeautifulSoup
 from .engines import HEADERS, USER_AGENTS
+from astrbot.core.utils.http_client import http_client
 
 
 class Main(star.Star):
@@ -56,14 +56,14 @@ class Main(star.Star):
         """获取网页内容"""
         header = HEADERS
         header.update({"User-Agent": random.choice(USER_AGENTS)})
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.get(url, headers=header, timeout=6) as response:
-                html = await response.text(encoding="utf-8")
-                doc = Document(html)
-                ret = doc.summary(html_partial=True)
-                soup = BeautifulSoup(ret, "html.parser")
-                ret = await self._tidy_text(soup.get_text())
-                return ret
+        session = http_client.get_session()
+        async with session.get(url, headers=header, timeout=6) as response:
+            html = await response.text(encoding="utf-8")
+            doc = Document(html)
+            ret = doc.summary(html_partial=True)
+            soup = BeautifulSoup(ret, "html.parser")
+            ret = await self._tidy_text(soup.get_text())
+            return ret
 
     async def _process_search_result(
         self, result: SearchResult, idx: int, websearch_link: bool
@@ -132,25 +132,25 @@ class Main(star.Star):
             "Authorization": f"Bearer {tavily_key}",
             "Content-Type": "application/json",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.post(
-                url, json=payload, headers=header, timeout=6
-            ) as response:
-                if response.status != 200:
-                    reason = await response.text()
-                    raise Exception(
-                        f"Tavily web search failed: {reason}, status: {response.status}"
-                    )
-                data = await response.json()
-                results = []
-                for item in data.get("results", []):
-                    result = SearchResult(
-                        title=item.get("title"),
-                        url=item.get("url"),
-                        snippet=item.get("content"),
-                    )
-                    results.append(result)
-                return results
+        session = http_client.get_session()
+        async with session.post(
+            url, json=payload, headers=header, timeout=6
+        ) as response:
+            if response.status != 200:
+                reason = await response.text()
+                raise Exception(
+                    f"Tavily web search failed: {reason}, status: {response.status}"
+                )
+            data = await response.json()
+            results = []
+            for item in data.get("results", []):
+                result = SearchResult(
+                    title=item.get("title"),
+                    url=item.get("url"),
+                    snippet=item.get("content"),
+                )
+                results.append(result)
+            return results
 
     async def _extract_tavily(self, cfg: AstrBotConfig, payload: dict) -> list[dict]:
         """使用 Tavily 提取网页内容"""
@@ -160,22 +160,22 @@ class Main(star.Star):
             "Authorization": f"Bearer {tavily_key}",
             "Content-Type": "application/json",
         }
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            async with session.post(
-                url, json=payload, headers=header, timeout=6
-            ) as response:
-                if response.status != 200:
-                    reason = await response.text()
-                    raise Exception(
-                        f"Tavily web search failed: {reason}, status: {response.status}"
-                    )
-                data = await response.json()
-                results: list[dict] = data.get("results", [])
-                if not results:
-                    raise ValueError(
-                        "Error: Tavily web searcher does not return any results."
-                    )
-                return results
+        session = http_client.get_session()
+        async with session.post(
+            url, json=payload, headers=header, timeout=6
+        ) as response:
+            if response.status != 200:
+                reason = await response.text()
+                raise Exception(
+                    f"Tavily web search failed: {reason}, status: {response.status}"
+                )
+            data = await response.json()
+            results: list[dict] = data.get("results", [])
+            if not results:
+                raise ValueError(
+                    "Error: Tavily web searcher does not return any results."
+                )
+            return results
 
     @filter.command("websearch")
     async def websearch(self, event: AstrMessageEvent, oper: str | None = None):
@@ -0,0 +1,185 @@
+"""
+SQLite 查询与写入延迟基准
+
+用法: python tests/benchmarks/bench_sqlite.py [--rows 1000000] [--queries 2000] [--baseline]
+
+在临时数据库中为 platform_message_history、conversations、preferences 各生成 --rows 行数据，
+测量每条消息都会执行的查询与写入的 p50/p99 延迟。写入分别测量逐条写入和并发写入（经过写入队列合并事务）。
+--baseline 去掉连接参数（WAL 等）和新增的索引，用于对比。
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import event, text  # noqa: E402
+
+from astrbot.core.db.sqlite import (  # noqa: E402
+    SQLiteDatabase,
+    _set_sqlite_pragmas,
+)
+
+USERS = 5000
+PLATFORMS = ["aiocqhttp", "telegram", "discord"]
+
+
+def populate(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    start = datetime(2025, 1, 1)
+    chunk = 50000
+    for table in ("platform_message_history", "conversations", "preferences"):
+        for base in range(0, rows, chunk):
+            params = []
+            for i in range(base, min(base + chunk, rows)):
+                platform = PLATFORMS[i % len(PLATFORMS)]
+                user = f"user_{i % USERS}"
+                ts = (start + timedelta(seconds=i)).isoformat(sep=" ")
+                if table == "platform_message_history":
+                    params.append(
+                        (platform, user, "sender", "name", '{"text": "hi"}', ts, ts)
+                    )
+                elif table == "conversations":
+                    params.append((f"cid_{i}", platform, f"{platform}:{user}", ts, ts))
+                else:
+                    params.append(
+                        ("umo", f"{platform}:{user}", f"key_{i}", "{}", ts, ts)
+                    )
+            if table == "platform_message_history":
+                conn.executemany(
+                    "INSERT INTO platform_message_history (platform_id, user_id, sender_id, sender_name, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    params,
+                )
+            elif table == "conversations":
+                conn.executemany(
+                    "INSERT INTO conversations (conversation_id, platform_id, user_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    params,
+                )
+            else:
+                conn.executemany(
+                    "INSERT INTO preferences (scope, scope_id, key, value, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    params,
+                )
+            conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+    return f"{p50:>9.3f} {p99:>9.3f}"
+
+
+async def timed(coro_factory, n: int) -> list[float]:
+    samples = []
+    for i in range(n):
+        t = time.perf_counter()
+        await coro_factory(i)
+        samples.append(time.perf_counter() - t)
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--baseline", action="store_true")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    db = SQLiteDatabase(path)
+    if args.baseline:
+        event.remove(db.engine.sync_engine, "connect", _set_sqlite_pragmas)
+    await db.initialize()
+    db.inited = True
+    if args.baseline:
+        async with db.engine.begin() as conn:
+            await conn.execute(text("PRAGMA journal_mode=DELETE"))
+            await conn.execute(
+                text("DROP INDEX IF EXISTS ix_conversations_user_id_created_at")
+            )
+            await conn.execute(
+                text(
+                    "DROP INDEX IF EXISTS ix_platform_message_history_platform_user_created_at"
+                )
+            )
+        await db.engine.dispose()
+
+    t = time.perf_counter()
+    populate(path, args.rows)
+    print(f"生成 {args.rows} 行 x 3 张表: {time.perf_counter() - t:.1f}s")
+
+    rnd = random.Random(0)
+
+    def pick_user():
+        i = rnd.randrange(USERS)
+        return PLATFORMS[i % len(PLATFORMS)], f"user_{i}"
+
+    n = args.queries
+    print(f"{'operation':<32} {'p50(ms)':>9} {'p99(ms)':>9}")
+
+    async def get_history(_):
+        platform, user = pick_user()
+        await db.get_platform_message_history(platform, user, page_size=20)
+
+    async def get_preference(_):
+        platform, user = pick_user()
+        i = rnd.randrange(args.rows)
+        await db.get_preference("umo", f"{platform}:{user}", f"key_{i}")
+
+    async def get_conversations(_):
+        platform, user = pick_user()
+        await db.get_conversations(user_id=f"{platform}:{user}")
+
+    async def insert_history(i):
+        platform, user = pick_user()
+        await db.insert_platform_message_history(platform, user, {"text": str(i)})
+
+    async def upsert_preference(i):
+        platform, user = pick_user()
+        await db.insert_preference_or_update(
+            "umo", f"{platform}:{user}", f"key_{i}", {"v": i}
+        )
+
+    for name, factory in (
+        ("get_platform_message_history", get_history),
+        ("get_preference", get_preference),
+        ("get_conversations", get_conversations),
+        ("insert_platform_message_history", insert_history),
+        ("insert_preference_or_update", upsert_preference),
+    ):
+        print(f"{name:<32} {percentiles(await timed(factory, n))}")
+
+    # 并发写入：同时到达的写入由写入队列合并到同一个事务
+    concurrency = 50
+    samples = []
+
+    async def one(i):
+        t = time.perf_counter()
+        await insert_history(i)
+        samples.append(time.perf_counter() - t)
+
+    t = time.perf_counter()
+    for base in range(0, n, concurrency):
+        await asyncio.gather(*[one(base + i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - t
+    print(
+        f"{f'insert x{concurrency} concurrent':<32} {percentiles(samples)}"
+        f"  ({len(samples) / elapsed:.0f} 次/秒)"
+    )
+    print(db.write_queue.get_stats())
+    await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+本地文本转图像渲染耗时基准
+
+用法: python tests/benchmarks/bench_t2i_local.py [--font 字体路径] [--repeat 3]
+
+对不同长度的文本分别测量 MarkdownRenderer.render 的耗时（首次渲染与命中排版缓存后的渲染）。
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from astrbot.core.utils.t2i.local_strategy import (  # noqa: E402
+    FontManager,
+    MarkdownRenderer,
+    TextMeasurer,
+)
+
+PARAGRAPH = (
+    "AstrBot 是一个松耦合、异步、支持多消息平台部署的聊天机器人框架。"
+    "It supports multiple LLM providers, plugins and a web dashboard. "
+)
+
+
+def make_text(length: int) -> str:
+    lines = []
+    total = 0
+    i = 0
+    while total < length:
+        if i % 8 == 0:
+            line = f"## 第 {i // 8 + 1} 节"
+        elif i % 8 == 5:
+            line = "- " + PARAGRAPH[:40]
+        else:
+            line = PARAGRAPH * 3
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "\n".join(lines)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--font", help="使用指定的字体文件")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.font:
+        from PIL import ImageFont
+
+        for size in (20, 22, 26, 30, 34, 38, 42):
+            FontManager._font_cache[size] = ImageFont.truetype(args.font, size)
+
+    renderer = MarkdownRenderer(font_size=26, width=800)
+    print(f"{'chars':>8} {'cold(ms)':>10} {'warm(ms)':>10} {'height':>8}")
+    for length in (500, 2000, 8000, 32000):
+        text = make_text(length)
+        cold = []
+        warm = []
+        for _ in range(args.repeat):
+            TextMeasurer._layout_cache.clear()
+            TextMeasurer._glyph_widths.clear()
+            start = time.perf_counter()
+            image = await renderer.render(text)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            await renderer.render(text)
+            warm.append(time.perf_counter() - start)
+        print(
+            f"{len(text):>8} {min(cold) * 1000:>10.1f} {min(warm) * 1000:>10.1f} {image.height:>8}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
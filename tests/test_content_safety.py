@@ -0,0 +1,69 @@
+import os
+import random
+import re
+import sys
+
+# 将项目根目录添加到 sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from astrbot.core.pipeline.content_safety_check.strategies.keywords import (
+    KeywordsStrategy,
+    _AhoCorasick,
+)
+
+
+def _naive(keywords: list[str], text: str) -> bool:
+    return any(re.search(keyword, text) for keyword in keywords)
+
+
+def test_automaton_matches_re_search():
+    rnd = random.Random(0)
+    alphabet = "abc坏词"
+    for _ in range(300):
+        keywords = [
+            "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 4)))
+            for _ in range(rnd.randint(1, 8))
+        ]
+        automaton = _AhoCorasick(keywords)
+        for _ in range(10):
+            text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 30)))
+            assert (automaton.scan(text)[0] != -1) == _naive(keywords, text), (
+                keywords,
+                text,
+            )
+
+
+def test_strategy_matches_re_search():
+    keywords = ["坏词", "ab+c", r"\d{3}", "foo", "a.b"]
+    strategy = KeywordsStrategy(keywords)
+    for text in ["", "正常消息", "这是坏词", "abbbc", "12", "123", "xfoo", "a-b", "ab"]:
+        assert (not strategy.check(text)[0]) == _naive(keywords, text), text
+
+
+def test_regexes_that_cannot_be_merged():
+    strategy = KeywordsStrategy(["(?i)bad", r"(\w)\1x", "fo+", "["])
+    # 无效的正则被跳过，其余正则仍然生效
+    assert not strategy.check("BAD")[0]
+    assert not strategy.check("aax")[0]
+    assert not strategy.check("foo")[0]
+    assert strategy.check("FOO")[0]
+    assert strategy.check("abx")[0]
+
+
+def test_stream_scanner_matches_across_chunks():
+    strategy = KeywordsStrategy(["坏词", r"ab+c"])
+    scanner = strategy.create_stream_scanner()
+    assert scanner.feed("这是坏")[0]
+    assert not scanner.feed("词")[0]
+    # 一旦不通过，之后的检查都不通过
+    assert not scanner.feed("正常")[0]
+
+    scanner = strategy.create_stream_scanner()
+    assert scanner.feed("xab")[0]
+    assert not scanner.feed("bc")[0]
+
+
+def test_normalize():
+    strategy = KeywordsStrategy(["badword"], normalize=True)
+    assert not strategy.check("ＢＡＤ ＷＯＲＤ".replace(" ", ""))[0]
+    assert strategy.check("bad word")[0]
@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+
+# 将项目根目录添加到 sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from astrbot.core.conversation_mgr import ConversationManager
+from astrbot.core.db.sqlite import SQLiteDatabase
+
+
+def _turn(i: int, tool: bool = False) -> list[dict]:
+    messages = [{"role": "user", "content": f"q{i}"}]
+    if tool:
+        messages.append({"role": "assistant", "content": None, "tool_calls": []})
+        messages.append({"role": "tool", "content": f"t{i}", "tool_call_id": str(i)})
+    messages.append({"role": "assistant", "content": f"a{i}"})
+    return messages
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "test.db"))
+    await db.initialize()
+    db.inited = True
+    yield db
+    await db.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_migrate_conversation_content(db: SQLiteDatabase):
+    history = _turn(0) + _turn(1, tool=True)
+    async with db.engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO conversations (conversation_id, platform_id, user_id, content, created_at, updated_at) "
+                "VALUES ('cid', 'p', 'p:FriendMessage:u', :content, '2025-01-01 00:00:00', '2025-01-01 00:00:00')"
+            ),
+            {"content": json.dumps(history)},
+        )
+    await db._migrate_conversation_content()
+    assert await db.get_conversation_messages("cid") == history
+    assert await db.get_conversation_messages("cid", limit=2) == history[-2:]
+    conv = await db.get_conversation_by_id("cid")
+    assert conv.content is None
+    # 再次执行不会重复迁移
+    await db._migrate_conversation_content()
+    assert await db.get_conversation_messages("cid") == history
+
+
+@pytest.mark.asyncio
+async def test_tail_starts_at_turn_boundary(db: SQLiteDatabase):
+    history = _turn(0) + _turn(1, tool=True) + _turn(2, tool=True)
+    conv = await db.create_conversation(
+        user_id="p:FriendMessage:u", platform_id="p", content=history
+    )
+    mgr = ConversationManager(db)
+    cid = conv.conversation_id
+
+    # 最近 5 条从第 1 轮的 tool 调用中间开始，应从第 2 轮的 user 消息开始
+    res = await mgr.get_conversation("p:FriendMessage:u", cid, history_limit=5)
+    assert json.loads(res.history) == _turn(2, tool=True)
+
+    # 缓存中已有更长的窗口时，同样从一轮对话的开头开始
+    res = await mgr.get_conversation("p:FriendMessage:u", cid, history_limit=6)
+    assert json.loads(res.history) == _turn(2, tool=True)
+    res = await mgr.get_conversation("p:FriendMessage:u", cid, history_limit=8)
+    assert json.loads(res.history) == _turn(1, tool=True) + _turn(2, tool=True)
+
+    res = await mgr.get_conversation("p:FriendMessage:u", cid)
+    assert json.loads(res.history) == history
+
+
+@pytest.mark.asyncio
+async def test_get_conversations_with_history(db: SQLiteDatabase):
+    mgr = ConversationManager(db)
+    conv1 = await db.create_conversation(
+        user_id="p:FriendMessage:u", platform_id="p", content=_turn(0)
+    )
+    conv2 = await db.create_conversation(
+        user_id="p:FriendMessage:u", platform_id="p", content=_turn(1)
+    )
+    # 缓存中未保存的记录也会被读取
+    await mgr.get_conversation("p:FriendMessage:u", conv2.conversation_id, 2)
+    await mgr.append_history(
+        "p:FriendMessage:u", _turn(2), conversation_id=conv2.conversation_id
+    )
+
+    convs = await mgr.get_conversations("p:FriendMessage:u")
+    histories = {conv.cid: json.loads(conv.history) for conv in convs}
+    assert histories == {
+        conv1.conversation_id: _turn(0),
+        conv2.conversation_id: _turn(1) + _turn(2),
+    }
+
+    convs = await mgr.get_conversations("p:FriendMessage:u", with_history=False)
+    assert all(conv.history == "[]" for conv in convs)
@@ -0,0 +1,272 @@
+import asyncio
+import os
+import sys
+
+# 将项目根目录添加到 sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from astrbot.core.event_bus import EventBus, EventQueue
+from astrbot.core.utils.event_permit import release_event_permit
+from astrbot.core.utils.session_waiter import (
+    FILTERS,
+    USER_SESSIONS,
+    DefaultSessionFilter,
+)
+
+
+class _Event:
+    def __init__(self, umo: str, text: str, sender: str = "u"):
+        self.unified_msg_origin = umo
+        self.text = text
+        self.sender = sender
+
+    def get_sender_id(self):
+        return self.sender
+
+    def get_sender_name(self):
+        return ""
+
+    def get_message_outline(self):
+        return self.text
+
+    def get_platform_id(self):
+        return "test"
+
+    def get_platform_name(self):
+        return "test"
+
+
+class _ConfigManager:
+    def __init__(self, **event_bus_cfg):
+        self.confs = {"default": {"event_bus": event_bus_cfg}}
+
+    def get_conf_info(self, umo: str):
+        return {"id": "default", "name": "default"}
+
+
+class _Scheduler:
+    """记录执行顺序。handlers 中的函数按消息文本控制执行过程"""
+
+    def __init__(self):
+        self.started: list[str] = []
+        self.finished: list[str] = []
+        self.running = 0
+        self.max_running = 0
+        self.handlers = {}
+
+    async def execute(self, event: _Event):
+        self.started.append(event.text)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            handler = self.handlers.get(event.text)
+            if handler:
+                await handler()
+            else:
+                await asyncio.sleep(0.001)
+        finally:
+            self.running -= 1
+            self.finished.append(event.text)
+
+
+def _make_bus(queue: asyncio.Queue | None = None, **cfg) -> tuple[EventBus, _Scheduler]:
+    scheduler = _Scheduler()
+    bus = EventBus(
+        queue or asyncio.Queue(), {"default": scheduler}, _ConfigManager(**cfg)
+    )
+    return bus, scheduler
+
+
+async def _until(predicate, timeout: float = 2):
+    for _ in range(int(timeout / 0.005)):
+        if predicate():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("等待超时")
+
+
+@pytest.mark.asyncio
+async def test_lanes_keep_session_order():
+    bus, scheduler = _make_bus(max_concurrency=4)
+    dispatch = asyncio.create_task(bus.dispatch())
+    try:
+        for i in range(10):
+            for umo in ("a", "b", "c"):
+                bus.event_queue.put_nowait(_Event(umo, f"{umo}{i}"))
+        await _until(lambda: len(scheduler.finished) == 30)
+    finally:
+        dispatch.cancel()
+    for umo in ("a", "b", "c"):
+        assert [t for t in scheduler.started if t[0] == umo] == [
+            f"{umo}{i}" for i in range(10)
+        ]
+    assert bus.get_stats()["pending"] == 0
+    assert bus.get_stats()["lane_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency():
+    bus, scheduler = _make_bus(max_concurrency=2)
+    gate = asyncio.Event()
+    for i in range(5):
+        scheduler.handlers[f"s{i}"] = gate.wait
+    dispatch = asyncio.create_task(bus.dispatch())
+    try:
+        for i in range(5):
+            bus.event_queue.put_nowait(_Event(f"s{i}", f"s{i}"))
+        await _until(lambda: scheduler.running == 2)
+        await asyncio.sleep(0.05)
+        assert scheduler.running == 2
+        # 等待许可的事件计入积压
+        assert bus.get_stats()["pending"] == 3
+        gate.set()
+        await _until(lambda: len(scheduler.finished) == 5)
+    finally:
+        dispatch.cancel()
+    assert scheduler.max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_idle_event_releases_permit():
+    bus, scheduler = _make_bus(max_concurrency=1)
+    reply = asyncio.Event()
+
+    async def wait_for_reply():
+        # 例如 session_waiter 等待用户的下一条消息
+        release_event_permit()
+        await reply.wait()
+
+    scheduler.handlers["a1"] = wait_for_reply
+    dispatch = asyncio.create_task(bus.dispatch())
+    try:
+        bus.event_queue.put_nowait(_Event("a", "a1"))
+        bus.event_queue.put_nowait(_Event("a", "a2"))
+        bus.event_queue.put_nowait(_Event("b", "b1"))
+        # 其他会话不会被空闲的事件阻塞，同一会话的事件仍然排在后面
+        await _until(lambda: "b1" in scheduler.finished)
+        assert "a2" not in scheduler.started
+        reply.set()
+        await _until(lambda: "a2" in scheduler.finished)
+    finally:
+        dispatch.cancel()
+
+
+@pytest.mark.asyncio
+async def test_long_event_releases_permit_after_max_permit_hold():
+    bus, scheduler = _make_bus(max_concurrency=1, max_permit_hold=0.05)
+    done = asyncio.Event()
+    scheduler.handlers["a1"] = done.wait
+    dispatch = asyncio.create_task(bus.dispatch())
+    try:
+        bus.event_queue.put_nowait(_Event("a", "a1"))
+        bus.event_queue.put_nowait(_Event("b", "b1"))
+        await _until(lambda: "b1" in scheduler.finished)
+        assert scheduler.finished == ["b1"]
+        done.set()
+        await _until(lambda: "a1" in scheduler.finished)
+    finally:
+        dispatch.cancel()
+
+
+async def _run_overflow(policy: str, texts: list[str], sender=lambda t: "u"):
+    bus, scheduler = _make_bus(max_session_pending=2, overflow_policy=policy)
+    gate = asyncio.Event()
+    scheduler.handlers["first"] = gate.wait
+    dispatch = asyncio.create_task(bus.dispatch())
+    try:
+        bus.event_queue.put_nowait(_Event("a", "first"))
+        await _until(lambda: scheduler.started == ["first"])
+        for text in texts:
+            bus.event_queue.put_nowait(_Event("a", text, sender(text)))
+        await _until(lambda: bus.event_queue.empty())
+        gate.set()
+        await _until(lambda: bus.get_stats()["lane_count"] == 0)
+    finally:
+        dispatch.cancel()
+    return scheduler.started[1:], bus.get_stats()
+
+
+@pytest.mark.asyncio
+async def test_overflow_drop_oldest():
+    started, stats = await _run_overflow("drop_oldest", ["m1", "m2", "m3", "m4"])
+    assert started == ["m3", "m4"]
+    assert stats["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_overflow_drop_newest():
+    started, stats = await _run_overflow("drop_newest", ["m1", "m2", "m3", "m4"])
+    assert started == ["m1", "m2"]
+    assert stats["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_overflow_coalesce():
+    started, stats = await _run_overflow(
+        "coalesce", ["spam", "spam", "spam", "hi"], sender=lambda t: t
+    )
+    assert started == ["spam", "hi"]
+    assert stats["coalesced"] == 2
+    assert stats["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_session_waiter_bypasses_lane():
+    bus, scheduler = _make_bus(max_concurrency=1)
+    gate = asyncio.Event()
+    scheduler.handlers["a1"] = gate.wait
+    session_filter = DefaultSessionFilter()
+    dispatch = asyncio.create_task(bus.dispatch())
+    try:
+        bus.event_queue.put_nowait(_Event("a", "a1"))
+        await _until(lambda: scheduler.started == ["a1"])
+        # 会话正在等待用户输入时，新的消息直接执行，不排在等待者之后
+        FILTERS.append(session_filter)
+        USER_SESSIONS["a"] = object()
+        bus.event_queue.put_nowait(_Event("a", "reply"))
+        await _until(lambda: "reply" in scheduler.finished)
+        assert "a1" not in scheduler.finished
+        gate.set()
+        await _until(lambda: "a1" in scheduler.finished)
+    finally:
+        USER_SESSIONS.pop("a", None)
+        FILTERS.remove(session_filter)
+        dispatch.cancel()
+
+
+@pytest.mark.asyncio
+async def test_backpressure_bounds_event_queue():
+    queue = EventQueue(maxsize=3)
+    bus, scheduler = _make_bus(queue, max_pending=2, max_concurrency=1)
+    gate = asyncio.Event()
+    for i in range(20):
+        scheduler.handlers[f"s{i}"] = gate.wait
+    dispatch = asyncio.create_task(bus.dispatch())
+    try:
+        for i in range(20):
+            queue.put_nowait(_Event(f"s{i}", f"s{i}"))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        # 积压达到 max_pending 后调度器停止取出事件，队列满后丢弃最早的事件
+        assert queue.qsize() == 3
+        assert queue.dropped > 0
+        gate.set()
+        await _until(lambda: queue.empty() and bus.get_stats()["lane_count"] == 0)
+    finally:
+        dispatch.cancel()
+    assert scheduler.finished[-3:] == ["s17", "s18", "s19"]
+
+
+def test_event_queue_overflow_policies():
+    queue = EventQueue(maxsize=2)
+    for i in range(4):
+        queue.put_nowait(i)
+    assert [queue.get_nowait() for _ in range(2)] == [2, 3]
+    assert queue.dropped == 2
+
+    queue = EventQueue(maxsize=2, overflow_policy="drop_newest")
+    for i in range(4):
+        queue.put_nowait(i)
+    assert [queue.get_nowait() for _ in range(2)] == [0, 1]
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import os
+import sys
+
+# 将项目根目录添加到 sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import EmbeddingStorage
+from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
+from astrbot.core.provider.provider import EmbeddingProvider
+
+DIM = 16
+
+
+def _vectors(n: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).random((n, DIM), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def _search_ids(
+    storage: EmbeddingStorage, query: np.ndarray, k: int, ids=None
+) -> set[int]:
+    _, indices = await storage.search(query.copy(), k, ids)
+    return {int(i) for i in indices[0] if i != -1}
+
+
+async def _exists(path: str) -> bool:
+    return await asyncio.to_thread(os.path.exists, path)
+
+
+def _make_storage(path: str, index_type: str, **kwargs) -> EmbeddingStorage:
+    return EmbeddingStorage(
+        DIM,
+        path,
+        save_delay=0,
+        index_type=index_type,
+        nlist=4,
+        nprobe=4,
+        train_threshold=100,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat"])
+async def test_deleted_vectors_never_returned(tmp_path, index_type):
+    path = str(tmp_path / "index.faiss")
+    vectors = _vectors(200)
+    storage = _make_storage(path, index_type, compact_ratio=1)
+    await storage.insert_batch(vectors, list(range(200)))
+    assert storage._index_kind(storage.index) == index_type
+
+    deleted = set(range(0, 200, 3))
+    assert await storage.delete(sorted(deleted)) == len(deleted)
+    # 重复删除不计数
+    assert await storage.delete([0]) == 0
+    assert await storage.get_ids() == set(range(200)) - deleted
+
+    for query in (vectors[0:1], vectors[3:4], _vectors(1, seed=1)):
+        assert not (await _search_ids(storage, query, 200) & deleted)
+        # 只在指定的 ID 中搜索时同样过滤已删除的向量
+        found = await _search_ids(storage, query, 10, ids=[0, 1, 3, 4])
+        assert found == {1, 4}
+    assert await _search_ids(storage, vectors[0:1], 5, ids=[0, 3]) == set()
+
+    # 保存后重新载入，已删除的向量不会重新出现
+    await storage.flush()
+    storage = _make_storage(path, index_type)
+    assert await storage.get_ids() == set(range(200)) - deleted
+    assert not (await _search_ids(storage, vectors[0:1], 200) & deleted)
+
+
+@pytest.mark.asyncio
+async def test_hnsw_tombstones_persist_and_compact(tmp_path):
+    path = str(tmp_path / "index.faiss")
+    tombstones_path = path + ".tombstones.npy"
+    vectors = _vectors(100)
+    storage = _make_storage(path, "hnsw", compact_ratio=1)
+    await storage.insert_batch(vectors, list(range(100)))
+    await storage.delete([1, 2, 3])
+    # HNSW 不支持删除，向量仍在索引中
+    assert storage.index.ntotal == 100
+    await storage.flush()
+    assert await _exists(tombstones_path)
+
+    storage = _make_storage(path, "hnsw", compact_ratio=1)
+    await storage.initialize()
+    assert storage._tombstones == {1, 2, 3}
+
+    await storage.compact()
+    assert storage.index.ntotal == 97
+    assert storage._tombstones == set()
+    assert await storage.get_ids() == set(range(100)) - {1, 2, 3}
+    assert not (await _search_ids(storage, vectors[1:2], 100) & {1, 2, 3})
+    await storage.flush()
+    assert not await _exists(tombstones_path)
+
+    storage = _make_storage(path, "hnsw")
+    await storage.initialize()
+    assert storage.index.ntotal == 97
+    assert storage._tombstones == set()
+
+
+@pytest.mark.asyncio
+async def test_background_compaction(tmp_path):
+    storage = _make_storage(None, "hnsw", compact_ratio=0.2)
+    vectors = _vectors(100)
+    await storage.insert_batch(vectors, list(range(100)))
+    await storage.delete(list(range(10)))
+    assert storage._compact_task is None
+    await storage.delete(list(range(10, 30)))
+    await storage._compact_task
+    assert storage.index.ntotal == 70
+    assert await storage.get_ids() == set(range(30, 100))
+
+
+class _FakeEmbeddingProvider(EmbeddingProvider):
+    def __init__(self):
+        super().__init__({"id": "fake"}, {})
+
+    async def get_embedding(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "big")
+        return _vectors(1, seed=seed)[0].tolist()
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        return [await self.get_embedding(t) for t in text]
+
+    def get_dim(self) -> int:
+        return DIM
+
+
+def _make_vec_db(tmp_path) -> FaissVecDB:
+    return FaissVecDB(
+        str(tmp_path / "doc.db"),
+        str(tmp_path / "index.faiss"),
+        _FakeEmbeddingProvider(),
+        index_config={"index_type": "hnsw", "save_delay": 0},
+    )
+
+
+@pytest.mark.asyncio
+async def test_vec_db_delete_and_reload(tmp_path):
+    vec_db = _make_vec_db(tmp_path)
+    await vec_db.initialize()
+    texts = [f"文档{i}" for i in range(20)]
+    await vec_db.insert_batch(
+        texts,
+        metadatas=[{"user_id": str(i % 2)} for i in range(20)],
+        ids=[f"doc{i}" for i in range(20)],
+    )
+    assert (await vec_db.retrieve("文档5", k=1))[0].data["doc_id"] == "doc5"
+
+    assert await vec_db.delete("doc5")
+    assert not await vec_db.delete("doc5")
+    results = await vec_db.retrieve("文档5", k=20)
+    assert len(results) == 19
+    assert "doc5" not in {r.data["doc_id"] for r in results}
+    results = await vec_db.retrieve("文档5", k=20, metadata_filters={"user_id": "1"})
+    assert {r.data["doc_id"] for r in results} == {
+        f"doc{i}" for i in range(1, 20, 2) if i != 5
+    }
+    await vec_db.close()
+
+    vec_db = _make_vec_db(tmp_path)
+    await vec_db.initialize()
+    assert await vec_db.check_integrity() == {
+        "orphan_vectors": 0,
+        "missing_vectors": 0,
+    }
+    results = await vec_db.retrieve("文档5", k=20)
+    assert "doc5" not in {r.data["doc_id"] for r in results}
+    await vec_db.embedding_storage.compact()
+    results = await vec_db.retrieve("文档5", k=20)
+    assert len(results) == 19
+    await vec_db.close()
+
+
+@pytest.mark.asyncio
+async def test_vec_db_repairs_orphan_vectors(tmp_path):
+    vec_db = _make_vec_db(tmp_path)
+    await vec_db.initialize()
+    await vec_db.insert_batch(["a", "b", "c"], ids=["a", "b", "c"])
+    # 模拟文档已删除、但删除向量前崩溃
+    conn = vec_db.document_storage.connection
+    await conn.execute("DELETE FROM documents WHERE doc_id = 'b'")
+    await conn.commit()
+    assert await vec_db.check_integrity() == {
+        "orphan_vectors": 1,
+        "missing_vectors": 0,
+    }
+    results = await vec_db.retrieve("b", k=3)
+    assert {r.data["doc_id"] for r in results} == {"a", "c"}
+    assert await vec_db.check_integrity(repair=False) == {
+        "orphan_vectors": 0,
+        "missing_vectors": 0,
+    }
+    await vec_db.close()
@@ -0,0 +1,204 @@
+import asyncio
+import base64
+import os
+import sys
+import time
+
+# 将项目根目录添加到 sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import pytest_asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import astrbot.core.message.components as Comp
+from astrbot.core.provider.provider import TTSProvider
+from astrbot.core.provider.tts_cache import CachedTTSProvider
+from astrbot.core.utils import io, media_cache as media_cache_module
+from astrbot.core.utils.media_cache import MediaCache, is_immutable_url
+from astrbot.core.utils.t2i.renderer import HtmlRenderer
+
+
+async def _wait_evicted(cache: MediaCache):
+    # 超出大小上限后在后台任务中淘汰
+    for _ in range(100):
+        if cache._total_bytes <= cache.max_bytes:
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_evict_by_size_keeps_recent_entries(tmp_path):
+    cache = MediaCache(cache_dir=str(tmp_path), max_bytes=250)
+    for i in range(5):
+        await cache._store(f"k{i}", ".bin", b"x" * 100)
+        await _wait_evicted(cache)
+    assert sorted(os.listdir(tmp_path)) == ["k3.bin", "k4.bin"]
+    assert cache._total_bytes == 200
+
+    # 最近使用的条目排在后面，不会先被淘汰
+    assert await cache._lookup("k3")
+    await cache._store("k5", ".bin", b"x" * 100)
+    await _wait_evicted(cache)
+    assert sorted(os.listdir(tmp_path)) == ["k3.bin", "k5.bin"]
+
+
+@pytest.mark.asyncio
+async def test_evict_keeps_newest_oversized_entry(tmp_path):
+    cache = MediaCache(cache_dir=str(tmp_path), max_bytes=10)
+    path = await cache._store("big", ".bin", b"x" * 100)
+    await asyncio.sleep(0.05)
+    # 刚刚返回给调用方的文件不会被淘汰
+    assert await asyncio.to_thread(os.path.exists, path)
+
+
+@pytest.mark.asyncio
+async def test_evict_by_age(tmp_path):
+    cache = MediaCache(cache_dir=str(tmp_path), max_age=60)
+    await cache._store("old", ".bin", b"old")
+    await cache._store("new", ".bin", b"new")
+    cache._index["old"].last_access = time.time() - 120
+    await cache.evict()
+    assert os.listdir(tmp_path) == ["new.bin"]
+    assert await cache._lookup("old") is None
+
+
+@pytest.mark.asyncio
+async def test_index_is_restored_from_disk(tmp_path):
+    cache = MediaCache(cache_dir=str(tmp_path), max_bytes=1000)
+    await cache._store("a", ".bin", b"x" * 100)
+    cache = MediaCache(cache_dir=str(tmp_path), max_bytes=1000)
+    assert await cache._lookup("a") == str(tmp_path / "a.bin")
+    assert cache._total_bytes == 100
+
+
+def test_is_immutable_url():
+    assert is_immutable_url("https://multimedia.nt.qq.com.cn/download?fileid=abc")
+    assert is_immutable_url("https://cdn.discordapp.com/attachments/1/2/a.png")
+    assert is_immutable_url("https://api.telegram.org/file/bot123/photos/a.jpg")
+    assert not is_immutable_url("https://cdn.discordapp.com/avatars/1/a.png")
+    assert not is_immutable_url("https://example.com/random.jpg")
+    assert not is_immutable_url("file:///multimedia.nt.qq.com.cn/a.jpg")
+
+
+@pytest_asyncio.fixture
+async def media_server():
+    hits: dict[str, int] = {}
+
+    async def handler(request: web.Request):
+        hits[request.path] = hits.get(request.path, 0) + 1
+        if request.path == "/missing.jpg":
+            return web.Response(status=404, text="not found")
+        return web.Response(body=b"image:" + request.path.encode())
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    yield server, hits
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_platform_media_url_downloaded_once(tmp_path, monkeypatch, media_server):
+    server, hits = media_server
+    cache = MediaCache(cache_dir=str(tmp_path))
+    monkeypatch.setattr(io, "media_cache", cache)
+    monkeypatch.setattr(Comp, "media_cache", cache)
+    monkeypatch.setattr(
+        media_cache_module, "_IMMUTABLE_URL_PREFIXES", (("127.0.0.1", "/"),)
+    )
+    url = str(server.make_url("/a.jpg"))
+
+    path = await io.download_image_by_url(url)
+    assert await io.download_image_by_url(url) == path
+    image = Comp.Image.fromURL(url)
+    assert await image.convert_to_file_path() == path
+    assert await image.convert_to_base64() == base64.b64encode(b"image:/a.jpg").decode()
+    assert hits["/a.jpg"] == 1
+
+    # 错误响应不会被缓存
+    with pytest.raises(Exception):
+        await io.download_image_by_url(str(server.make_url("/missing.jpg")))
+    with pytest.raises(Exception):
+        await io.download_image_by_url(str(server.make_url("/missing.jpg")))
+    assert hits["/missing.jpg"] == 2
+
+
+@pytest.mark.asyncio
+async def test_other_urls_are_not_cached(tmp_path, monkeypatch, media_server):
+    server, hits = media_server
+    cache = MediaCache(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(io, "media_cache", cache)
+    monkeypatch.setenv("ASTRBOT_ROOT", str(tmp_path))
+    (tmp_path / "data" / "temp").mkdir(parents=True)
+    url = str(server.make_url("/random.jpg"))
+    # 随机图片等接口的 URL 不变但内容会变化，每次都重新下载
+    assert await io.download_image_by_url(url) != await io.download_image_by_url(url)
+    assert hits["/random.jpg"] == 2
+    assert not await asyncio.to_thread(os.path.exists, tmp_path / "cache")
+
+
+@pytest.mark.asyncio
+async def test_t2i_render_cache(tmp_path, monkeypatch):
+    renderer = HtmlRenderer()
+    renderer.render_cache = MediaCache(cache_dir=str(tmp_path), max_bytes=250)
+    calls = []
+
+    async def render_to_bytes(text: str) -> bytes:
+        calls.append(text)
+        return b"x" * 100
+
+    monkeypatch.setattr(renderer.local_strategy, "render_to_bytes", render_to_bytes)
+    first = await renderer._render_local("hello")
+    assert await renderer._render_local("hello") == first
+    assert calls == ["hello"]
+
+    for i in range(3):
+        await renderer._render_local(f"text{i}")
+        await _wait_evicted(renderer.render_cache)
+    assert len(os.listdir(tmp_path)) == 2
+    assert not await asyncio.to_thread(os.path.exists, first)
+    renderer.local_strategy.shutdown()
+
+
+class _FakeTTSProvider(TTSProvider):
+    def __init__(self, out_dir: str):
+        super().__init__({"id": "fake", "voice": "a", "api_key": "k"}, {})
+        self.out_dir = out_dir
+        self.calls = 0
+
+    async def get_audio(self, text: str) -> str:
+        self.calls += 1
+        path = os.path.join(self.out_dir, f"{self.calls}.wav")
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+        return path
+
+
+@pytest.mark.asyncio
+async def test_tts_cache(tmp_path):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    provider = _FakeTTSProvider(str(out_dir))
+    cache = MediaCache(cache_dir=str(tmp_path / "cache"), max_bytes=250)
+    tts = CachedTTSProvider(provider, cache=cache)
+
+    # 同时进行的相同文本的合成只请求一次
+    paths = await asyncio.gather(*[tts.get_audio("你好") for _ in range(3)])
+    assert len(set(paths)) == 1
+    assert provider.calls == 1
+    assert tts.get_stats() == {"hits": 2, "misses": 1}
+
+    # 更换 API Key 不影响缓存
+    provider.provider_config["api_key"] = "k2"
+    assert await tts.get_audio("你好") == paths[0]
+    assert provider.calls == 1
+
+    for i in range(3):
+        await tts.get_audio(f"text{i}")
+        await _wait_evicted(cache)
+    assert len(os.listdir(tmp_path / "cache")) == 2
+    assert not await asyncio.to_thread(os.path.exists, paths[0])
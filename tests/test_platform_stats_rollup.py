@@ -0,0 +1,77 @@
+import os
+import sys
+from datetime import datetime
+
+# 将项目根目录添加到 sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from astrbot.core.db.sqlite import SQLiteDatabase
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "test.db"))
+    await db.initialize()
+    db.inited = True
+    yield db
+    await db.engine.dispose()
+
+
+async def _fetch_all(db: SQLiteDatabase, sql: str) -> list[tuple]:
+    async with db.engine.connect() as conn:
+        result = await conn.execute(text(sql))
+        return [tuple(row) for row in result.all()]
+
+
+@pytest.mark.asyncio
+async def test_platform_stats_daily_rollup(db: SQLiteDatabase):
+    day1 = datetime(2025, 1, 1, 10)
+    day1_later = datetime(2025, 1, 1, 15)
+    day2 = datetime(2025, 1, 2, 9)
+    # 同一小时的写入走 ON CONFLICT DO UPDATE，由 UPDATE 触发器同步
+    await db.insert_platform_stats("p1", "aiocqhttp", count=2, timestamp=day1)
+    await db.insert_platform_stats("p1", "aiocqhttp", count=3, timestamp=day1)
+    await db.insert_platform_stats("p1", "aiocqhttp", count=1, timestamp=day1_later)
+    await db.insert_platform_stats("p2", "telegram", count=4, timestamp=day1)
+    await db.insert_platform_stats("p1", "aiocqhttp", count=5, timestamp=day2)
+
+    daily = await _fetch_all(
+        db,
+        "SELECT day, platform_id, count FROM platform_stats_daily ORDER BY day, platform_id",
+    )
+    assert daily == [
+        ("2025-01-01", "p1", 6),
+        ("2025-01-01", "p2", 4),
+        ("2025-01-02", "p1", 5),
+    ]
+    assert await db.get_platform_message_total() == 15
+
+    # 删除同样同步到按天汇总的数据
+    async with db.engine.begin() as conn:
+        await conn.execute(text("DELETE FROM platform_stats WHERE platform_id = 'p2'"))
+    daily = await _fetch_all(
+        db,
+        "SELECT day, platform_id, count FROM platform_stats_daily WHERE platform_id = 'p2'",
+    )
+    assert daily == [("2025-01-01", "p2", 0)]
+    assert await db.get_platform_message_total() == 11
+
+
+@pytest.mark.asyncio
+async def test_platform_stats_daily_backfill(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "test.db"))
+    await db.initialize()
+    await db.insert_platform_stats(
+        "p1", "aiocqhttp", count=2, timestamp=datetime(2025, 1, 1, 10)
+    )
+    # 模拟升级前没有触发器的数据库：汇总表中的数据会在初始化时重新生成
+    async with db.engine.begin() as conn:
+        await conn.execute(text("DROP TRIGGER platform_stats_daily_ai"))
+        await conn.execute(text("DELETE FROM platform_stats_daily"))
+    await db._init_platform_stats_rollup()
+    assert await db.get_platform_message_total() == 2
+    await db.engine.dispose()
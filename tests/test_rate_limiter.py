@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+
+# 将项目根目录添加到 sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from astrbot.core.pipeline.rate_limit_check.limiter import GCRALimiter, RateLimitRule
+from astrbot.core.pipeline.rate_limit_check.stage import RateLimitStage
+from astrbot.core.utils.event_permit import EventPermit, current_event_permit
+
+
+def test_burst_then_steady_rate():
+    limiter = GCRALimiter()
+    rule = RateLimitRule(count=3, period=60)
+    scopes = [("session", rule)]
+    for _ in range(3):
+        assert limiter.acquire(scopes, now=0) == (True, 0)
+    allowed, wait = limiter.acquire(scopes, now=0)
+    assert not allowed
+    assert wait == pytest.approx(20)
+    # 每 period / count 秒恢复一次许可
+    assert limiter.acquire(scopes, now=19)[0] is False
+    assert limiter.acquire(scopes, now=20) == (True, 0)
+    assert limiter.acquire(scopes, now=20)[0] is False
+
+
+def test_all_scopes_must_allow():
+    limiter = GCRALimiter()
+    session_rule = RateLimitRule(count=1, period=10)
+    global_rule = RateLimitRule(count=2, period=10)
+    assert limiter.acquire([("a", session_rule), ("global", global_rule)], now=0)[0]
+    # 会话 a 已经用完，拒绝时不消耗全局的许可
+    assert not limiter.acquire([("a", session_rule), ("global", global_rule)], now=0)[0]
+    assert limiter.acquire([("b", session_rule), ("global", global_rule)], now=0)[0]
+    allowed, wait = limiter.acquire(
+        [("c", session_rule), ("global", global_rule)], now=0
+    )
+    assert not allowed
+    assert wait == pytest.approx(5)
+
+
+def test_reservation_with_max_wait():
+    limiter = GCRALimiter()
+    scopes = [("session", RateLimitRule(count=1, period=10))]
+    assert limiter.acquire(scopes, now=0) == (True, 0)
+    # 需要等待的时间不超过 max_wait 时预约许可
+    allowed, wait = limiter.acquire(scopes, max_wait=10, now=0)
+    assert allowed
+    assert wait == pytest.approx(10)
+    # 预约后的下一次许可要再等一个间隔
+    allowed, wait = limiter.acquire(scopes, max_wait=10, now=0)
+    assert not allowed
+    assert wait == pytest.approx(20)
+
+
+def test_sweep_removes_idle_keys():
+    limiter = GCRALimiter(sweep_interval=60)
+    rule = RateLimitRule(count=5, period=10)
+    for i in range(100):
+        limiter.acquire([(f"user{i}", rule)], now=0)
+    assert len(limiter) == 100
+    limiter.sweep(now=1)
+    # 只保留尚未恢复到满令牌状态的键
+    assert len(limiter) == 100
+    limiter.sweep(now=2)
+    assert len(limiter) == 0
+
+
+class _Event:
+    session_id = "s"
+
+    def __init__(self):
+        self.stopped = False
+
+    def get_platform_id(self):
+        return "p"
+
+    def get_sender_id(self):
+        return "u"
+
+    def get_group_id(self):
+        return ""
+
+    def stop_event(self):
+        self.stopped = True
+
+
+def _make_stage(strategy: str) -> RateLimitStage:
+    stage = RateLimitStage()
+    stage.rl_strategy = strategy
+    stage.rate_limit_time = 0.2
+    stage.scope_rules = {"session": RateLimitRule(count=1, period=0.2)}
+    return stage
+
+
+@pytest.mark.asyncio
+async def test_stall_releases_event_permit():
+    stage = _make_stage("stall")
+    semaphore = asyncio.Semaphore(1)
+    await semaphore.acquire()
+    current_event_permit.set(EventPermit(semaphore))
+
+    await stage.process(_Event())
+    task = asyncio.create_task(stage.process(_Event()))
+    await asyncio.sleep(0.05)
+    # 等待下一个时间窗口期间，事件总线的并发许可已经归还
+    assert not task.done()
+    assert not semaphore.locked()
+    await task
+
+    # 需要等待超过一个时间窗口时丢弃
+    stage = _make_stage("stall")
+    await stage.process(_Event())
+    reserved = asyncio.create_task(stage.process(_Event()))
+    await asyncio.sleep(0)
+    event = _Event()
+    await stage.process(event)
+    assert event.stopped
+    await reserved
+
+
+@pytest.mark.asyncio
+async def test_discard():
+    stage = _make_stage("discard")
+    first, second = _Event(), _Event()
+    await stage.process(first)
+    await stage.process(second)
+    assert not first.stopped
+    assert second.stopped
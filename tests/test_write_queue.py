@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+
+# 将项目根目录添加到 sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from astrbot.core.db.sqlite import SQLiteDatabase
+from astrbot.core.db.write_queue import WriteQueue
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "test.db"))
+    await db.initialize()
+    db.inited = True
+    yield db
+    await db.engine.dispose()
+
+
+async def _fetch_all(db: SQLiteDatabase, sql: str) -> list[tuple]:
+    async with db.engine.connect() as conn:
+        result = await conn.execute(text(sql))
+        return [tuple(row) for row in result.all()]
+
+
+def _insert_stat(platform_id: str, fail: bool = False):
+    async def job(session):
+        await session.execute(
+            text(
+                "INSERT INTO platform_stats (timestamp, platform_id, platform_type, count) "
+                "VALUES ('2025-01-01 00:00:00', :platform_id, 'test', 1)"
+            ),
+            {"platform_id": platform_id},
+        )
+        if fail:
+            raise RuntimeError(platform_id)
+        return platform_id
+
+    return job
+
+
+@pytest.mark.asyncio
+async def test_write_queue_batches_concurrent_writes(db: SQLiteDatabase):
+    queue = WriteQueue(db.get_db)
+    results = await asyncio.gather(
+        *[queue.submit(_insert_stat(f"p{i}")) for i in range(10)]
+    )
+    assert results == [f"p{i}" for i in range(10)]
+    stats = queue.get_stats()
+    assert stats["jobs"] == 10
+    assert stats["transactions"] == 1
+    rows = await _fetch_all(db, "SELECT platform_id FROM platform_stats")
+    assert sorted(row[0] for row in rows) == sorted(results)
+
+
+@pytest.mark.asyncio
+async def test_write_queue_retries_jobs_after_batch_failure(db: SQLiteDatabase):
+    queue = WriteQueue(db.get_db)
+    results = await asyncio.gather(
+        *[queue.submit(_insert_stat(f"p{i}", fail=i == 3)) for i in range(5)],
+        return_exceptions=True,
+    )
+    # 失败只影响对应的调用方，其他写入逐个重新执行后提交
+    assert isinstance(results[3], RuntimeError)
+    assert [r for i, r in enumerate(results) if i != 3] == ["p0", "p1", "p2", "p4"]
+    rows = await _fetch_all(db, "SELECT platform_id FROM platform_stats")
+    assert sorted(row[0] for row in rows) == ["p0", "p1", "p2", "p4"]
+
+    # 队列在失败后继续工作
+    assert await queue.submit(_insert_stat("p5")) == "p5"